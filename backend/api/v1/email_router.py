@@ -7,12 +7,55 @@ from fastapi import (
     File,
     Form,
     Depends,
+    Query,
+    Request,
 )  # Importar Depends
 from services.email_processing_service import (
+    BATCH_MAX_CONCURRENCY,
+    BatchItemResult,
+    BatchProcessingResult,
     EmailProcessingService,
     EmailProcessingResult,
 )
-from typing import Union
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from services.job_service import (
+    JOB_MAX_ITEMS,
+    JobQueue,
+    JobResults,
+    JobStatus,
+    WebhookURLError,
+    check_webhook_url,
+)
+from services.metrics_service import QUOTA_REJECTIONS
+from services.pdf_service import (
+    DocumentExtractor,
+    PdfExtractionError,
+    PdfExtractorUnavailableError,
+)
+from services.scheduling_service import (
+    TENANT_ID_HEADER,
+    ClientContext,
+    TenantQuotas,
+    set_current_client,
+    tenant_for_key,
+)
+from services.service_container import get_service_container
+from services.upload_service import (
+    MAX_UPLOAD_BYTES,
+    UploadTooLargeError,
+    is_eml,
+    parse_eml,
+    read_text_upload,
+    read_upload_bytes,
+)
+from typing import Any, AsyncIterator, Union
+import json
+import math
+import os
+
+# Máximo de e-mails aceitos em uma única chamada de /process-emails
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
 
 router = APIRouter()
 
@@ -21,8 +64,74 @@ router = APIRouter()
 
 # Define uma função de dependência para obter o EmailProcessingService
 # Isso permite que o FastAPI gerencie a instância e facilita o mocking em testes
-def get_email_processing_service() -> EmailProcessingService:
-    return EmailProcessingService()
+# A instância é única por aplicação e vive no container criado no lifespan (main.py)
+def get_email_processing_service(request: Request) -> EmailProcessingService:
+    return get_service_container(request.app).email_processing_service
+
+
+# Fila de jobs em lote do container
+def get_job_queue(request: Request) -> JobQueue:
+    return get_service_container(request.app).job_queue
+
+
+# Extrator de texto de PDFs (pool de processos do container); substituível em testes
+def get_pdf_extractor(request: Request) -> DocumentExtractor:
+    return get_service_container(request.app).pdf_extractor
+
+
+# Cotas por cliente do container (None = sem cota)
+def get_tenant_quotas(request: Request) -> Union[TenantQuotas, None]:
+    return get_service_container(request.app).tenant_quotas
+
+
+# Cliente da requisição (dono da chave em TENANT_ID_HEADER ou IP de origem) e a sua
+# classe de prioridade na fila do LLM. Precisam ser async: o cliente é guardado
+# no contexto da requisição e herdado pelas chamadas ao LLM.
+async def get_interactive_client(request: Request) -> ClientContext:
+    return _bind_client(request, "interactive")
+
+
+async def get_bulk_client(request: Request) -> ClientContext:
+    return _bind_client(request, "bulk")
+
+
+def _bind_client(request: Request, priority: str) -> ClientContext:
+    # Só chaves configuradas em TENANT_API_KEYS identificam o cliente: um valor
+    # qualquer no cabeçalho não cria uma cota nova nem assume a de outro cliente
+    client_id = tenant_for_key(request.headers.get(TENANT_ID_HEADER))
+    if not client_id:
+        client_id = f"ip:{request.client.host if request.client else 'desconhecido'}"
+    # O cliente pode rebaixar a prioridade (X-Priority: bulk), mas não elevá-la
+    if request.headers.get("X-Priority", "").lower() == "bulk":
+        priority = "bulk"
+    client = ClientContext(client_id, priority)
+    set_current_client(client)
+    return client
+
+
+def _check_quota(
+    quotas: Union[TenantQuotas, None], client: ClientContext, cost: int
+) -> None:
+    """
+    Consome `cost` e-mails da cota do cliente ou responde 429 com Retry-After
+    (413 se o lote sozinho excede a cota por minuto do cliente)
+    """
+    if quotas is None:
+        return
+    wait = quotas.try_acquire(client, cost)
+    if not wait:
+        return
+    QUOTA_REJECTIONS.labels(client.priority).inc()
+    if math.isinf(wait):
+        raise HTTPException(
+            status_code=413,
+            detail=f"O lote de {cost} e-mails excede a cota por minuto do cliente.",
+        )
+    raise HTTPException(
+        status_code=429,
+        detail="Cota de e-mails por minuto do cliente excedida.",
+        headers={"Retry-After": str(math.ceil(wait))},
+    )
 
 
 @router.post("/process-email", response_model=EmailProcessingResult)
@@ -31,10 +140,227 @@ async def process_email_endpoint(
     email_file: Union[UploadFile, None] = File(None),  # Para upload de arquivo
     # INJETAR AQUI:
     email_processor: EmailProcessingService = Depends(get_email_processing_service),
+    pdf_extractor: DocumentExtractor = Depends(get_pdf_extractor),
+    client: ClientContext = Depends(get_interactive_client),
+    quotas: Union[TenantQuotas, None] = Depends(get_tenant_quotas),
 ):
     """
     Processa um e-mail, classificando-o e sugerindo uma resposta automática.
-    Pode receber o conteúdo do e-mail como texto direto ou via upload de arquivo (.txt ou .pdf).
+    Pode receber o conteúdo do e-mail como texto direto ou via upload de arquivo (.txt, .eml ou .pdf).
+    """
+    content_to_process = await _content_from_request(
+        email_content, email_file, pdf_extractor
+    )
+    _check_quota(quotas, client, 1)
+
+    try:
+        result = await email_processor.process_email_async(content_to_process)
+        return result
+    except Exception as e:
+        print(f"Erro interno ao processar e-mail: {e}")
+        raise HTTPException(
+            status_code=500, detail="Erro interno ao processar o e-mail."
+        )
+
+
+@router.post("/process-email/stream")
+async def process_email_stream_endpoint(
+    email_content: Union[str, None] = Form(None),
+    email_file: Union[UploadFile, None] = File(None),
+    email_processor: EmailProcessingService = Depends(get_email_processing_service),
+    pdf_extractor: DocumentExtractor = Depends(get_pdf_extractor),
+    client: ClientContext = Depends(get_interactive_client),
+    quotas: Union[TenantQuotas, None] = Depends(get_tenant_quotas),
+):
+    """
+    Versão em streaming de /process-email usando Server-Sent Events.
+    Emite o evento "classification" assim que a classificação é conhecida,
+    eventos "token" com os trechos da resposta sugerida e, por fim, "done"
+    com o resultado completo (ou "error" em caso de falha).
+    """
+    content_to_process = await _content_from_request(
+        email_content, email_file, pdf_extractor
+    )
+    _check_quota(quotas, client, 1)
+
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            async for event in email_processor.stream_email_async(content_to_process):
+                yield _format_sse(event["event"], event["data"])
+        except Exception as e:
+            print(f"Erro interno ao processar e-mail: {e}")
+            yield _format_sse(
+                "error", {"detail": "Erro interno ao processar o e-mail."}
+            )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _format_sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/process-emails", response_model=BatchProcessingResult)
+async def process_emails_endpoint(
+    email_contents: Union[list[str], None] = Form(None),  # Vários textos
+    email_files: Union[list[UploadFile], None] = File(None),  # Vários arquivos
+    email_processor: EmailProcessingService = Depends(get_email_processing_service),
+    pdf_extractor: DocumentExtractor = Depends(get_pdf_extractor),
+    client: ClientContext = Depends(get_bulk_client),
+    quotas: Union[TenantQuotas, None] = Depends(get_tenant_quotas),
+):
+    """
+    Processa um lote de e-mails em uma única requisição.
+    Aceita uma lista de textos e/ou vários arquivos. Cada item recebe seu próprio
+    resultado ou erro, sem que a falha de um item interrompa o lote.
+    """
+    email_contents = email_contents or []
+    email_files = email_files or []
+    total_items = len(email_contents) + len(email_files)
+
+    if total_items == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="É necessário fornecer ao menos um e-mail ou arquivo.",
+        )
+    if total_items > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"O lote excede o limite de {BATCH_MAX_ITEMS} e-mails.",
+        )
+
+    items: list[BatchItemResult] = []
+    contents_to_process: list[str] = []
+    pending_items: list[BatchItemResult] = []
+
+    sources: list[tuple[str, Union[str, UploadFile]]] = [
+        ("texto", content) for content in email_contents
+    ] + [(email_file.filename or "arquivo", email_file) for email_file in email_files]
+
+    for index, (source, payload) in enumerate(sources):
+        item: BatchItemResult = {
+            "index": index,
+            "source": source,
+            "result": None,
+            "error": None,
+        }
+        items.append(item)
+        try:
+            content = (
+                payload
+                if isinstance(payload, str)
+                else await _read_email_file(payload, pdf_extractor)
+            )
+        except HTTPException as e:
+            item["error"] = e.detail
+            continue
+        if not content.strip():
+            item["error"] = "O conteúdo do e-mail não pode estar vazio."
+            continue
+        contents_to_process.append(content)
+        pending_items.append(item)
+
+    if contents_to_process:
+        # Só os e-mails válidos consomem a cota
+        _check_quota(quotas, client, len(contents_to_process))
+        try:
+            outcomes = await email_processor.process_emails_async(
+                contents_to_process, max_concurrency=BATCH_MAX_CONCURRENCY
+            )
+        except Exception as e:
+            print(f"Erro interno ao processar lote de e-mails: {e}")
+            raise HTTPException(
+                status_code=500, detail="Erro interno ao processar os e-mails."
+            )
+        for item, outcome in zip(pending_items, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Erro interno ao processar e-mail do lote: {outcome}")
+                item["error"] = "Erro interno ao processar o e-mail."
+            else:
+                item["result"] = outcome
+
+    return {"results": items}
+
+
+class JobRequest(BaseModel):
+    emails: list[str]
+    priority: int = 0  # jobs com prioridade maior são processados primeiro
+    webhook_url: Union[str, None] = None  # recebe o status final do job via POST
+
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job_endpoint(
+    job_request: JobRequest,
+    job_queue: JobQueue = Depends(get_job_queue),
+    client: ClientContext = Depends(get_bulk_client),
+    quotas: Union[TenantQuotas, None] = Depends(get_tenant_quotas),
+):
+    """
+    Enfileira um lote de e-mails para processamento em segundo plano.
+    Retorna imediatamente o id do job; o progresso é consultado em
+    /jobs/{job_id} e os resultados em /jobs/{job_id}/results
+    (ou recebidos no webhook_url quando o job terminar).
+    """
+    if not job_request.emails:
+        raise HTTPException(
+            status_code=400, detail="É necessário fornecer ao menos um e-mail."
+        )
+    if len(job_request.emails) > JOB_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"O job excede o limite de {JOB_MAX_ITEMS} e-mails.",
+        )
+    if job_request.webhook_url:
+        try:
+            await check_webhook_url(job_request.webhook_url)
+        except WebhookURLError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    # Os jobs rodam depois, como trabalho interno de baixa prioridade; a cota
+    # do cliente é consumida no envio
+    _check_quota(quotas, client, len(job_request.emails))
+    return await job_queue.submit(
+        job_request.emails, job_request.priority, job_request.webhook_url
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job_endpoint(job_id: str, job_queue: JobQueue = Depends(get_job_queue)):
+    """
+    Retorna o status e o progresso de um job
+    """
+    status = await job_queue.get_job(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return status
+
+
+@router.get("/jobs/{job_id}/results", response_model=JobResults)
+async def get_job_results_endpoint(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    job_queue: JobQueue = Depends(get_job_queue),
+):
+    """
+    Retorna os resultados de um job de forma paginada, na ordem de envio
+    """
+    if await job_queue.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return await job_queue.get_results(job_id, offset, limit)
+
+
+async def _content_from_request(
+    email_content: Union[str, None],
+    email_file: Union[UploadFile, None],
+    pdf_extractor: DocumentExtractor,
+) -> str:
+    """
+    Obtém o conteúdo do e-mail a partir do texto ou do arquivo enviado.
+    Lança HTTPException se nenhum for informado ou se o conteúdo estiver vazio.
     """
     if email_content is None and email_file is None:
         raise HTTPException(
@@ -44,18 +370,7 @@ async def process_email_endpoint(
 
     content_to_process = ""
     if email_file:
-        if email_file.content_type == "text/plain":
-            content_to_process = (await email_file.read()).decode("utf-8")
-        elif email_file.content_type == "application/pdf":
-            raise HTTPException(
-                status_code=501,
-                detail="Leitura de arquivos PDF ainda não implementada.",
-            )
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Tipo de arquivo não suportado. Apenas .txt ou .pdf.",
-            )
+        content_to_process = await _read_email_file(email_file, pdf_extractor)
     elif email_content:
         content_to_process = email_content
 
@@ -63,12 +378,43 @@ async def process_email_endpoint(
         raise HTTPException(
             status_code=400, detail="O conteúdo do e-mail não pode estar vazio."
         )
+    return content_to_process
 
+
+async def _read_email_file(
+    email_file: UploadFile, pdf_extractor: DocumentExtractor
+) -> str:
+    """
+    Lê o conteúdo de um arquivo enviado em blocos, respeitando MAX_UPLOAD_BYTES.
+    Lança HTTPException para tipos não suportados, arquivos grandes demais
+    ou PDFs que não puderam ser lidos.
+    """
     try:
-        result = email_processor.process_email(content_to_process)
-        return result
-    except Exception as e:
-        print(f"Erro interno ao processar e-mail: {e}")
+        if is_eml(email_file):
+            return parse_eml(await read_upload_bytes(email_file, MAX_UPLOAD_BYTES))
+        if email_file.content_type == "text/plain":
+            return await read_text_upload(email_file, MAX_UPLOAD_BYTES)
+        if email_file.content_type == "application/pdf":
+            data = await read_upload_bytes(email_file, MAX_UPLOAD_BYTES)
+            return await pdf_extractor.extract(data)
+    except UploadTooLargeError:
         raise HTTPException(
-            status_code=500, detail="Erro interno ao processar o e-mail."
+            status_code=413,
+            detail=f"O arquivo excede o limite de {MAX_UPLOAD_BYTES} bytes.",
+        )
+    except PdfExtractionError as e:
+        print(f"Erro ao extrair texto do PDF: {e}")
+        raise HTTPException(
+            status_code=422, detail="Não foi possível extrair o texto do PDF."
         )
+    except PdfExtractorUnavailableError as e:
+        print(f"Erro ao extrair texto do PDF: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="A leitura de PDFs está indisponível no momento. Tente novamente.",
+        )
+
+    raise HTTPException(
+        status_code=400,
+        detail="Tipo de arquivo não suportado. Apenas .txt, .eml ou .pdf.",
+    )
@@ -0,0 +1,89 @@
+"""
+Compara os modos do pipeline de LLM (LLM_PIPELINE_MODE) em latência e tokens:
+"two_call" (classificação + resposta), "combined" (uma chamada com JSON)
+e "speculative" (rascunhos da resposta em paralelo à classificação).
+
+Faz chamadas reais à API do OpenAI (requer OPENAPI_APIKEY/OPENAI_API_KEY).
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.bench_pipeline_modes --size 20 --modes two_call combined speculative
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.stats import percentile
+from services.email_processing_service import EmailProcessingService
+from services.openai_service import AsyncOpenAIService
+
+
+class UsageRecorder:
+    """
+    Envolve chat.completions.create para somar chamadas e tokens de cada resposta
+    """
+
+    def __init__(self, service: AsyncOpenAIService) -> None:
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._create = service.client.chat.completions.create
+        service.client.chat.completions.create = self._recording_create  # type: ignore
+
+    async def _recording_create(self, *args: Any, **kwargs: Any) -> Any:
+        response = await self._create(*args, **kwargs)
+        self.calls += 1
+        if response.usage is not None:
+            self.prompt_tokens += response.usage.prompt_tokens
+            self.completion_tokens += response.usage.completion_tokens
+        return response
+
+
+async def run_mode(mode: str, corpus: list[str]) -> None:
+    openai_service = AsyncOpenAIService()
+    recorder = UsageRecorder(openai_service)
+    service = EmailProcessingService(
+        async_openai_service=openai_service, pipeline_mode=mode
+    )
+
+    latencies: list[float] = []
+    for email_content in corpus:
+        start = time.perf_counter()
+        await service.process_email_async(email_content)
+        latencies.append(time.perf_counter() - start)
+    await openai_service.close()
+
+    latencies.sort()
+    n = len(corpus)
+    p50 = percentile(latencies, 50)
+    p95 = percentile(latencies, 95)
+    print(
+        f"{mode:<10} média {statistics.mean(latencies):6.2f}s  "
+        f"p50 {p50:6.2f}s  p95 {p95:6.2f}s  "
+        f"chamadas/e-mail {recorder.calls / n:4.2f}  "
+        f"tokens/e-mail {recorder.prompt_tokens / n:7.1f} entrada + "
+        f"{recorder.completion_tokens / n:6.1f} saída"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=20)
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=["two_call", "combined", "speculative"],
+        help="Modos a comparar",
+    )
+    args = parser.parse_args()
+
+    corpus = list(generate_corpus(args.size))
+    for mode in args.modes:
+        asyncio.run(run_mode(mode, corpus))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark do pré-processamento: compara a chamada individual com o pipeline
+completo (comportamento original), a chamada individual com componentes
+excluídos e o processamento em lote com nlp.pipe, para cada tamanho de corpus.
+Cada medição é repetida --repeat vezes e reporta a mediana; ao final, o pico
+de memória do processo.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.bench_preprocess --size 100 1000 10000 --batch-sizes 16 64 256 --n-process 1 2
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable
+
+import spacy
+from spacy.language import Language
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.stats import peak_rss_mb
+from services.nlp_service import (
+    MODEL_NAME,
+    _doc_to_text,
+    preprocess_text,
+    preprocess_texts,
+)
+
+
+def _measure(
+    name: str, corpus: list[str], run: Callable[[], object], repeat: int = 1
+) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    elapsed = statistics.median(timings)
+    print(f"{name:<45} {elapsed:8.3f}s  {len(corpus) / elapsed:10.1f} e-mails/s")
+
+
+def _run_size(corpus: list[str], full_nlp: Language, args: argparse.Namespace) -> None:
+    _measure(
+        "individual, pipeline completo (original)",
+        corpus,
+        lambda: [_doc_to_text(full_nlp(text.lower())) for text in corpus],
+        args.repeat,
+    )
+    _measure(
+        "individual, sem parser/ner",
+        corpus,
+        lambda: [preprocess_text(text) for text in corpus],
+        args.repeat,
+    )
+    for n_process in args.n_process:
+        for batch_size in args.batch_sizes:
+            _measure(
+                f"nlp.pipe batch_size={batch_size} n_process={n_process}",
+                corpus,
+                lambda: list(
+                    preprocess_texts(corpus, batch_size=batch_size, n_process=n_process)
+                ),
+                args.repeat,
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--paragraphs", type=int, default=3)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--n-process", type=int, nargs="+", default=[1])
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    full_nlp = spacy.load(MODEL_NAME)
+    for size in args.size:
+        corpus = list(generate_corpus(size, args.paragraphs))
+        print(f"\nCorpus: {len(corpus)} e-mails, {args.paragraphs} parágrafos cada")
+        _run_size(corpus, full_nlp, args)
+    print(f"\nPico de memória: {peak_rss_mb():.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark de memória por worker do servidor de produção (serve.py).
+
+Sobe o servidor com N workers duas vezes, com e sem o carregamento do modelo
+antes do fork, e mede cada processo depois que todos os workers carregaram o
+modelo: RSS, PSS (páginas compartilhadas divididas entre os processos) e USS
+(páginas exclusivas). O PSS total é a memória real ocupada pelo servidor.
+
+Só funciona no Linux (lê /proc/<pid>/smaps_rollup).
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.bench_workers --workers 4
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.fake_openai_server import free_port
+from benchmarks.stats import child_pids, shared_memory_mb
+
+
+def start_server(port: int, workers: int, preload: bool) -> subprocess.Popen[bytes]:
+    env = {
+        **os.environ,
+        "OPENAPI_APIKEY": "sk-fake",
+        "LLM_WARMUP": "false",
+        "JOB_QUEUE_PATH": ":memory:",
+        "RESULT_CACHE_BACKEND": "none",
+        "NEAR_DUPLICATE_PATH": "",
+    }
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = [
+        sys.executable,
+        "serve.py",
+        "--host",
+        "127.0.0.1",
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+    ]
+    if not preload:
+        command.append("--no-preload")
+    return subprocess.Popen(
+        command,
+        cwd=backend_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_workers_ready(port: int, workers: int, timeout: float = 180) -> None:
+    """
+    Espera /readiness responder 200 várias vezes seguidas: as conexões são
+    distribuídas entre os workers, e cada um só fica pronto após carregar o modelo
+    """
+    deadline = time.monotonic() + timeout
+    consecutive = 0
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+        while time.monotonic() < deadline:
+            try:
+                ready = client.get("/readiness").status_code == 200
+            except httpx.TransportError:
+                ready = False
+            consecutive = consecutive + 1 if ready else 0
+            if consecutive >= 4 * workers:
+                return
+            time.sleep(0.1 if ready else 0.5)
+    raise TimeoutError("Os workers não ficaram prontos a tempo.")
+
+
+def measure(workers: int, preload: bool, settle: float) -> None:
+    port = free_port()
+    server = start_server(port, workers, preload)
+    try:
+        wait_workers_ready(port, workers)
+        # Tempo para o warm-up em segundo plano terminar em todos os workers
+        time.sleep(settle)
+        pids = [("principal", server.pid)] + [
+            ("worker", pid) for pid in child_pids(server.pid)
+        ]
+        totals = [0.0, 0.0, 0.0]
+        label = "com preload" if preload else "sem preload"
+        print(f"\n{label} ({workers} workers)")
+        print(f"{'processo':>10} {'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'USS MB':>9}")
+        for name, pid in pids:
+            memory = shared_memory_mb(pid)
+            if memory is None:
+                raise RuntimeError("É preciso o /proc do Linux para medir a memória.")
+            totals = [total + value for total, value in zip(totals, memory)]
+            print(
+                f"{name:>10} {pid:>8} {memory[0]:9.1f} {memory[1]:9.1f} {memory[2]:9.1f}"
+            )
+        print(
+            f"{'total':>10} {'':>8} {totals[0]:9.1f} {totals[1]:9.1f} {totals[2]:9.1f}"
+        )
+        print(f"PSS por worker: {totals[1] / workers:.1f} MB")
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=3.0,
+        help="Segundos de espera após os workers ficarem prontos",
+    )
+    args = parser.parse_args()
+    for preload in (True, False):
+        measure(args.workers, preload, args.settle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Gera um corpus sintético de e-mails em português para os benchmarks.
+O gerador é determinístico (seed fixa) para que as medições sejam comparáveis.
+"""
+
+import random
+from typing import Iterator
+
+SAUDACOES = ["Prezados,", "Olá,", "Bom dia,", "Boa tarde,", "Oi equipe,"]
+DESPEDIDAS = ["Atenciosamente,", "Obrigado,", "Abraços,", "Att.,"]
+NOMES = ["Marcos", "Ana", "Juliana", "Carlos", "Fernanda", "Ricardo", "Beatriz"]
+
+PARAGRAFOS_PRODUTIVOS = [
+    "Gostaria de verificar o status da minha solicitação de acesso ao sistema interno, protocolo #{n}.",
+    "O relatório mensal não está sendo gerado desde a última atualização e preciso dele até sexta-feira.",
+    "Poderiam me enviar a segunda via do boleto referente ao contrato {n}?",
+    "Estou com erro ao fazer login no portal e a mensagem diz que minha senha expirou.",
+    "Precisamos agendar uma reunião para revisar o cronograma do projeto e os próximos entregáveis.",
+    "Segue em anexo a planilha com os dados solicitados; por favor confirmem o recebimento.",
+]
+
+PARAGRAFOS_IMPRODUTIVOS = [
+    "Desejo a todos um feliz Natal e um próspero Ano Novo!",
+    "Obrigado pela ajuda de ontem, foi muito útil.",
+    "Parabéns a toda a equipe pelo excelente trabalho neste trimestre.",
+    "Só passando para agradecer o café da manhã de hoje, estava ótimo.",
+    "Feliz aniversário! Que seu dia seja incrível.",
+]
+
+
+def generate_email(rng: random.Random, paragraphs: int = 3) -> str:
+    """
+    Gera um único e-mail com o número de parágrafos indicado
+    """
+    pool = rng.choice([PARAGRAFOS_PRODUTIVOS, PARAGRAFOS_IMPRODUTIVOS])
+    body = [
+        rng.choice(pool).format(n=rng.randint(1000, 9999)) for _ in range(paragraphs)
+    ]
+    return "\n".join(
+        [rng.choice(SAUDACOES), *body, rng.choice(DESPEDIDAS), rng.choice(NOMES)]
+    )
+
+
+def generate_corpus(size: int, paragraphs: int = 3, seed: int = 42) -> Iterator[str]:
+    """
+    Gera `size` e-mails sintéticos de forma determinística
+    """
+    rng = random.Random(seed)
+    for _ in range(size):
+        yield generate_email(rng, paragraphs)
@@ -0,0 +1,236 @@
+"""
+Servidor local que imita a API de chat do OpenAI para testes de carga,
+sem custo e com latência configurável.
+
+Responde /v1/chat/completions (normal, JSON, classificação em lote e
+streaming) e /v1/models.
+A classificação é decidida por palavras-chave do corpus sintético.
+
+Uso isolado (a partir da pasta backend):
+    python -m benchmarks.fake_openai_server --port 8001 --latency 0.3
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=sk-fake uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Union
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from services.compaction_service import count_tokens
+
+IMPRODUCTIVE_KEYWORDS = (
+    "natal",
+    "ano novo",
+    "parabéns",
+    "obrigado",
+    "agradecer",
+    "aniversário",
+    "café da manhã",
+)
+
+
+def _classify(text: str) -> str:
+    lowered = text.lower()
+    if any(keyword in lowered for keyword in IMPRODUCTIVE_KEYWORDS):
+        return "Improdutivo"
+    return "Produtivo"
+
+
+def _answer(messages: list[dict[str, Any]], json_mode: bool) -> str:
+    prompt = str(messages[-1].get("content", "")) if messages else ""
+    if json_mode and '"classifications"' in prompt:
+        # Classificação em lote (micro-batching): um rótulo por bloco <email>
+        emails = re.findall(r'<email id="\d+">(.*?)</email>', prompt, re.DOTALL)
+        return json.dumps(
+            {"classifications": [_classify(email) for email in emails]},
+            ensure_ascii=False,
+        )
+    label = _classify(prompt.split("E-mail:")[-1])
+    response = (
+        "Recebemos sua solicitação e ela será processada em breve."
+        if label == "Produtivo"
+        else "Agradecemos a mensagem! Nenhuma ação adicional é necessária."
+    )
+    if json_mode:
+        return json.dumps(
+            {"classification": label, "suggested_response": response},
+            ensure_ascii=False,
+        )
+    if prompt.lstrip().startswith("Classifique"):
+        return label
+    return response
+
+
+def create_app(latency: float = 0.2, jitter: float = 0.0, error_rate: float = 0.0):
+    """
+    latency/jitter em segundos; error_rate é a fração de respostas 429
+    """
+    app = FastAPI(title="Fake OpenAI")
+    app.state.calls = 0
+    app.state.errors = 0
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.calls += 1
+        await asyncio.sleep(max(0.0, random.gauss(latency, jitter)))
+        if error_rate and random.random() < error_rate:
+            app.state.errors += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit", "type": "rate_limit"}},
+                status_code=429,
+                headers={"Retry-After": "0"},
+            )
+
+        messages = body.get("messages", [])
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        content = _answer(messages, json_mode)
+        usage = {
+            "prompt_tokens": sum(
+                count_tokens(str(m.get("content", ""))) for m in messages
+            ),
+            "completion_tokens": count_tokens(content),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "gpt-3.5-turbo")
+
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            return StreamingResponse(
+                _stream(completion_id, created, model, content, usage, include_usage),
+                media_type="text/event-stream",
+            )
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": usage,
+        }
+
+    return app
+
+
+async def _stream(
+    completion_id: str,
+    created: int,
+    model: str,
+    content: str,
+    usage: dict[str, int],
+    include_usage: bool,
+) -> AsyncIterator[str]:
+    def chunk(choices: list[Any], chunk_usage: Union[dict[str, int], None]) -> str:
+        data = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": choices,
+            "usage": chunk_usage,
+        }
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    for word in content.split(" "):
+        yield chunk(
+            [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            None,
+        )
+    yield chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}], None)
+    if include_usage:
+        yield chunk([], usage)
+    yield "data: [DONE]\n\n"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeOpenAIServer:
+    """
+    Executa o servidor falso em uma thread, para uso nos benchmarks e testes
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        port: int = 0,
+    ) -> None:
+        self.app = create_app(latency, jitter, error_rate)
+        self.port = port or free_port()
+        self._server = uvicorn.Server(
+            uvicorn.Config(
+                self.app, host="127.0.0.1", port=self.port, log_level="warning"
+            )
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    @property
+    def calls(self) -> int:
+        return self.app.state.calls
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.latency, args.jitter, args.error_rate),
+        host="127.0.0.1",
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Teste de carga do endpoint /api/v1/process-email.
+
+Sobe a API (uvicorn em um subprocesso) apontando para o servidor falso do
+OpenAI (benchmarks.fake_openai_server), com latência configurável, e dispara
+requisições concorrentes com o corpus sintético. Reporta vazão, latências
+p50/p95/p99 e a memória do servidor.
+
+Os limites --max-p95 e --min-throughput fazem o comando terminar com código 1
+quando violados, para barrar regressões no CI antes do deploy.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.load_test --requests 500 --concurrency 50 --latency 0.3
+    python -m benchmarks.load_test --mode combined --max-p95 1.0 --min-throughput 40
+    python -m benchmarks.load_test --url http://localhost:8000  # servidor já em execução
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Union
+
+import httpx
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_openai_server import FakeOpenAIServer, free_port
+from benchmarks.stats import percentile, process_memory_mb
+
+ENDPOINT = "/api/v1/process-email"
+
+
+def start_api(
+    port: int, llm_base_url: str, mode: str, cache: str
+) -> subprocess.Popen[bytes]:
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": llm_base_url,
+        "OPENAI_API_KEY": "sk-fake",
+        "OPENAPI_APIKEY": "sk-fake",
+        "LLM_PIPELINE_MODE": mode,
+        "RESULT_CACHE_BACKEND": cache,
+        # Sem atalhos locais nem arquivos: toda requisição passa pelo LLM falso
+        # (o corpus sintético é repetitivo e viraria acertos de quase-duplicatas,
+        # requisições agrupadas ou respostas por modelo)
+        "LOCAL_CLASSIFIER_PATH": "",
+        "NEAR_DUPLICATE_INDEX": "false",
+        "REQUEST_COALESCING": "false",
+        "TEMPLATE_RESPONSE_LABELS": "",
+        "JOB_QUEUE_PATH": ":memory:",
+        "LLM_WARMUP": "false",
+    }
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=backend_dir,
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get("/readiness")
+            if response.status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise TimeoutError("A API não ficou pronta a tempo.")
+
+
+async def run_load(
+    client: httpx.AsyncClient, corpus: list[str], concurrency: int
+) -> tuple[list[float], int, float]:
+    """
+    Envia o corpus com no máximo `concurrency` requisições simultâneas.
+    Retorna as latências das respostas 200, o número de erros e a duração total.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def send(email_content: str) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    ENDPOINT, data={"email_content": email_content}
+                )
+            except httpx.HTTPError:
+                errors += 1
+                return
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(email_content) for email_content in corpus))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run(args: argparse.Namespace) -> bool:
+    fake_server: Union[FakeOpenAIServer, None] = None
+    api: Union[subprocess.Popen[bytes], None] = None
+    base_url = args.url
+    if base_url is None:
+        fake_server = FakeOpenAIServer(args.latency, args.jitter).start()
+        port = free_port()
+        api = start_api(port, fake_server.base_url, args.mode, args.cache)
+        base_url = f"http://127.0.0.1:{port}"
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(
+            base_url=base_url, limits=limits, timeout=120
+        ) as client:
+            await wait_ready(client)
+            if args.warmup:
+                await run_load(
+                    client, list(generate_corpus(args.warmup, seed=7)), args.concurrency
+                )
+            llm_calls_before = fake_server.calls if fake_server else 0
+            corpus = list(generate_corpus(args.requests, args.paragraphs))
+            latencies, errors, elapsed = await run_load(
+                client, corpus, args.concurrency
+            )
+            memory = process_memory_mb(api.pid) if api else None
+    finally:
+        if api is not None:
+            api.terminate()
+            api.wait(timeout=10)
+        if fake_server is not None:
+            fake_server.stop()
+
+    latencies.sort()
+    throughput = len(latencies) / elapsed
+    p95 = percentile(latencies, 95)
+    print(
+        f"Requisições: {len(corpus)}  concorrência: {args.concurrency}  "
+        f"erros: {errors}  duração: {elapsed:.2f}s"
+    )
+    print(f"Vazão: {throughput:.1f} req/s")
+    print(
+        f"Latência: p50 {percentile(latencies, 50) * 1000:.0f}ms  "
+        f"p95 {p95 * 1000:.0f}ms  p99 {percentile(latencies, 99) * 1000:.0f}ms  "
+        f"máx {(latencies[-1] if latencies else 0) * 1000:.0f}ms"
+    )
+    if memory is not None:
+        print(f"Memória do servidor: {memory[0]:.0f}MB (pico {memory[1]:.0f}MB)")
+    if fake_server is not None:
+        calls = fake_server.calls - llm_calls_before
+        print(f"Chamadas ao LLM: {calls / max(1, len(corpus)):.2f} por e-mail")
+
+    passed = errors <= args.max_errors
+    if args.max_p95 is not None and p95 > args.max_p95:
+        print(f"FALHA: p95 {p95:.3f}s acima do limite de {args.max_p95}s")
+        passed = False
+    if args.min_throughput is not None and throughput < args.min_throughput:
+        print(
+            f"FALHA: vazão {throughput:.1f} req/s abaixo do mínimo de "
+            f"{args.min_throughput} req/s"
+        )
+        passed = False
+    if errors > args.max_errors:
+        print(f"FALHA: {errors} erros (máximo {args.max_errors})")
+    return passed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Latência do LLM falso (s)"
+    )
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument(
+        "--mode", default="two_call", choices=["two_call", "combined", "speculative"]
+    )
+    parser.add_argument(
+        "--cache",
+        default="none",
+        choices=["memory", "sqlite", "none"],
+        help="RESULT_CACHE_BACKEND da API (none mede o pior caso)",
+    )
+    parser.add_argument(
+        "--url", help="Testa uma API já em execução em vez de subir uma local"
+    )
+    parser.add_argument("--max-p95", type=float, help="Limite de p95 (s)")
+    parser.add_argument("--min-throughput", type=float, help="Vazão mínima (req/s)")
+    parser.add_argument("--max-errors", type=int, default=0)
+    args = parser.parse_args()
+
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Funções de apoio dos benchmarks: percentis e memória de processos.
+"""
+
+import resource
+import sys
+from typing import Union
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """
+    Percentil q (0 a 100) de uma lista já ordenada, por interpolação linear
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return (
+        sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+    )
+
+
+def peak_rss_mb() -> float:
+    """
+    Pico de memória residente do processo atual (MB)
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def process_memory_mb(pid: int) -> Union[tuple[float, float], None]:
+    """
+    Memória residente atual e de pico (MB) de outro processo, lida do /proc.
+    Retorna None fora do Linux.
+    """
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    rss = int(fields["VmRSS"].split()[0]) / 1024
+    peak = int(fields["VmHWM"].split()[0]) / 1024
+    return rss, peak
+
+
+def shared_memory_mb(pid: int) -> Union[tuple[float, float, float], None]:
+    """
+    Memória de um processo (MB) considerando as páginas compartilhadas:
+    RSS, PSS (páginas compartilhadas divididas entre os processos que as usam)
+    e USS (só as páginas exclusivas do processo). Retorna None fora do Linux.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+
+    def mb(name: str) -> float:
+        return int(fields.get(name, "0 kB").split()[0]) / 1024
+
+    return mb("Rss"), mb("Pss"), mb("Private_Clean") + mb("Private_Dirty")
+
+
+def child_pids(pid: int) -> list[int]:
+    """
+    Processos filhos diretos (Linux)
+    """
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="utf-8") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
@@ -0,0 +1,89 @@
+"""
+Classifica em lote as mensagens de um arquivo mbox ou de um diretório Maildir.
+
+As mensagens são lidas uma a uma (sem carregar o arquivo inteiro), processadas
+pelo EmailProcessingService com a mesma configuração da API (cache, índice de
+quase-duplicatas, classificador local, limites de taxa) e gravadas à medida que
+ficam prontas em JSONL ou CSV, conforme a extensão da saída. O progresso é
+salvo em um checkpoint: rodar o mesmo comando de novo retoma de onde parou.
+
+Uso (a partir da pasta backend):
+    python ingest.py caixa.mbox --output resultados.jsonl --concurrency 32
+    python ingest.py ~/Maildir/INBOX --output resultados.csv
+"""
+
+import argparse
+import asyncio
+import os
+
+from services.email_processing_service import BATCH_MAX_CONCURRENCY
+from services.ingestion_service import ingest
+from services.service_container import ServiceContainer
+
+
+async def run(args: argparse.Namespace) -> None:
+    checkpoint = args.checkpoint or f"{args.output}.checkpoint"
+    if args.restart:
+        for path in (checkpoint, f"{checkpoint}.keys", args.output):
+            if os.path.exists(path):
+                os.remove(path)
+
+    container = ServiceContainer()
+    try:
+        processed = await ingest(
+            container.email_processing_service,
+            args.source,
+            args.output,
+            checkpoint,
+            concurrency=args.concurrency,
+            checkpoint_every=args.checkpoint_every,
+            limit=args.limit,
+        )
+    finally:
+        await container.aclose()
+    print(f"Concluído: {processed} mensagens em {args.output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("source", help="Arquivo mbox ou diretório Maildir")
+    parser.add_argument(
+        "--output", required=True, help="Arquivo de saída (.jsonl ou .csv)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=BATCH_MAX_CONCURRENCY,
+        help="E-mails processados em paralelo",
+    )
+    parser.add_argument(
+        "--checkpoint", help="Arquivo de checkpoint (padrão: <saída>.checkpoint)"
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=100,
+        help="Mensagens entre dois checkpoints",
+    )
+    parser.add_argument(
+        "--limit", type=int, help="Processa no máximo N mensagens nesta execução"
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignora o checkpoint e recomeça do início (apaga a saída)",
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("Interrompido; rode o mesmo comando para retomar.")
+    except FileExistsError as e:
+        parser.exit(1, f"{e}; use --restart para recomeçar ou outra --output.\n")
+
+
+if __name__ == "__main__":
+    main()
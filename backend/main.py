@@ -1,12 +1,45 @@
-from fastapi import FastAPI
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from api.v1 import email_router
+from services.metrics_service import (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    record_error,
+    render_metrics,
+    server_timing_header,
+    start_request_timings,
+)
+from services.nlp_service import is_model_loaded
+from services.service_container import ServiceContainer
+
+# Aquece o modelo e o cliente do OpenAI em segundo plano logo após o startup
+PRELOAD_ON_STARTUP = os.getenv("PRELOAD_ON_STARTUP", "true").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cria os serviços (e o pool de conexões do OpenAI) uma única vez
+    app.state.services = ServiceContainer()
+    # Retoma os jobs pendentes de execuções anteriores (se houver)
+    await app.state.services.job_queue.resume()
+    # O servidor já aceita conexões enquanto aquece; /readiness indica quando terminou
+    if PRELOAD_ON_STARTUP:
+        app.state.services.start_warm_up()
+    yield
+    await app.state.services.aclose()
+
 
 app = FastAPI(
     title="AutoU Classificador de Emails",
     description="API para classificar emails e sugerir respostas automáticas",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 origins = ["http://localhost:5173", "https://email-classifier-sand-chi.vercel.app"]
@@ -17,8 +50,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Permite todos os métodos (GET, POST, etc. )
     allow_headers=["*"],  # Permite todos os cabeçalhos)
+    expose_headers=["Server-Timing"],  # Tempos por etapa visíveis no navegador
 )
 
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """
+    Registra a contagem e a duração das requisições e adiciona o cabeçalho
+    Server-Timing com o tempo de cada etapa do processamento do e-mail
+    """
+    timings = start_request_timings()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception as e:
+        record_error(type(e).__name__)
+        raise
+    duration = time.perf_counter() - start
+    # Usa o template da rota (ex.: /api/v1/jobs/{job_id}) para não explodir os rótulos
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    HTTP_REQUESTS.labels(request.method, path, response.status_code).inc()
+    HTTP_REQUEST_DURATION.labels(request.method, path).observe(duration)
+    if response.status_code >= 500:
+        record_error(f"http_{response.status_code}")
+    if timings:
+        response.headers["Server-Timing"] = server_timing_header(timings, duration)
+    return response
+
+
 app.include_router(email_router.router, prefix="/api/v1", tags=["Email Processing"])
 
 
@@ -30,3 +91,35 @@ async def welcome():
 @app.get("/healthcheck")
 async def health_check():
     return {"message": "OK"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Métricas no formato do Prometheus: requisições, latência por etapa,
+    tokens do LLM, acertos do cache e erros por tipo
+    """
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/readiness")
+async def readiness_check(response: Response):
+    """
+    Indica se a aplicação está pronta para processar e-mails rapidamente:
+    modelo do spacy carregado e cliente do OpenAI aquecido.
+    Diferente do /healthcheck, retorna 503 enquanto não estiver pronta.
+    Sem PRELOAD_ON_STARTUP, a primeira consulta inicia o warm-up.
+    """
+    services = getattr(app.state, "services", None)
+    model_loaded = is_model_loaded()
+    llm_client_ready = services is not None and services.llm_ready
+    ready = model_loaded and llm_client_ready
+    if not ready:
+        response.status_code = 503
+        if services is not None:
+            services.start_warm_up()
+    return {
+        "ready": ready,
+        "model_loaded": model_loaded,
+        "llm_client_ready": llm_client_ready,
+    }
@@ -0,0 +1,221 @@
+"""
+Servidor de produção com vários workers, criados por fork de um processo principal.
+
+O processo principal importa a aplicação e carrega o modelo do spaCy uma única
+vez, antes de criar os workers: as páginas de memória do modelo ficam
+compartilhadas entre eles (copy-on-write) em vez de cada worker carregar a sua
+cópia. Os workers aceitam conexões no mesmo socket e são recriados se
+terminarem inesperadamente.
+
+Para que os processos se comportem como uma única aplicação:
+- o cache de resultados passa a ser o SQLite compartilhado (RESULT_CACHE_BACKEND=sqlite);
+- o índice de quase-duplicatas (NEAR_DUPLICATE_PATH) é compartilhado; cada
+  entrada é identificada pela impressão digital, não pelo id de um processo;
+- as métricas do /metrics somam os valores de todos os workers;
+- os limites LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE e
+  LLM_MAX_CONCURRENCY são divididos entre eles, e cada um reabastece as cotas
+  por cliente com a sua fração;
+- a fila de jobs é compartilhada: os itens interrompidos voltam para a fila
+  uma única vez, no processo principal, e os itens de um worker que termina
+  voltam para a fila quando ele é recriado.
+
+Uso (a partir da pasta backend, somente Linux/macOS):
+    python serve.py --port 8000
+    WEB_CONCURRENCY=4 python serve.py
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from types import FrameType
+from typing import Union
+
+# Número de workers (padrão: um por núcleo)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# Um worker que termina antes disso é recriado só após uma pausa (evita laço de falhas)
+WORKER_MIN_UPTIME = 1.0
+
+
+def configure_environment(workers: int) -> None:
+    """
+    Ajusta a configuração que depende de haver vários processos.
+    Precisa rodar antes de importar a aplicação, que lê as variáveis no import.
+    """
+    cores = os.cpu_count() or 1
+    # Threads de pré-processamento divididas entre os workers
+    os.environ.setdefault("PREPROCESS_MAX_WORKERS", str(max(1, cores // workers)))
+    # Um cache em disco visto por todos os workers, em vez de uma cópia por processo
+    os.environ.setdefault("RESULT_CACHE_BACKEND", "sqlite")
+    os.environ["JOB_REQUEUE_ON_START"] = "false"
+    # Os limites configurados valem para a aplicação inteira
+    for name in ("LLM_REQUESTS_PER_MINUTE", "LLM_TOKENS_PER_MINUTE"):
+        limit = float(os.getenv(name, "0"))
+        if limit:
+            os.environ[name] = str(limit / workers)
+    # As cotas por cliente não são divididas: cada worker reabastece a sua
+    # fração, mas aceita lotes do tamanho da cota configurada
+    os.environ["TENANT_QUOTA_WORKERS"] = str(workers)
+    concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "0"))
+    if concurrency:
+        os.environ["LLM_MAX_CONCURRENCY"] = str(max(1, -(-concurrency // workers)))
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        # Valores de execuções anteriores não podem ser somados aos atuais
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+    else:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(
+            prefix="email-classifier-metrics-"
+        )
+
+
+def preload() -> None:
+    """
+    Carrega no processo principal o que os workers vão compartilhar
+    """
+    from services.job_service import JOB_QUEUE_PATH, JobStore
+    from services.nlp_service import warm_up as warm_up_nlp
+
+    try:
+        warm_up_nlp()
+    except Exception as e:
+        print(f"Erro ao carregar o modelo do spacy: {e}")
+    if JOB_QUEUE_PATH != ":memory:" and os.path.exists(JOB_QUEUE_PATH):
+        store = JobStore()
+        store.requeue_running()
+        # Conexões SQLite não podem ser herdadas pelos workers
+        store.close()
+    # Objetos carregados até aqui deixam de ser percorridos pelo coletor de lixo,
+    # que de outra forma escreveria nas páginas compartilhadas de cada worker
+    gc.collect()
+    gc.freeze()
+
+
+def requeue_worker_items(pid: int) -> None:
+    """
+    Devolve à fila os itens de jobs que um worker estava processando quando terminou
+    """
+    from services.job_service import JOB_QUEUE_PATH, JobStore
+
+    if JOB_QUEUE_PATH == ":memory:" or not os.path.exists(JOB_QUEUE_PATH):
+        return
+    try:
+        store = JobStore(JOB_QUEUE_PATH)
+        try:
+            requeued = store.requeue_running(claimed_by=pid)
+        finally:
+            store.close()
+    except Exception as e:
+        print(f"Erro ao devolver à fila os itens do worker {pid}: {e}")
+        return
+    if requeued:
+        print(f"{requeued} itens de jobs do worker {pid} voltaram para a fila")
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, host: str, port: int) -> None:
+    import uvicorn
+
+    from main import app
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, signal.SIG_DFL)
+    config = uvicorn.Config(app, host=host, port=port, proxy_headers=True)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(host: str, port: int, workers: int, preload_model: bool = True) -> None:
+    configure_environment(workers)
+    # Importa a aplicação (spaCy, FastAPI, OpenAI) antes do fork
+    import main  # noqa: F401
+    from prometheus_client import multiprocess
+
+    if preload_model:
+        preload()
+    sock = bind_socket(host, port)
+    children: dict[int, float] = {}
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                run_worker(sock, host, port)
+            except BaseException as e:
+                print(f"Erro no worker {os.getpid()}: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children[pid] = time.monotonic()
+
+    def stop(signum: int, frame: Union[FrameType, None]) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    print(f"Servidor em http://{host}:{port} com {workers} workers")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None:
+            continue
+        multiprocess.mark_process_dead(pid)
+        requeue_worker_items(pid)
+        if stopping:
+            continue
+        print(f"Worker {pid} terminou (status {status}); criando outro")
+        if time.monotonic() - started < WORKER_MIN_UPTIME:
+            time.sleep(WORKER_MIN_UPTIME)
+        spawn()
+    sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WEB_CONCURRENCY,
+        help="Número de workers (padrão: WEB_CONCURRENCY ou um por núcleo)",
+    )
+    parser.add_argument(
+        "--no-preload",
+        action="store_true",
+        help="Não carrega o modelo antes do fork (cada worker carrega o seu)",
+    )
+    args = parser.parse_args()
+    serve(args.host, args.port, max(1, args.workers), not args.no_preload)
+
+
+if __name__ == "__main__":
+    main()
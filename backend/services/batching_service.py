@@ -0,0 +1,118 @@
+import asyncio
+import os
+from typing import Union
+
+from services.metrics_service import LLM_BATCH_SIZE, record_error
+from services.llm_provider import AsyncLLMProvider
+from services.openai_service import VALID_CLASSIFICATIONS
+from services.scheduling_service import ClientContext, client_context, current_client
+
+# Agrupa as classificações de requisições concorrentes em uma única chamada ao OpenAI
+LLM_CLASSIFICATION_BATCHING = (
+    os.getenv("LLM_CLASSIFICATION_BATCHING", "false").lower() == "true"
+)
+# Janela de espera (ms) por mais e-mails antes de enviar o lote
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "20"))
+# Tamanho máximo do lote; ao atingi-lo o lote é enviado sem esperar a janela
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "16"))
+
+
+class ClassificationBatcher:
+    """
+    Micro-batching das classificações: os pedidos que chegam dentro de uma
+    janela curta (ou até max_size itens) são classificados em um único prompt
+    que retorna um array JSON, e cada chamador recebe o seu rótulo.
+    Se a resposta do lote for inválida, cada e-mail é classificado
+    individualmente (o mesmo vale para rótulos inválidos dentro do lote).
+
+    Cada lote enviado contém e-mails de um único cliente (e classe de
+    prioridade), para que a fila justa do LLM cobre cada chamada de quem a fez.
+    """
+
+    def __init__(
+        self,
+        openai_service: AsyncLLMProvider,
+        window: float = LLM_BATCH_WINDOW_MS / 1000,
+        max_size: int = LLM_BATCH_MAX_SIZE,
+    ) -> None:
+        self.openai_service = openai_service
+        self.window = window
+        self.max_size = max_size
+        self._pending: list[tuple[str, asyncio.Future[str], ClientContext]] = []
+        self._timer: Union[asyncio.TimerHandle, None] = None
+        # Referências aos envios em andamento (evita que sejam coletados)
+        self._flushes: set[asyncio.Task[None]] = set()
+
+    async def classify(self, email_content: str) -> str:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[str] = loop.create_future()
+        self._pending.append((email_content, future, current_client()))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batches: dict[ClientContext, list[tuple[str, asyncio.Future[str]]]] = {}
+        for text, future, client in self._pending:
+            if not future.done():
+                batches.setdefault(client, []).append((text, future))
+        self._pending = []
+        loop = asyncio.get_running_loop()
+        for client, batch in batches.items():
+            # Contexto próprio com apenas o cliente: o lote não pertence a
+            # nenhuma das requisições, mas entra na fila do LLM pelo cliente
+            task = loop.create_task(self._run(batch), context=client_context(client))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _run(self, batch: list[tuple[str, "asyncio.Future[str]"]]) -> None:
+        LLM_BATCH_SIZE.observe(len(batch))
+        texts = [text for text, _ in batch]
+        labels: list[Union[str, None]] = [None] * len(batch)
+        try:
+            if len(batch) > 1:
+                result = await self.openai_service.classify_emails(texts)
+                if result is None:
+                    record_error("BatchClassificationFallback")
+                else:
+                    labels = [
+                        label if label in VALID_CLASSIFICATIONS else None
+                        for label in result
+                    ]
+            missing = [index for index, label in enumerate(labels) if label is None]
+            individual = await asyncio.gather(
+                *(self.openai_service.classify_email(texts[i]) for i in missing)
+            )
+            for index, label in zip(missing, individual):
+                labels[index] = label
+        except BaseException as e:
+            for _, future in batch:
+                if future.done():
+                    continue
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                else:
+                    future.cancel()
+            if not isinstance(e, Exception):
+                raise
+            return
+        for (_, future), label in zip(batch, labels):
+            if not future.done():
+                future.set_result(label or "Erro na Classificação")
+
+
+def create_classification_batcher(
+    openai_service: AsyncLLMProvider,
+) -> Union[ClassificationBatcher, None]:
+    """
+    Cria o micro-batcher conforme LLM_CLASSIFICATION_BATCHING.
+    Retorna None quando desabilitado.
+    """
+    if not LLM_CLASSIFICATION_BATCHING:
+        return None
+    return ClassificationBatcher(openai_service)
@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Protocol, TypeVar, Union
+
+from typing_extensions import TypedDict
+
+from services.metrics_service import CACHE_LOOKUPS
+
+# Configuração do cache de resultados
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory")  # memory|sqlite|none
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "86400"))  # segundos
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "result_cache.sqlite3")
+
+T = TypeVar("T")
+
+
+class CacheBackend(Protocol):
+    # True se get/set fazem I/O: nas versões assíncronas rodam em uma thread
+    blocking: bool
+
+    def get(self, key: str) -> Union[str, None]: ...
+
+    def set(self, key: str, value: str) -> None: ...
+
+
+class MemoryCache:
+    """
+    Cache em memória com política LRU e expiração por TTL
+    """
+
+    blocking = False
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Union[str, None]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCache:
+    """
+    Cache persistente em disco usando SQLite, com expiração por TTL
+    e limite de entradas (remove as mais antigas)
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS result_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS result_cache_expires_at "
+            "ON result_cache (expires_at)"
+        )
+        self._conn.commit()
+        self._writes = 0
+
+    def get(self, key: str) -> Union[str, None]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM result_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < time.time():
+                self._conn.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO result_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl),
+            )
+            # A limpeza é feita a cada 100 escritas para não pesar em cada set
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self) -> None:
+        self._conn.execute(
+            "DELETE FROM result_cache WHERE expires_at < ?", (time.time(),)
+        )
+        self._conn.execute(
+            "DELETE FROM result_cache WHERE key IN ("
+            "SELECT key FROM result_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CacheStats(TypedDict):
+    hits: int
+    misses: int
+
+
+class ResultCache:
+    """
+    Cache endereçado por conteúdo para classificações e respostas sugeridas.
+    A classificação é indexada pelo hash do texto pré-processado e a resposta
+    pelo hash do conteúdo original + classificação.
+    Erros do backend (ex.: "database is locked" com vários workers) nunca
+    interrompem o processamento: uma consulta com erro conta como miss e uma
+    gravação com erro é descartada.
+    """
+
+    def __init__(self, backend: CacheBackend) -> None:
+        self.backend = backend
+        self.stats: dict[str, CacheStats] = {
+            "classification": {"hits": 0, "misses": 0},
+            "response": {"hits": 0, "misses": 0},
+        }
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def classification_key(processed_text: str) -> str:
+        digest = hashlib.sha256(processed_text.encode("utf-8")).hexdigest()
+        return f"classification:{digest}"
+
+    @staticmethod
+    def response_key(email_content: str, classification: str) -> str:
+        digest = hashlib.sha256(
+            f"{classification}\0{email_content}".encode("utf-8")
+        ).hexdigest()
+        return f"response:{digest}"
+
+    def _lookup(self, namespace: str, key: str) -> Union[str, None]:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            print(f"Erro ao consultar o cache de resultados: {e}")
+            value = None
+        with self._stats_lock:
+            self.stats[namespace]["hits" if value is not None else "misses"] += 1
+        CACHE_LOOKUPS.labels(namespace, "hit" if value is not None else "miss").inc()
+        return value
+
+    def get_classification(self, processed_text: str) -> Union[str, None]:
+        return self._lookup("classification", self.classification_key(processed_text))
+
+    def _store(self, key: str, value: str) -> None:
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            print(f"Erro ao gravar no cache de resultados: {e}")
+
+    def set_classification(self, processed_text: str, classification: str) -> None:
+        self._store(self.classification_key(processed_text), classification)
+
+    def get_response(self, email_content: str, classification: str) -> Union[str, None]:
+        return self._lookup(
+            "response", self.response_key(email_content, classification)
+        )
+
+    def set_response(
+        self, email_content: str, classification: str, response: str
+    ) -> None:
+        self._store(self.response_key(email_content, classification), response)
+
+    # Versões assíncronas: com um backend em disco, a consulta roda em uma
+    # thread para não bloquear o event loop
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self.backend.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def get_classification_async(self, processed_text: str) -> Union[str, None]:
+        return await self._run(self.get_classification, processed_text)
+
+    async def set_classification_async(
+        self, processed_text: str, classification: str
+    ) -> None:
+        await self._run(self.set_classification, processed_text, classification)
+
+    async def get_response_async(
+        self, email_content: str, classification: str
+    ) -> Union[str, None]:
+        return await self._run(self.get_response, email_content, classification)
+
+    async def set_response_async(
+        self, email_content: str, classification: str, response: str
+    ) -> None:
+        await self._run(self.set_response, email_content, classification, response)
+
+    def close(self) -> None:
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            close()
+
+
+def create_result_cache() -> Union[ResultCache, None]:
+    """
+    Cria o cache de resultados conforme RESULT_CACHE_BACKEND.
+    Retorna None quando o cache está desabilitado.
+    """
+    if RESULT_CACHE_BACKEND == "memory":
+        return ResultCache(MemoryCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL))
+    if RESULT_CACHE_BACKEND == "sqlite":
+        return ResultCache(
+            SQLiteCache(RESULT_CACHE_PATH, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL)
+        )
+    if RESULT_CACHE_BACKEND == "none":
+        return None
+    raise ValueError(f"RESULT_CACHE_BACKEND inválido: {RESULT_CACHE_BACKEND}")
@@ -0,0 +1,49 @@
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from services.metrics_service import COALESCED_REQUESTS, track_stage
+
+T = TypeVar("T")
+
+
+def content_key(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalescência de chamadas concorrentes ("single flight"): enquanto uma
+    computação para uma chave está em andamento, novas chamadas com a mesma
+    chave aguardam o mesmo resultado em vez de repetir o trabalho.
+
+    A computação roda em uma task própria: se quem a iniciou for cancelado
+    (ex.: cliente desconectou), as demais chamadas continuam aguardando.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._in_flight: dict[str, asyncio.Future[T]] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            return await asyncio.shield(task)
+
+        COALESCED_REQUESTS.labels(self.name).inc()
+        # As etapas rodam no contexto de quem iniciou; aqui só conta a espera
+        with track_stage("coalesced"):
+            return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Future[T]") -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Evita o aviso de exceção não lida quando todos os chamadores desistiram
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
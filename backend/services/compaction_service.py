@@ -0,0 +1,154 @@
+import os
+import re
+from functools import lru_cache
+from typing import Any, Union
+
+# Remove histórico citado, assinaturas e avisos legais antes de enviar ao OpenAI
+EMAIL_COMPACTION = os.getenv("EMAIL_COMPACTION", "true").lower() == "true"
+# Máximo de tokens do e-mail enviado ao OpenAI (0 = sem limite)
+LLM_INPUT_TOKEN_BUDGET = int(os.getenv("LLM_INPUT_TOKEN_BUDGET", "1500"))
+# Codificação usada pelo gpt-3.5-turbo
+TOKEN_ENCODING = "cl100k_base"
+TRUNCATION_MARKER = "\n[...]\n"
+
+# Início do histórico citado: tudo a partir daqui é descartado.
+# Os padrões usam [ \t]* no início da linha: com re.M, \s* atravessaria linhas em
+# branco e a busca ficaria quadrática no número de linhas vazias.
+QUOTE_HEADER_PATTERNS = [
+    # "Em seg., 1 de jan. de 2024, Fulano <x@y.com> escreveu:" / "On ..., X wrote:"
+    re.compile(r"^[ \t]*(Em|On)\b.*\b(escreveu|wrote)\s*:\s*$", re.I | re.M),
+    re.compile(
+        r"^[ \t]*-{2,}[ \t]*(Original Message|Mensagem original)[ \t]*-{2,}",
+        re.I | re.M,
+    ),
+    # Cabeçalho do Outlook: "De: ..." seguido de "Enviado:"/"Sent:"/"Data:"/"Date:"
+    re.compile(
+        r"^[ \t]*(De|From):[ \t].+\n[ \t]*(Enviad[oa] em|Enviado|Sent|Data|Date):",
+        re.I | re.M,
+    ),
+]
+QUOTED_LINE = re.compile(r"^[ \t]*>.*$\n?", re.M)
+# Delimitador padrão de assinatura ("-- ") e assinaturas de celular
+SIGNATURE_DELIMITER = re.compile(r"^--\s*$", re.M)
+MOBILE_SIGNATURE = re.compile(
+    r"^[ \t]*(Enviado do meu|Enviado de meu|Sent from my)\b.*$\n?", re.I | re.M
+)
+# Aviso legal: parágrafo que fala "desta mensagem" e de confidencialidade/destinatário
+DISCLAIMER_SUBJECT = re.compile(
+    r"\b(esta mensagem|este e-?mail|this (e-?mail|message))\b", re.I
+)
+DISCLAIMER_TERMS = re.compile(
+    r"(confidencia|sigil|destinat[aá]rio|intended recipient|privileged)", re.I
+)
+BLANK_LINES = re.compile(r"\n\s*\n")
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> Any:
+    """
+    Retorna o tokenizador do tiktoken, se instalado (dependência opcional).
+    Sem ele, a contagem usa a aproximação de 4 caracteres por token.
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def strip_quoted_history(text: str) -> str:
+    """
+    Corta o e-mail no início do histórico citado e remove linhas com ">"
+    """
+    cut = len(text)
+    for pattern in QUOTE_HEADER_PATTERNS:
+        match = pattern.search(text)
+        # Só corta se sobrar conteúdo antes do histórico
+        if match and text[: match.start()].strip():
+            cut = min(cut, match.start())
+    return QUOTED_LINE.sub("", text[:cut])
+
+
+def strip_signature(text: str) -> str:
+    match = SIGNATURE_DELIMITER.search(text)
+    if match and text[: match.start()].strip():
+        text = text[: match.start()]
+    return MOBILE_SIGNATURE.sub("", text)
+
+
+def strip_disclaimers(text: str) -> str:
+    paragraphs = BLANK_LINES.split(text)
+    kept = [
+        paragraph
+        for paragraph in paragraphs
+        if not (
+            DISCLAIMER_SUBJECT.search(paragraph) and DISCLAIMER_TERMS.search(paragraph)
+        )
+    ]
+    if len(kept) == len(paragraphs) or not any(p.strip() for p in kept):
+        return text
+    return "\n\n".join(kept)
+
+
+def truncate_to_budget(text: str, token_budget: int) -> str:
+    """
+    Limita o texto a token_budget tokens mantendo o início (onde costuma estar
+    o pedido) e o final (encerramento e remetente), separados por "[...]"
+    """
+    if token_budget <= 0 or count_tokens(text) <= token_budget:
+        return text
+    head_size = token_budget * 2 // 3
+    tail_size = token_budget - head_size
+    encoding = _get_encoding()
+    if encoding is None:
+        head, tail = text[: head_size * 4], text[-tail_size * 4 :]
+    else:
+        tokens = encoding.encode(text)
+        head = encoding.decode(tokens[:head_size])
+        tail = encoding.decode(tokens[-tail_size:])
+    return head.rstrip() + TRUNCATION_MARKER + tail.lstrip()
+
+
+def compact_email(
+    text: str, token_budget: int = LLM_INPUT_TOKEN_BUDGET
+) -> tuple[str, int]:
+    """
+    Remove histórico citado, assinaturas e avisos legais e limita o e-mail ao
+    orçamento de tokens. Retorna o texto compactado e os tokens economizados.
+    Se nada for removido, o texto original é retornado sem alterações.
+    """
+    compacted = strip_disclaimers(strip_signature(strip_quoted_history(text)))
+    if compacted.strip() != text.strip():
+        compacted = re.sub(r"\n{3,}", "\n\n", compacted).strip()
+    else:
+        compacted = text
+    compacted = truncate_to_budget(compacted, token_budget)
+    if compacted == text:
+        return text, 0
+    return compacted, max(0, count_tokens(text) - count_tokens(compacted))
+
+
+class EmailCompactor:
+    """
+    Etapa de compactação usada pelo EmailProcessingService antes das chamadas ao OpenAI
+    """
+
+    def __init__(self, token_budget: int = LLM_INPUT_TOKEN_BUDGET) -> None:
+        self.token_budget = token_budget
+
+    def compact(self, text: str) -> tuple[str, int]:
+        return compact_email(text, self.token_budget)
+
+
+def create_email_compactor() -> Union[EmailCompactor, None]:
+    if not EMAIL_COMPACTION:
+        return None
+    return EmailCompactor()
@@ -0,0 +1,382 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Union
+
+from typing_extensions import TypedDict
+
+from services.metrics_service import CACHE_LOOKUPS
+
+# Índice de quase-duplicatas (mesmo modelo de e-mail com nome, data ou número diferentes)
+NEAR_DUPLICATE_INDEX = os.getenv("NEAR_DUPLICATE_INDEX", "true").lower() == "true"
+# Similaridade mínima (0 a 1) entre as impressões digitais SimHash para reutilizar um resultado
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85"))
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", "50000"))
+# Arquivo SQLite onde o índice é persistido (vazio mantém o índice só em memória)
+NEAR_DUPLICATE_PATH = os.getenv("NEAR_DUPLICATE_PATH", "near_duplicates.sqlite3")
+
+# Intervalo (segundos) em que as alterações do índice são agrupadas antes de
+# irem para o disco, em uma thread própria
+NEAR_DUPLICATE_FLUSH_INTERVAL = 1.0
+
+FINGERPRINT_BITS = 64
+# Textos com poucos tokens geram impressões pouco confiáveis e não são indexados
+MIN_TOKENS = 5
+
+# Trechos da resposta que costumam ser específicos do e-mail original
+# (nomes próprios, números de protocolo, datas)
+_SLOT_PATTERN = re.compile(r"\b(?:[A-ZÀ-Ý]\w+|\w*\d(?:[\w/.-]*\w)?)")
+_WORD_PATTERN = re.compile(r"\w(?:[\w/.-]*\w)?")
+
+
+class NearDuplicateMatch(TypedDict):
+    classification: str
+    # None quando a resposta anterior cita detalhes ausentes no novo e-mail
+    suggested_response: Union[str, None]
+    similarity: float
+
+
+class _Entry(TypedDict):
+    fingerprint: int
+    classification: str
+    suggested_response: str
+    slots: list[str]
+
+
+def _words(text: str) -> set[str]:
+    return set(_WORD_PATTERN.findall(text))
+
+
+def simhash(processed_text: str) -> Union[int, None]:
+    """
+    Impressão digital SimHash de 64 bits sobre os tokens e bigramas do texto
+    pré-processado, com os números normalizados. Textos parecidos geram
+    impressões com poucos bits diferentes.
+    Retorna None para textos curtos demais.
+    """
+    # Números (datas, protocolos, valores) variam entre e-mails do mesmo modelo
+    tokens = [
+        "#" if any(char.isdigit() for char in token) else token
+        for token in processed_text.split()
+    ]
+    if len(tokens) < MIN_TOKENS:
+        return None
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    weights = [0] * FINGERPRINT_BITS
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "big")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def _fingerprint_key(fingerprint: int) -> str:
+    """
+    Chave da entrada no SQLite (a impressão em hexadecimal)
+    """
+    return f"{fingerprint:016x}"
+
+
+def similarity(a: int, b: int) -> float:
+    return 1 - bin(a ^ b).count("1") / FINGERPRINT_BITS
+
+
+def response_slots(email_content: str, response: str) -> list[str]:
+    """
+    Palavras da resposta que vieram do e-mail original (nomes, números).
+    A resposta só é reutilizada se o novo e-mail também as contiver.
+    """
+    email_words = _words(email_content)
+    return sorted(
+        {slot for slot in _SLOT_PATTERN.findall(response) if slot in email_words}
+    )
+
+
+class NearDuplicateIndex:
+    """
+    Índice SimHash com LSH por bandas: a impressão é dividida em bandas e
+    e-mails que coincidem em ao menos uma banda são comparados. Com
+    (distância máxima + 1) bandas (até 16), nenhum vizinho dentro do limite
+    é perdido.
+
+    Limitado a max_entries (remove os menos usados) e, com path, persistido em
+    SQLite e carregado no primeiro uso. As buscas e inclusões só alteram a
+    memória; uma thread grava as alterações no SQLite em lotes, fora do event loop.
+    No SQLite as entradas são identificadas pela impressão digital, e não pelo
+    id em memória, para que vários processos (serve.py) possam compartilhar o
+    arquivo sem sobrescrever ou remover as entradas uns dos outros.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, None] = None,
+        max_entries: int = NEAR_DUPLICATE_MAX_ENTRIES,
+        threshold: float = NEAR_DUPLICATE_THRESHOLD,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.max_distance = int(FINGERPRINT_BITS * (1 - threshold))
+        bands = min(self.max_distance + 1, 16)
+        bounds = [FINGERPRINT_BITS * i // bands for i in range(bands + 1)]
+        self._bands = [
+            (start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])
+        ]
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._buckets: dict[tuple[int, int], set[int]] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._conn: Union[sqlite3.Connection, None] = None
+        self._loaded = False
+        # Alterações ainda não gravadas, por impressão digital: entradas novas,
+        # uso e remoções
+        self._pending_rows: dict[str, tuple[str, str, str, float]] = {}
+        self._pending_used: dict[str, float] = {}
+        self._pending_deletes: set[str] = set()
+        self._dirty = threading.Event()
+        self._closing = threading.Event()
+        self._writer: Union[threading.Thread, None] = None
+
+    def _band_keys(self, fingerprint: int) -> list[tuple[int, int]]:
+        return [
+            (index, fingerprint >> start & mask)
+            for index, (start, mask) in enumerate(self._bands)
+        ]
+
+    def _load(self) -> None:
+        """
+        Abre o SQLite e carrega as entradas mais recentes (chamado com o lock)
+        """
+        self._loaded = True
+        if not self.path:
+            return
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS near_duplicates ("
+            "id INTEGER PRIMARY KEY, fingerprint TEXT NOT NULL, "
+            "classification TEXT NOT NULL, suggested_response TEXT NOT NULL, "
+            "slots TEXT NOT NULL, used_at REAL NOT NULL)"
+        )
+        # Arquivos antigos podem ter a mesma impressão em mais de uma linha
+        self._conn.execute(
+            "DELETE FROM near_duplicates WHERE id NOT IN "
+            "(SELECT MAX(id) FROM near_duplicates GROUP BY fingerprint)"
+        )
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS near_duplicates_fingerprint "
+            "ON near_duplicates (fingerprint)"
+        )
+        self._conn.commit()
+        rows = self._conn.execute(
+            "SELECT fingerprint, classification, suggested_response, slots "
+            "FROM near_duplicates ORDER BY used_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for fingerprint, classification, response, slots in reversed(rows):
+            self._add(
+                self._next_id,
+                {
+                    "fingerprint": int(fingerprint, 16),
+                    "classification": classification,
+                    "suggested_response": response,
+                    "slots": json.loads(slots),
+                },
+            )
+            self._next_id += 1
+
+    def _add(self, entry_id: int, entry: _Entry) -> None:
+        self._entries[entry_id] = entry
+        for key in self._band_keys(entry["fingerprint"]):
+            self._buckets.setdefault(key, set()).add(entry_id)
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        for key in self._band_keys(entry["fingerprint"]):
+            bucket = self._buckets[key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def _nearest(self, fingerprint: int) -> Union[tuple[int, float], None]:
+        candidates = set().union(
+            *(self._buckets.get(key, ()) for key in self._band_keys(fingerprint))
+        )
+        best: Union[tuple[int, float], None] = None
+        for entry_id in candidates:
+            score = similarity(fingerprint, self._entries[entry_id]["fingerprint"])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (entry_id, score)
+        return best
+
+    def lookup(
+        self, email_content: str, processed_text: str
+    ) -> Union[NearDuplicateMatch, None]:
+        fingerprint = simhash(processed_text)
+        if fingerprint is None:
+            return None
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            nearest = self._nearest(fingerprint)
+            if nearest is not None:
+                entry = self._entries[nearest[0]]
+                self._touch(nearest[0])
+        CACHE_LOOKUPS.labels("near_duplicate", "hit" if nearest else "miss").inc()
+        if nearest is None:
+            return None
+
+        email_words = _words(email_content)
+        reusable = all(slot in email_words for slot in entry["slots"])
+        return {
+            "classification": entry["classification"],
+            "suggested_response": entry["suggested_response"] if reusable else None,
+            "similarity": nearest[1],
+        }
+
+    def _touch(self, entry_id: int) -> None:
+        self._entries.move_to_end(entry_id)
+        if self._conn is not None:
+            key = _fingerprint_key(self._entries[entry_id]["fingerprint"])
+            self._pending_used[key] = time.time()
+            self._schedule_write()
+
+    def _schedule_write(self) -> None:
+        """
+        Avisa a thread de gravação (criada na primeira alteração; chamado com o lock)
+        """
+        self._dirty.set()
+        if self._writer is None:
+            self._writer = threading.Thread(
+                target=self._write_loop, name="near-duplicate-writer", daemon=True
+            )
+            self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            self._dirty.wait()
+            # Agrupa as alterações do intervalo em uma única transação
+            closing = self._closing.wait(NEAR_DUPLICATE_FLUSH_INTERVAL)
+            self._flush()
+            if closing:
+                return
+
+    def _flush(self) -> None:
+        with self._lock:
+            rows, self._pending_rows = self._pending_rows, {}
+            used, self._pending_used = self._pending_used, {}
+            deletes, self._pending_deletes = self._pending_deletes, set()
+            self._dirty.clear()
+        if self._conn is None or not (rows or used or deletes):
+            return
+        try:
+            # O id da linha é atribuído pelo SQLite, nunca pelo processo
+            self._conn.executemany(
+                "INSERT INTO near_duplicates (fingerprint, classification, "
+                "suggested_response, slots, used_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (fingerprint) DO UPDATE SET "
+                "classification = excluded.classification, "
+                "suggested_response = excluded.suggested_response, "
+                "slots = excluded.slots, used_at = excluded.used_at",
+                [(key, *row) for key, row in rows.items()],
+            )
+            self._conn.executemany(
+                "UPDATE near_duplicates SET used_at = ? WHERE fingerprint = ?",
+                [(used_at, key) for key, used_at in used.items()],
+            )
+            self._conn.executemany(
+                "DELETE FROM near_duplicates WHERE fingerprint = ?",
+                [(key,) for key in deletes],
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"Erro ao gravar o índice de quase-duplicatas: {e}")
+
+    def add(
+        self,
+        email_content: str,
+        processed_text: str,
+        classification: str,
+        suggested_response: str,
+    ) -> None:
+        fingerprint = simhash(processed_text)
+        if fingerprint is None:
+            return
+        entry: _Entry = {
+            "fingerprint": fingerprint,
+            "classification": classification,
+            "suggested_response": suggested_response,
+            "slots": response_slots(email_content, suggested_response),
+        }
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            # Uma impressão idêntica já indexada é substituída
+            nearest = self._nearest(fingerprint)
+            if nearest is not None and nearest[1] == 1.0:
+                entry_id = nearest[0]
+                self._remove(entry_id)
+            else:
+                entry_id = self._next_id
+                self._next_id += 1
+            self._add(entry_id, entry)
+
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted_id = next(iter(self._entries))
+                evicted.append(
+                    _fingerprint_key(self._entries[evicted_id]["fingerprint"])
+                )
+                self._remove(evicted_id)
+
+            if self._conn is not None:
+                key = _fingerprint_key(fingerprint)
+                self._pending_deletes.discard(key)
+                self._pending_rows[key] = (
+                    classification,
+                    suggested_response,
+                    json.dumps(entry["slots"], ensure_ascii=False),
+                    time.time(),
+                )
+                for evicted_key in evicted:
+                    self._pending_rows.pop(evicted_key, None)
+                    self._pending_used.pop(evicted_key, None)
+                    self._pending_deletes.add(evicted_key)
+                self._schedule_write()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self) -> None:
+        """
+        Grava as alterações pendentes e fecha o SQLite
+        """
+        self._closing.set()
+        self._dirty.set()
+        if self._writer is not None:
+            self._writer.join()
+        self._flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_near_duplicate_index() -> Union[NearDuplicateIndex, None]:
+    """
+    Cria o índice conforme as variáveis de ambiente.
+    Retorna None quando desabilitado.
+    """
+    if not NEAR_DUPLICATE_INDEX:
+        return None
+    return NearDuplicateIndex(
+        NEAR_DUPLICATE_PATH or None,
+        NEAR_DUPLICATE_MAX_ENTRIES,
+        NEAR_DUPLICATE_THRESHOLD,
+    )
@@ -1,30 +1,383 @@
-from services.nlp_service import preprocess_text
-from services.openai_service import OpenAIService
-from typing_extensions import TypedDict
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Union, cast
+
+from services.batching_service import ClassificationBatcher
+from services.cache_service import ResultCache
+from services.coalescing_service import SingleFlight, content_key
+from services.compaction_service import EmailCompactor
+from services.dedup_service import NearDuplicateIndex, NearDuplicateMatch
+from services.llm_provider import (
+    AsyncLLMProvider,
+    LLMProvider,
+    create_async_llm_provider,
+    create_llm_provider,
+)
+from services.local_classifier import LabelLog, LocalClassifier
+from services.metrics_service import COMPACTION_TOKENS_SAVED, track_stage
+from services.nlp_service import preprocess_text, preprocess_texts
+from services.openai_service import VALID_CLASSIFICATIONS
+from services.template_service import ResponseTemplates
+from typing_extensions import NotRequired, TypedDict
+
+# Limite de threads para o pré-processamento (spaCy é CPU-bound)
+PREPROCESS_MAX_WORKERS = int(
+    os.getenv("PREPROCESS_MAX_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+# Máximo de e-mails de um lote processados ao mesmo tempo (chamadas ao OpenAI em paralelo)
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+# "two_call": classifica e depois gera a resposta (padrão)
+# "combined": uma única chamada retorna classificação e resposta em JSON
+# "speculative": a resposta é rascunhada em paralelo à classificação (só no caminho assíncrono)
+LLM_PIPELINE_MODE = os.getenv("LLM_PIPELINE_MODE", "two_call")
+PIPELINE_MODES = ("two_call", "combined", "speculative")
+# Requisições simultâneas com o mesmo conteúdo compartilham um único processamento
+REQUEST_COALESCING = os.getenv("REQUEST_COALESCING", "true").lower() == "true"
 
 
 class EmailProcessingResult(TypedDict):
     classification: str
     suggested_response: str
+    # Tokens removidos do e-mail pela compactação antes das chamadas ao OpenAI
+    tokens_saved: NotRequired[int]
+
+
+class StreamEvent(TypedDict):
+    event: str  # "classification", "token", "done" ou "error"
+    data: dict[str, Any]
+
+
+class BatchItemResult(TypedDict):
+    index: int
+    source: str  # "texto" ou o nome do arquivo enviado
+    result: Union[EmailProcessingResult, None]
+    error: Union[str, None]
+
+
+class BatchProcessingResult(TypedDict):
+    results: list[BatchItemResult]
 
 
 class EmailProcessingService:
-    def __init__(self) -> None:
-        self.openai_service = OpenAIService()
+    def __init__(
+        self,
+        openai_service: Union[LLMProvider, None] = None,
+        async_openai_service: Union[AsyncLLMProvider, None] = None,
+        preprocess_executor: Union[ThreadPoolExecutor, None] = None,
+        result_cache: Union[ResultCache, None] = None,
+        local_classifier: Union[LocalClassifier, None] = None,
+        label_log: Union[LabelLog, None] = None,
+        compactor: Union[EmailCompactor, None] = None,
+        near_duplicate_index: Union[NearDuplicateIndex, None] = None,
+        classification_batcher: Union[ClassificationBatcher, None] = None,
+        response_templates: Union[ResponseTemplates, None] = None,
+        pipeline_mode: str = LLM_PIPELINE_MODE,
+        coalesce_requests: bool = REQUEST_COALESCING,
+    ) -> None:
+        if pipeline_mode not in PIPELINE_MODES:
+            raise ValueError(f"LLM_PIPELINE_MODE inválido: {pipeline_mode}")
+        # Os provedores são criados sob demanda (conforme LLM_PROVIDER): o caminho
+        # síncrono não precisa do cliente assíncrono e vice-versa
+        self._openai_service = openai_service
+        self._async_openai_service = async_openai_service
+        self._preprocess_executor = preprocess_executor
+        self.result_cache = result_cache
+        self.local_classifier = local_classifier
+        self.label_log = label_log
+        self.compactor = compactor
+        self.near_duplicate_index = near_duplicate_index
+        self.classification_batcher = classification_batcher
+        self.response_templates = response_templates
+        self.pipeline_mode = pipeline_mode
+        self._in_flight: Union[SingleFlight[EmailProcessingResult], None] = (
+            SingleFlight("process_email") if coalesce_requests else None
+        )
+
+    @property
+    def openai_service(self) -> LLMProvider:
+        if self._openai_service is None:
+            self._openai_service = create_llm_provider()
+        return self._openai_service
+
+    @property
+    def async_openai_service(self) -> AsyncLLMProvider:
+        if self._async_openai_service is None:
+            self._async_openai_service = create_async_llm_provider()
+        return self._async_openai_service
+
+    @property
+    def preprocess_executor(self) -> ThreadPoolExecutor:
+        if self._preprocess_executor is None:
+            self._preprocess_executor = ThreadPoolExecutor(
+                max_workers=PREPROCESS_MAX_WORKERS, thread_name_prefix="preprocess"
+            )
+        return self._preprocess_executor
 
     def process_email(self, email_content: str) -> EmailProcessingResult:
         """
         Processa um e-mail: pré-processa o texto, classifica e gera uma resposta
         """
 
+        email_content, tokens_saved = self._compact(email_content)
+
         # etapa 1
-        processed_text = preprocess_text(email_content)
+        with track_stage("preprocess"):
+            processed_text = preprocess_text(email_content)
+
+        result = self._classify_and_respond(email_content, processed_text)
+        return self._with_tokens_saved(result, tokens_saved)
+
+    async def process_email_async(self, email_content: str) -> EmailProcessingResult:
+        """
+        Versão assíncrona de process_email.
+        O pré-processamento roda em um executor limitado e as chamadas ao OpenAI
+        são aguardadas sem bloquear o event loop. Chamadas simultâneas com o
+        mesmo conteúdo aguardam um único processamento.
+        """
+        return await self._coalesce(
+            email_content, lambda: self._process_email_async(email_content)
+        )
+
+    async def _process_email_async(self, email_content: str) -> EmailProcessingResult:
+        loop = asyncio.get_running_loop()
+        email_content, tokens_saved = await self._compact_async(email_content)
+
+        # etapa 1
+        with track_stage("preprocess"):
+            processed_text = await loop.run_in_executor(
+                self.preprocess_executor, preprocess_text, email_content
+            )
+
+        result = await self._classify_and_respond_async(email_content, processed_text)
+        return self._with_tokens_saved(result, tokens_saved)
+
+    async def stream_email_async(
+        self, email_content: str
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Processa um e-mail emitindo eventos à medida que ficam prontos:
+        a classificação assim que conhecida, os trechos da resposta conforme
+        chegam do OpenAI e, ao final, o resultado completo.
+        """
+        loop = asyncio.get_running_loop()
+        email_content, tokens_saved = await self._compact_async(email_content)
+
+        # etapa 1
+        with track_stage("preprocess"):
+            processed_text = await loop.run_in_executor(
+                self.preprocess_executor, preprocess_text, email_content
+            )
+
+        # etapa 2 (um e-mail quase idêntico já classificado dispensa o OpenAI)
+        match = self._find_near_duplicate(email_content, processed_text)
+        if match is not None:
+            classification = match["classification"]
+        else:
+            classification = await self._classify_async(processed_text)
+        yield {"event": "classification", "data": {"classification": classification}}
+
+        # etapa 3 (em streaming)
+        suggested_response = match["suggested_response"] if match else None
+        if suggested_response is None:
+            suggested_response = self._template_response(email_content, classification)
+        if suggested_response is None and self.result_cache is not None:
+            suggested_response = await self.result_cache.get_response_async(
+                email_content, classification
+            )
+        if suggested_response is not None:
+            yield {"event": "token", "data": {"text": suggested_response}}
+        else:
+            parts: list[str] = []
+            try:
+                with track_stage("response"):
+                    async for part in self.async_openai_service.stream_response(
+                        email_content, classification
+                    ):
+                        parts.append(part)
+                        yield {"event": "token", "data": {"text": part}}
+                suggested_response = "".join(parts).strip()
+                await self._store_response_async(
+                    email_content, classification, suggested_response
+                )
+                self._index_near_duplicate(
+                    email_content, processed_text, classification, suggested_response
+                )
+            except Exception as e:
+                print(f"Erro ao gerar resposta com OpenAI: {e}")
+                suggested_response = "Erro na Geração de Resposta"
+                yield {"event": "error", "data": {"detail": suggested_response}}
+
+        result: EmailProcessingResult = {
+            "classification": classification,
+            "suggested_response": suggested_response,
+        }
+        yield {
+            "event": "done",
+            "data": dict(self._with_tokens_saved(result, tokens_saved)),
+        }
+
+    async def process_emails_async(
+        self, email_contents: list[str], max_concurrency: int = BATCH_MAX_CONCURRENCY
+    ) -> list[Union[EmailProcessingResult, Exception]]:
+        """
+        Processa um lote de e-mails.
+        Conteúdos repetidos são processados uma única vez, o pré-processamento do
+        lote inteiro usa nlp.pipe e as chamadas ao OpenAI rodam em paralelo,
+        limitadas por max_concurrency. Retorna, na ordem de entrada, o resultado
+        ou a exceção de cada e-mail.
+        """
+        loop = asyncio.get_running_loop()
+        unique_contents = list(dict.fromkeys(email_contents))
+        compacted = await self._compact_many_async(unique_contents)
+        compacted_contents = [email_content for email_content, _ in compacted]
+
+        # etapa 1 (lote inteiro)
+        with track_stage("preprocess_batch"):
+            processed_texts = await loop.run_in_executor(
+                self.preprocess_executor,
+                lambda: list(preprocess_texts(compacted_contents)),
+            )
+
+        # etapas 2 e 3 (em paralelo, com limite)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def process_one(
+            original_content: str,
+            email_content: str,
+            tokens_saved: int,
+            processed_text: str,
+        ) -> EmailProcessingResult:
+            async def process() -> EmailProcessingResult:
+                async with semaphore:
+                    result = await self._classify_and_respond_async(
+                        email_content, processed_text
+                    )
+                return self._with_tokens_saved(result, tokens_saved)
+
+            # Junta-se a um processamento idêntico já em andamento
+            # (ex.: o mesmo e-mail enviado ao /process-email ao mesmo tempo)
+            return await self._coalesce(original_content, process)
+
+        outcomes = await asyncio.gather(
+            *(
+                process_one(original_content, email_content, tokens_saved, text)
+                for original_content, (email_content, tokens_saved), text in zip(
+                    unique_contents, compacted, processed_texts
+                )
+            ),
+            return_exceptions=True,
+        )
+        outcome_by_content = dict(zip(unique_contents, outcomes))
+
+        return [
+            cast(
+                Union[EmailProcessingResult, Exception],
+                outcome_by_content[email_content],
+            )
+            for email_content in email_contents
+        ]
+
+    def _classify_and_respond(
+        self, email_content: str, processed_text: str
+    ) -> EmailProcessingResult:
+        match = self._find_near_duplicate(email_content, processed_text)
+        if match is not None and match["suggested_response"] is not None:
+            return {
+                "classification": match["classification"],
+                "suggested_response": match["suggested_response"],
+            }
+        if match is not None:
+            # Só a classificação é reutilizada; a resposta é gerada para este e-mail
+            classification = match["classification"]
+            result: EmailProcessingResult = {
+                "classification": classification,
+                "suggested_response": self._generate_response(
+                    email_content, classification
+                ),
+            }
+        else:
+            result = self._classify_and_respond_with_llm(email_content, processed_text)
+        self._index_near_duplicate(
+            email_content,
+            processed_text,
+            result["classification"],
+            result["suggested_response"],
+        )
+        return result
+
+    async def _classify_and_respond_async(
+        self, email_content: str, processed_text: str
+    ) -> EmailProcessingResult:
+        match = self._find_near_duplicate(email_content, processed_text)
+        if match is not None and match["suggested_response"] is not None:
+            return {
+                "classification": match["classification"],
+                "suggested_response": match["suggested_response"],
+            }
+        if match is not None:
+            # Só a classificação é reutilizada; a resposta é gerada para este e-mail
+            classification = match["classification"]
+            result: EmailProcessingResult = {
+                "classification": classification,
+                "suggested_response": await self._generate_response_async(
+                    email_content, classification
+                ),
+            }
+        else:
+            result = await self._classify_and_respond_with_llm_async(
+                email_content, processed_text
+            )
+        self._index_near_duplicate(
+            email_content,
+            processed_text,
+            result["classification"],
+            result["suggested_response"],
+        )
+        return result
+
+    def _classify_and_respond_with_llm(
+        self, email_content: str, processed_text: str
+    ) -> EmailProcessingResult:
+        # modo combinado: etapas 2 e 3 em uma única chamada
+        if self.pipeline_mode == "combined":
+            result = self._classify_and_respond_combined(email_content, processed_text)
+            if result is not None:
+                return result
 
         # etapa 2
-        classification = self.openai_service.classify_email(processed_text)
+        classification = self._classify(processed_text)
 
         # etapa 3
-        suggested_response = self.openai_service.generate_response(
+        suggested_response = self._generate_response(email_content, classification)
+
+        return {
+            "classification": classification,
+            "suggested_response": suggested_response,
+        }
+
+    async def _classify_and_respond_with_llm_async(
+        self, email_content: str, processed_text: str
+    ) -> EmailProcessingResult:
+        # modo combinado: etapas 2 e 3 em uma única chamada
+        if self.pipeline_mode == "combined":
+            result = await self._classify_and_respond_combined_async(
+                email_content, processed_text
+            )
+            if result is not None:
+                return result
+
+        # modo especulativo: classificação e rascunho da resposta em paralelo
+        if self.pipeline_mode == "speculative":
+            return await self._classify_and_respond_speculative_async(
+                email_content, processed_text
+            )
+
+        # etapa 2
+        classification = await self._classify_async(processed_text)
+
+        # etapa 3
+        suggested_response = await self._generate_response_async(
             email_content, classification
         )
 
@@ -32,3 +385,394 @@ class EmailProcessingService:
             "classification": classification,
             "suggested_response": suggested_response,
         }
+
+    # No modo combinado, se a classificação já é conhecida (cache ou classificador
+    # local) só a resposta é gerada. Se a chamada combinada falhar ou o JSON for
+    # inválido, retorna None e o chamador segue o fluxo de duas chamadas.
+
+    def _classify_and_respond_combined(
+        self, email_content: str, processed_text: str
+    ) -> Union[EmailProcessingResult, None]:
+        classification = self._classify_without_llm(processed_text)
+        if classification is not None:
+            return {
+                "classification": classification,
+                "suggested_response": self._generate_response(
+                    email_content, classification
+                ),
+            }
+        with track_stage("combined"):
+            combined = self.openai_service.classify_and_respond(email_content)
+        if combined is None:
+            return None
+        return self._store_combined(email_content, processed_text, *combined)
+
+    async def _classify_and_respond_combined_async(
+        self, email_content: str, processed_text: str
+    ) -> Union[EmailProcessingResult, None]:
+        classification = await self._classify_without_llm_async(processed_text)
+        if classification is not None:
+            return {
+                "classification": classification,
+                "suggested_response": await self._generate_response_async(
+                    email_content, classification
+                ),
+            }
+        with track_stage("combined"):
+            combined = await self.async_openai_service.classify_and_respond(
+                email_content
+            )
+        if combined is None:
+            return None
+        return await self._store_combined_async(
+            email_content, processed_text, *combined
+        )
+
+    async def _classify_and_respond_speculative_async(
+        self, email_content: str, processed_text: str
+    ) -> EmailProcessingResult:
+        """
+        Inicia a classificação e os rascunhos de resposta ao mesmo tempo.
+        Quando a classificação chega, mantém o rascunho do rótulo correto e
+        cancela os demais, aproximando a latência total de uma única chamada.
+        """
+        classification = await self._classify_without_llm_async(processed_text)
+        if classification is not None:
+            return {
+                "classification": classification,
+                "suggested_response": await self._generate_response_async(
+                    email_content, classification
+                ),
+            }
+
+        drafts = {
+            label: asyncio.create_task(
+                self.async_openai_service.generate_response(email_content, label)
+            )
+            for label in self._speculative_labels(processed_text)
+        }
+        try:
+            with track_stage("classification"):
+                classification = await self._classify_with_llm_async(processed_text)
+            await self._store_classification_async(processed_text, classification)
+            classification = self._fallback_classification(
+                processed_text, classification
+            )
+            draft = drafts.get(classification)
+            for label, task in drafts.items():
+                if label != classification:
+                    task.cancel()
+
+            if draft is None:
+                # Nenhum rascunho para o rótulo final: gera a resposta normalmente
+                suggested_response = await self._generate_response_async(
+                    email_content, classification
+                )
+            else:
+                # Só o tempo restante do rascunho, que já rodava em paralelo
+                with track_stage("response"):
+                    suggested_response = await draft
+                await self._store_response_async(
+                    email_content, classification, suggested_response
+                )
+        finally:
+            # Garante que nenhum rascunho continue rodando se a requisição for cancelada
+            for task in drafts.values():
+                if not task.done():
+                    task.cancel()
+
+        return {
+            "classification": classification,
+            "suggested_response": suggested_response,
+        }
+
+    def _speculative_labels(self, processed_text: str) -> list[str]:
+        """
+        Rótulos para os quais um rascunho é iniciado. Com o classificador local,
+        apenas o rótulo mais provável (mesmo abaixo do limite); sem ele, ambos.
+        Rótulos respondidos por modelo não precisam de rascunho.
+        """
+        if self.local_classifier is not None:
+            label, _ = self.local_classifier.predict(processed_text)
+            labels = [label]
+        else:
+            labels = list(VALID_CLASSIFICATIONS)
+        if self.response_templates is None:
+            return labels
+        return [
+            label for label in labels if label not in self.response_templates.labels
+        ]
+
+    def _store_combined(
+        self,
+        email_content: str,
+        processed_text: str,
+        classification: str,
+        suggested_response: str,
+    ) -> EmailProcessingResult:
+        self._store_classification(processed_text, classification)
+        # A resposta por modelo prevalece, para ser igual à dos demais modos
+        templated = self._template_response(email_content, classification)
+        if templated is not None:
+            suggested_response = templated
+        else:
+            self._store_response(email_content, classification, suggested_response)
+        return {
+            "classification": classification,
+            "suggested_response": suggested_response,
+        }
+
+    async def _store_combined_async(
+        self,
+        email_content: str,
+        processed_text: str,
+        classification: str,
+        suggested_response: str,
+    ) -> EmailProcessingResult:
+        await self._store_classification_async(processed_text, classification)
+        templated = self._template_response(email_content, classification)
+        if templated is not None:
+            suggested_response = templated
+        else:
+            await self._store_response_async(
+                email_content, classification, suggested_response
+            )
+        return {
+            "classification": classification,
+            "suggested_response": suggested_response,
+        }
+
+    def _find_near_duplicate(
+        self, email_content: str, processed_text: str
+    ) -> Union[NearDuplicateMatch, None]:
+        """
+        Procura um e-mail já processado quase idêntico (mesmo modelo com nome,
+        data ou número diferentes) para reutilizar a classificação e, quando
+        não cita detalhes do e-mail original, a resposta
+        """
+        if self.near_duplicate_index is None:
+            return None
+        with track_stage("near_duplicate"):
+            return self.near_duplicate_index.lookup(email_content, processed_text)
+
+    def _index_near_duplicate(
+        self,
+        email_content: str,
+        processed_text: str,
+        classification: str,
+        suggested_response: str,
+    ) -> None:
+        if (
+            self.near_duplicate_index is not None
+            and classification in VALID_CLASSIFICATIONS
+            and not suggested_response.startswith("Erro")
+        ):
+            self.near_duplicate_index.add(
+                email_content, processed_text, classification, suggested_response
+            )
+
+    def _compact(self, email_content: str) -> tuple[str, int]:
+        """
+        Remove histórico citado, assinaturas e avisos legais e aplica o orçamento
+        de tokens. Retorna o conteúdo usado nas etapas seguintes e os tokens economizados.
+        """
+        if self.compactor is None:
+            return email_content, 0
+        with track_stage("compaction"):
+            email_content, tokens_saved = self.compactor.compact(email_content)
+        COMPACTION_TOKENS_SAVED.inc(tokens_saved)
+        return email_content, tokens_saved
+
+    async def _compact_async(self, email_content: str) -> tuple[str, int]:
+        """
+        Versão assíncrona de _compact: as expressões regulares e a contagem de
+        tokens rodam no executor de pré-processamento, fora do event loop.
+        """
+        return (await self._compact_many_async([email_content]))[0]
+
+    async def _compact_many_async(
+        self, email_contents: list[str]
+    ) -> list[tuple[str, int]]:
+        if self.compactor is None:
+            return [(email_content, 0) for email_content in email_contents]
+        compactor = self.compactor
+        loop = asyncio.get_running_loop()
+        with track_stage("compaction"):
+            compacted = await loop.run_in_executor(
+                self.preprocess_executor,
+                lambda: [compactor.compact(content) for content in email_contents],
+            )
+        COMPACTION_TOKENS_SAVED.inc(sum(tokens_saved for _, tokens_saved in compacted))
+        return compacted
+
+    async def _coalesce(
+        self,
+        email_content: str,
+        process: Callable[[], Awaitable[EmailProcessingResult]],
+    ) -> EmailProcessingResult:
+        if self._in_flight is None:
+            return await process()
+        result = await self._in_flight.do(content_key(email_content), process)
+        # Cada chamador recebe sua própria cópia do resultado compartilhado
+        return result.copy()
+
+    @staticmethod
+    def _with_tokens_saved(
+        result: EmailProcessingResult, tokens_saved: int
+    ) -> EmailProcessingResult:
+        if tokens_saved:
+            result["tokens_saved"] = tokens_saved
+        return result
+
+    # Cada etapa consulta o cache antes de chamar o OpenAI e só guarda
+    # resultados válidos (mensagens de erro nunca são armazenadas)
+
+    def _classify(self, processed_text: str) -> str:
+        classification = self._classify_without_llm(processed_text)
+        if classification is not None:
+            return classification
+        with track_stage("classification"):
+            classification = self.openai_service.classify_email(processed_text)
+        self._store_classification(processed_text, classification)
+        return self._fallback_classification(processed_text, classification)
+
+    async def _classify_async(self, processed_text: str) -> str:
+        classification = await self._classify_without_llm_async(processed_text)
+        if classification is not None:
+            return classification
+        with track_stage("classification"):
+            classification = await self._classify_with_llm_async(processed_text)
+        await self._store_classification_async(processed_text, classification)
+        return self._fallback_classification(processed_text, classification)
+
+    async def _classify_with_llm_async(self, processed_text: str) -> str:
+        """
+        Classifica pelo OpenAI; com o micro-batching ativo, o pedido é agrupado
+        com os de outras requisições concorrentes em uma única chamada
+        """
+        if self.classification_batcher is not None:
+            return await self.classification_batcher.classify(processed_text)
+        return await self.async_openai_service.classify_email(processed_text)
+
+    def _classify_without_llm(self, processed_text: str) -> Union[str, None]:
+        """
+        Tenta classificar sem o OpenAI: primeiro pelo cache, depois pelo
+        classificador local (apenas quando a confiança atinge o limite)
+        """
+        if self.result_cache is not None:
+            cached = self.result_cache.get_classification(processed_text)
+            if cached is not None:
+                return cached
+        if self.local_classifier is not None:
+            return self.local_classifier.classify(processed_text)
+        return None
+
+    async def _classify_without_llm_async(
+        self, processed_text: str
+    ) -> Union[str, None]:
+        if self.result_cache is not None:
+            cached = await self.result_cache.get_classification_async(processed_text)
+            if cached is not None:
+                return cached
+        if self.local_classifier is not None:
+            return self.local_classifier.classify(processed_text)
+        return None
+
+    def _fallback_classification(self, processed_text: str, classification: str) -> str:
+        """
+        Se o OpenAI falhou (erro, circuito aberto ou prazo esgotado), usa a
+        previsão do classificador local, mesmo abaixo do limite de confiança
+        """
+        if classification in VALID_CLASSIFICATIONS or self.local_classifier is None:
+            return classification
+        label, _ = self.local_classifier.predict(processed_text)
+        return label
+
+    def _template_response(
+        self, email_content: str, classification: str
+    ) -> Union[str, None]:
+        """
+        Resposta por modelo local (sem chamar o LLM) para as categorias
+        configuradas, como Improdutivo
+        """
+        if self.response_templates is None:
+            return None
+        with track_stage("template"):
+            return self.response_templates.render(email_content, classification)
+
+    def _generate_response(self, email_content: str, classification: str) -> str:
+        templated = self._template_response(email_content, classification)
+        if templated is not None:
+            return templated
+        if self.result_cache is not None:
+            cached = self.result_cache.get_response(email_content, classification)
+            if cached is not None:
+                return cached
+        with track_stage("response"):
+            response = self.openai_service.generate_response(
+                email_content, classification
+            )
+        self._store_response(email_content, classification, response)
+        return response
+
+    async def _generate_response_async(
+        self, email_content: str, classification: str
+    ) -> str:
+        templated = self._template_response(email_content, classification)
+        if templated is not None:
+            return templated
+        if self.result_cache is not None:
+            cached = await self.result_cache.get_response_async(
+                email_content, classification
+            )
+            if cached is not None:
+                return cached
+        with track_stage("response"):
+            response = await self.async_openai_service.generate_response(
+                email_content, classification
+            )
+        await self._store_response_async(email_content, classification, response)
+        return response
+
+    def _store_classification(self, processed_text: str, classification: str) -> None:
+        if classification not in VALID_CLASSIFICATIONS:
+            return
+        if self.result_cache is not None:
+            self.result_cache.set_classification(processed_text, classification)
+        # Rótulos do OpenAI alimentam o treino do classificador local
+        if self.label_log is not None:
+            self.label_log.append(processed_text, classification)
+
+    async def _store_classification_async(
+        self, processed_text: str, classification: str
+    ) -> None:
+        if classification not in VALID_CLASSIFICATIONS:
+            return
+        if self.result_cache is not None:
+            await self.result_cache.set_classification_async(
+                processed_text, classification
+            )
+        if self.label_log is not None:
+            self.label_log.append(processed_text, classification)
+
+    def _store_response(
+        self, email_content: str, classification: str, response: str
+    ) -> None:
+        if (
+            self.result_cache is not None
+            and classification in VALID_CLASSIFICATIONS
+            and not response.startswith("Erro")
+        ):
+            self.result_cache.set_response(email_content, classification, response)
+
+    async def _store_response_async(
+        self, email_content: str, classification: str, response: str
+    ) -> None:
+        if (
+            self.result_cache is not None
+            and classification in VALID_CLASSIFICATIONS
+            and not response.startswith("Erro")
+        ):
+            await self.result_cache.set_response_async(
+                email_content, classification, response
+            )
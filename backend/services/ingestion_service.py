@@ -0,0 +1,334 @@
+import asyncio
+import csv
+import json
+import os
+import time
+from collections import deque
+from typing import IO, Iterator, Union
+
+from typing_extensions import TypedDict
+
+from services.email_processing_service import EmailProcessingService
+from services.job_service import EMPTY_CONTENT_ERROR, PROCESSING_ERROR
+from services.upload_service import message_text, parse_message
+
+# Cada mensagem de um mbox começa com uma linha "From " após uma linha em branco
+MBOX_SEPARATOR = b"From "
+
+OUTPUT_FIELDS = (
+    "message_id",
+    "sender",
+    "subject",
+    "classification",
+    "suggested_response",
+    "error",
+)
+
+
+class IngestionRecord(TypedDict):
+    message_id: str
+    sender: str
+    subject: str
+    classification: Union[str, None]
+    suggested_response: Union[str, None]
+    error: Union[str, None]
+
+
+class Checkpoint(TypedDict):
+    source: str
+    # Onde retomar um mbox: offset em bytes após a última mensagem gravada
+    cursor: Union[str, None]
+    # Tamanho do arquivo de saída no checkpoint; o excedente é descartado ao retomar
+    output_bytes: int
+    # Tamanho do arquivo de chaves já processadas (Maildir) no checkpoint
+    keys_bytes: int
+    processed: int
+
+
+def _unescape_from(line: bytes) -> bytes:
+    # mboxrd: linhas ">From " (com um ou mais ">") do corpo ganham um ">" extra
+    stripped = line.lstrip(b">")
+    if len(stripped) < len(line) and stripped.startswith(MBOX_SEPARATOR):
+        return line[1:]
+    return line
+
+
+def iter_mbox(
+    path: str, cursor: Union[str, None] = None
+) -> Iterator[tuple[str, bytes]]:
+    """
+    Lê as mensagens de um arquivo mbox uma a uma, sem carregar o arquivo inteiro.
+    Retorna pares (cursor, mensagem); o cursor é o offset logo após a mensagem,
+    de onde a leitura é retomada.
+    """
+    position = int(cursor) if cursor else 0
+    with open(path, "rb") as f:
+        f.seek(position)
+        lines: list[bytes] = []
+        in_message = False
+        previous_blank = True
+        for line in f:
+            if previous_blank and line.startswith(MBOX_SEPARATOR):
+                if in_message:
+                    yield str(position), b"".join(lines)
+                lines = []
+                in_message = True
+            elif in_message:
+                lines.append(_unescape_from(line))
+            previous_blank = line in (b"\n", b"\r\n")
+            position += len(line)
+        if in_message:
+            yield str(position), b"".join(lines)
+
+
+def maildir_key(name: str) -> str:
+    """
+    Parte única do nome de uma mensagem do Maildir: o que vem antes de ":"
+    (as flags, como ":2,S", mudam quando a mensagem passa de new/ para cur/)
+    """
+    return name.partition(":")[0]
+
+
+def iter_maildir(
+    path: str, processed: Union[set[str], None] = None
+) -> Iterator[tuple[str, bytes]]:
+    """
+    Lê as mensagens de um diretório Maildir (cur/ e new/) em ordem estável.
+    Retorna pares (chave, mensagem); mensagens cuja chave está em processed
+    são puladas, mesmo que tenham mudado de pasta ou de flags.
+    """
+    files = sorted(
+        (maildir_key(name), f"{folder}/{name}")
+        for folder in ("cur", "new")
+        if os.path.isdir(os.path.join(path, folder))
+        for name in os.listdir(os.path.join(path, folder))
+        if not name.startswith(".")
+    )
+    for key, name in files:
+        if processed is not None and key in processed:
+            continue
+        try:
+            with open(os.path.join(path, name), "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            # Movida entre new/ e cur/ por outro cliente durante a leitura; como
+            # não foi processada, é lida na próxima execução
+            continue
+        yield key, raw
+
+
+def iter_mailbox(
+    path: str, cursor: Union[str, None] = None, processed: Union[set[str], None] = None
+) -> Iterator[tuple[str, bytes]]:
+    if os.path.isdir(path):
+        return iter_maildir(path, processed)
+    return iter_mbox(path, cursor)
+
+
+class ResultWriter:
+    """
+    Grava os resultados em JSONL ou CSV (conforme a extensão) à medida que
+    ficam prontos. Ao retomar, descarta o que foi gravado após o checkpoint.
+    """
+
+    def __init__(self, path: str, output_bytes: int = 0) -> None:
+        self.path = path
+        self.format = "csv" if path.lower().endswith(".csv") else "jsonl"
+        if os.path.exists(path):
+            os.truncate(path, output_bytes)
+        self._file: IO[str] = open(path, "a", encoding="utf-8", newline="")
+        self._csv = csv.DictWriter(self._file, fieldnames=OUTPUT_FIELDS)
+        if self.format == "csv" and output_bytes == 0:
+            self._csv.writeheader()
+
+    def write(self, record: IngestionRecord) -> None:
+        if self.format == "csv":
+            self._csv.writerow(dict(record))
+        else:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def sync(self) -> int:
+        """
+        Garante que o gravado está em disco e retorna o tamanho do arquivo
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return os.path.getsize(self.path)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ProcessedKeys:
+    """
+    Chaves das mensagens de um Maildir já gravadas na saída, uma por linha.
+    Como na saída, ao retomar descarta o que foi gravado após o checkpoint.
+    """
+
+    def __init__(self, path: str, keys_bytes: int = 0) -> None:
+        self.path = path
+        self.keys: set[str] = set()
+        if os.path.exists(path):
+            os.truncate(path, keys_bytes)
+            with open(path, encoding="utf-8") as f:
+                self.keys = {line.rstrip("\n") for line in f}
+        self._file: IO[str] = open(path, "a", encoding="utf-8")
+
+    def add(self, key: str) -> None:
+        self.keys.add(key)
+        self._file.write(key + "\n")
+
+    def sync(self) -> int:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return os.path.getsize(self.path)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def load_checkpoint(path: str, source: str) -> Union[Checkpoint, None]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        checkpoint: Checkpoint = json.load(f)
+    if checkpoint["source"] != os.path.abspath(source):
+        raise ValueError(
+            f"O checkpoint {path} pertence a outra origem: {checkpoint['source']}"
+        )
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: Checkpoint) -> None:
+    # Grava em um arquivo temporário e substitui: nunca fica um checkpoint pela metade
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+async def process_message(
+    service: EmailProcessingService, key: str, raw: bytes
+) -> IngestionRecord:
+    record: IngestionRecord = {
+        "message_id": key,
+        "sender": "",
+        "subject": "",
+        "classification": None,
+        "suggested_response": None,
+        "error": None,
+    }
+    # Uma mensagem malformada vira uma linha de erro em vez de interromper a
+    # execução (o que, com o checkpoint antes dela, se repetiria a cada retomada)
+    try:
+        message = parse_message(raw)
+        record["message_id"] = str(message.get("message-id") or key)
+        record["sender"] = str(message.get("from") or "")
+        record["subject"] = str(message.get("subject") or "")
+        content = message_text(message)
+    except Exception as e:
+        print(f"Erro ao interpretar a mensagem {key}: {e}")
+        record["error"] = PROCESSING_ERROR
+        return record
+    if not content.strip():
+        record["error"] = EMPTY_CONTENT_ERROR
+        return record
+    try:
+        result = await service.process_email_async(content)
+    except Exception as e:
+        print(f"Erro interno ao processar a mensagem {key}: {e}")
+        record["error"] = PROCESSING_ERROR
+        return record
+    record["classification"] = result["classification"]
+    record["suggested_response"] = result["suggested_response"]
+    return record
+
+
+async def ingest(
+    service: EmailProcessingService,
+    source: str,
+    output: str,
+    checkpoint_path: str,
+    concurrency: int = 16,
+    checkpoint_every: int = 100,
+    limit: Union[int, None] = None,
+) -> int:
+    """
+    Processa as mensagens de um mbox ou Maildir com até `concurrency` e-mails
+    em paralelo. Os resultados são gravados na ordem de leitura, o que permite
+    salvar no checkpoint a posição da origem (offset do mbox ou chaves das
+    mensagens do Maildir, em "<checkpoint>.keys") e o tamanho da saída juntos:
+    uma execução interrompida retoma exatamente de onde parou.
+    Retorna o total de mensagens processadas (incluindo execuções anteriores).
+    Sem checkpoint, uma saída que já existe não é sobrescrita (FileExistsError).
+    """
+    checkpoint = load_checkpoint(checkpoint_path, source)
+    if checkpoint is None:
+        if os.path.exists(output) and os.path.getsize(output) > 0:
+            raise FileExistsError(
+                f"A saída {output} já existe e não há checkpoint para retomar"
+            )
+        checkpoint = {
+            "source": os.path.abspath(source),
+            "cursor": None,
+            "output_bytes": 0,
+            "keys_bytes": 0,
+            "processed": 0,
+        }
+    keys = (
+        ProcessedKeys(f"{checkpoint_path}.keys", checkpoint.get("keys_bytes", 0))
+        if os.path.isdir(source)
+        else None
+    )
+    writer = ResultWriter(output, checkpoint["output_bytes"])
+    in_flight: deque[tuple[str, asyncio.Task[IngestionRecord]]] = deque()
+    resumed_from = checkpoint["processed"]
+    started = time.perf_counter()
+
+    def sync() -> None:
+        checkpoint["output_bytes"] = writer.sync()
+        if keys is not None:
+            checkpoint["keys_bytes"] = keys.sync()
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    async def write_oldest() -> None:
+        cursor, task = in_flight.popleft()
+        writer.write(await task)
+        if keys is not None:
+            keys.add(cursor)
+        else:
+            checkpoint["cursor"] = cursor
+        checkpoint["processed"] += 1
+        if checkpoint["processed"] % checkpoint_every == 0:
+            sync()
+            done = checkpoint["processed"] - resumed_from
+            print(
+                f"{checkpoint['processed']} mensagens processadas "
+                f"({done / (time.perf_counter() - started):.1f}/s)"
+            )
+
+    try:
+        for count, (cursor, raw) in enumerate(
+            iter_mailbox(
+                source, checkpoint["cursor"], keys.keys if keys is not None else None
+            )
+        ):
+            if limit is not None and count >= limit:
+                break
+            in_flight.append(
+                (cursor, asyncio.create_task(process_message(service, cursor, raw)))
+            )
+            if len(in_flight) >= concurrency:
+                await write_oldest()
+        while in_flight:
+            await write_oldest()
+    finally:
+        for _, task in in_flight:
+            task.cancel()
+        sync()
+        writer.close()
+        if keys is not None:
+            keys.close()
+    return checkpoint["processed"]
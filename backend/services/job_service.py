@@ -0,0 +1,559 @@
+import asyncio
+import contextvars
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Union, cast
+from urllib.parse import urlsplit
+
+import httpx
+from typing_extensions import TypedDict
+
+from services.email_processing_service import (
+    EmailProcessingResult,
+    EmailProcessingService,
+)
+
+# Fila de jobs persistida em SQLite (":memory:" mantém a fila só no processo)
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.sqlite3")
+# E-mails processados ao mesmo tempo pelos workers da fila
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "8"))
+# Máximo de e-mails em um único job
+JOB_MAX_ITEMS = int(os.getenv("JOB_MAX_ITEMS", "100000"))
+# Jobs concluídos são removidos após este tempo (segundos)
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 86400)))
+# Devolve à fila, no startup, os itens interrompidos. Com vários workers (serve.py)
+# isso é feito uma única vez pelo processo principal, antes de criá-los
+JOB_REQUEUE_ON_START = os.getenv("JOB_REQUEUE_ON_START", "true").lower() == "true"
+# Intervalo máximo (segundos) entre verificações da fila quando ela está vazia
+JOB_POLL_INTERVAL = 1.0
+JOB_WEBHOOK_TIMEOUT = 10.0
+# Hosts aceitos no webhook_url, separados por vírgula. Vazio aceita qualquer
+# host cujos endereços sejam públicos (bloqueia rede interna, loopback e
+# link-local, como o endpoint de metadados da nuvem)
+JOB_WEBHOOK_ALLOWED_HOSTS = os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "")
+
+EMPTY_CONTENT_ERROR = "O conteúdo do e-mail não pode estar vazio."
+PROCESSING_ERROR = "Erro interno ao processar o e-mail."
+
+
+class WebhookURLError(ValueError):
+    """Lançada quando o webhook_url não pode receber notificações"""
+
+
+async def check_webhook_url(url: str) -> Union[str, None]:
+    """
+    Valida o webhook_url antes de o servidor enviar requisições a ele: precisa
+    ser http(s) e, sem lista de hosts permitidos, todos os endereços do host
+    (após a resolução de DNS) precisam ser públicos.
+    Retorna o endereço validado ao qual a notificação deve se conectar, ou None
+    quando o host está na lista de hosts permitidos.
+    """
+    try:
+        parsed = urlsplit(url)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    except ValueError:
+        raise WebhookURLError("O webhook_url não é uma URL válida.")
+    host = parsed.hostname
+    if parsed.scheme not in ("http", "https") or not host:
+        raise WebhookURLError("O webhook_url deve ser uma URL http(s).")
+    allowed_hosts = {
+        name.strip().lower() for name in JOB_WEBHOOK_ALLOWED_HOSTS.split(",")
+    } - {""}
+    if allowed_hosts:
+        if host.lower() not in allowed_hosts:
+            raise WebhookURLError("O host do webhook_url não é permitido.")
+        return None
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(
+            host, port, type=socket.SOCK_STREAM
+        )
+    except socket.gaierror:
+        raise WebhookURLError("Não foi possível resolver o host do webhook_url.")
+    for *_, sockaddr in addresses:
+        # Remove o escopo de endereços IPv6 (ex.: fe80::1%eth0)
+        address = ipaddress.ip_address(str(sockaddr[0]).split("%")[0])
+        if not address.is_global:
+            raise WebhookURLError("O webhook_url aponta para um endereço interno.")
+    return str(addresses[0][4][0]).split("%")[0]
+
+
+def pin_address(request: httpx.Request, address: str) -> httpx.Request:
+    """
+    Faz a requisição conectar ao endereço já validado em vez de resolver o host
+    de novo: entre a validação e a conexão o DNS poderia passar a apontar para
+    a rede interna (DNS rebinding). O cabeçalho Host e, em https, o SNI e a
+    verificação do certificado continuam usando o nome original.
+    """
+    host = request.url.host
+    request.url = request.url.copy_with(host=address)
+    request.extensions = {**request.extensions, "sni_hostname": host}
+    return request
+
+
+class JobStatus(TypedDict):
+    job_id: str
+    status: str  # "queued", "running" ou "completed"
+    priority: int
+    total: int
+    processed: int
+    failed: int
+    progress: float  # fração concluída, de 0 a 1
+    created_at: float
+    finished_at: Union[float, None]
+
+
+class JobItemResult(TypedDict):
+    index: int
+    status: str  # "queued", "running", "done" ou "error"
+    result: Union[EmailProcessingResult, None]
+    error: Union[str, None]
+
+
+class JobResults(TypedDict):
+    job_id: str
+    offset: int
+    total: int
+    items: list[JobItemResult]
+
+
+class JobStore:
+    """
+    Fila de jobs em SQLite. Cada e-mail de um job é um item; os workers
+    retiram itens por prioridade do job (maior primeiro) e ordem de chegada.
+    Cada item retirado guarda o pid do processo que o retirou, para que os
+    itens de um worker que terminou possam voltar para a fila.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                processed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                webhook_url TEXT,
+                created_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                content TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                claimed_by INTEGER,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS job_items_queue
+                ON job_items (status, priority DESC);
+            """)
+        # Bancos criados antes da coluna claimed_by
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(job_items)")}
+        if "claimed_by" not in columns:
+            self._conn.execute("ALTER TABLE job_items ADD COLUMN claimed_by INTEGER")
+        self._conn.commit()
+
+    def create_job(
+        self,
+        email_contents: list[str],
+        priority: int = 0,
+        webhook_url: Union[str, None] = None,
+    ) -> str:
+        """
+        Registra o job e seus itens. E-mails vazios já entram como erro.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        items = [
+            (
+                job_id,
+                index,
+                priority,
+                "queued" if content.strip() else "error",
+                content,
+                None if content.strip() else EMPTY_CONTENT_ERROR,
+            )
+            for index, content in enumerate(email_contents)
+        ]
+        failed = sum(1 for item in items if item[3] == "error")
+        completed = failed == len(items)
+        with self._lock:
+            self._prune(now)
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, priority, total, failed, "
+                "webhook_url, created_at, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    "completed" if completed else "queued",
+                    priority,
+                    len(items),
+                    failed,
+                    webhook_url,
+                    now,
+                    now if completed else None,
+                ),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, idx, priority, status, content, error) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                items,
+            )
+            self._conn.commit()
+        return job_id
+
+    def claim_next(self) -> Union[tuple[str, int, str], None]:
+        """
+        Marca o próximo item da fila como "running" e o retorna
+        (job_id, índice, conteúdo), ou None se a fila estiver vazia
+        """
+        with self._lock:
+            # Seleção e marcação em um único comando: com vários processos
+            # usando o mesmo banco, um item nunca é retirado duas vezes
+            row = self._conn.execute(
+                "UPDATE job_items SET status = 'running', claimed_by = ? WHERE rowid = ("
+                "SELECT rowid FROM job_items WHERE status = 'queued' "
+                "ORDER BY priority DESC, rowid LIMIT 1) "
+                "RETURNING job_id, idx, content",
+                (os.getpid(),),
+            ).fetchone()
+            if row is None:
+                self._conn.commit()
+                return None
+            job_id, index, content = row
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running' WHERE job_id = ? AND status = 'queued'",
+                (job_id,),
+            )
+            self._conn.commit()
+            return job_id, index, content
+
+    def complete_item(
+        self,
+        job_id: str,
+        index: int,
+        result: Union[EmailProcessingResult, None] = None,
+        error: Union[str, None] = None,
+    ) -> bool:
+        """
+        Grava o resultado (ou erro) do item e atualiza o progresso do job.
+        Retorna True quando este era o último item pendente do job.
+        """
+        counter = "failed" if error is not None else "processed"
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "UPDATE job_items SET status = ?, result = ?, error = ?, content = '' "
+                    "WHERE job_id = ? AND idx = ?",
+                    (
+                        "error" if error is not None else "done",
+                        json.dumps(result, ensure_ascii=False) if result else None,
+                        error,
+                        job_id,
+                        index,
+                    ),
+                )
+                self._conn.execute(
+                    f"UPDATE jobs SET {counter} = {counter} + 1 WHERE job_id = ?",
+                    (job_id,),
+                )
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = 'completed', finished_at = ? "
+                    "WHERE job_id = ? AND status != 'completed' AND processed + failed = total",
+                    (time.time(), job_id),
+                )
+                self._conn.commit()
+            except Exception:
+                # Uma nova tentativa não pode somar de novo o que ficou pendente
+                self._conn.rollback()
+                raise
+            return cursor.rowcount > 0
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM job_items WHERE status = 'queued' LIMIT 1"
+            ).fetchone()
+        return row is not None
+
+    def requeue_running(self, claimed_by: Union[int, None] = None) -> int:
+        """
+        Devolve à fila os itens que estavam em processamento quando o servidor
+        parou, ou só os do processo claimed_by (um worker que terminou).
+        Retorna quantos itens voltaram para a fila.
+        """
+        query = "UPDATE job_items SET status = 'queued' WHERE status = 'running'"
+        params: tuple[int, ...] = ()
+        if claimed_by is not None:
+            query += " AND claimed_by = ?"
+            params = (claimed_by,)
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            self._conn.commit()
+            return cursor.rowcount
+
+    def get_job(self, job_id: str) -> Union[JobStatus, None]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, status, priority, total, processed, failed, "
+                "created_at, finished_at FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, status, priority, total, processed, failed, created_at, finished_at = (
+            row
+        )
+        return {
+            "job_id": job_id,
+            "status": status,
+            "priority": priority,
+            "total": total,
+            "processed": processed,
+            "failed": failed,
+            "progress": (processed + failed) / total if total else 1.0,
+            "created_at": created_at,
+            "finished_at": finished_at,
+        }
+
+    def get_webhook_url(self, job_id: str) -> Union[str, None]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT webhook_url FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 100) -> JobResults:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, status, result, error FROM job_items WHERE job_id = ? "
+                "ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, limit, offset),
+            ).fetchall()
+            (total,) = self._conn.execute(
+                "SELECT total FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone() or (0,)
+        return {
+            "job_id": job_id,
+            "offset": offset,
+            "total": total,
+            "items": [
+                {
+                    "index": index,
+                    "status": status,
+                    "result": json.loads(result) if result else None,
+                    "error": error,
+                }
+                for index, status, result, error in rows
+            ],
+        }
+
+    def _prune(self, now: float) -> None:
+        expired = (
+            "SELECT job_id FROM jobs WHERE status = 'completed' AND finished_at < ?"
+        )
+        self._conn.execute(
+            f"DELETE FROM job_items WHERE job_id IN ({expired})", (now - JOB_RETENTION,)
+        )
+        self._conn.execute(
+            "DELETE FROM jobs WHERE status = 'completed' AND finished_at < ?",
+            (now - JOB_RETENTION,),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """
+    Pool de workers assíncronos que consome a fila de jobs usando o
+    EmailProcessingService. A vazão acompanha os limites de requisições/tokens
+    por minuto configurados para o OpenAI (LLM_REQUESTS_PER_MINUTE etc.).
+    As operações no SQLite rodam em threads, fora do event loop.
+    """
+
+    def __init__(
+        self,
+        email_processing_service: EmailProcessingService,
+        store: Union[JobStore, None] = None,
+        concurrency: int = JOB_WORKER_CONCURRENCY,
+    ) -> None:
+        self.email_processing_service = email_processing_service
+        # O banco da fila só é aberto quando a fila é usada
+        self._store = store
+        self._store_lock = threading.Lock()
+        self.concurrency = concurrency
+        self._workers: list[asyncio.Task[None]] = []
+        self._wake: Union[asyncio.Event, None] = None
+        self._http_client: Union[httpx.AsyncClient, None] = None
+
+    @property
+    def store(self) -> JobStore:
+        with self._store_lock:
+            if self._store is None:
+                self._store = JobStore(JOB_QUEUE_PATH)
+            return self._store
+
+    async def resume(self) -> None:
+        """
+        Chamado no startup: se a fila de uma execução anterior existe, devolve
+        os itens interrompidos à fila e inicia os workers caso haja pendências.
+        Sem pendências, o banco só é aberto no primeiro envio.
+        """
+        if JOB_QUEUE_PATH == ":memory:" or not os.path.exists(JOB_QUEUE_PATH):
+            return
+
+        def pending() -> bool:
+            if JOB_REQUEUE_ON_START:
+                self.store.requeue_running()
+            return self.store.has_pending()
+
+        if await asyncio.to_thread(pending):
+            self.start()
+
+    def start(self) -> None:
+        """
+        Inicia os workers no event loop atual (sem efeito se já estiverem rodando)
+        """
+        if self._workers:
+            return
+        self._wake = asyncio.Event()
+        # Contexto próprio: os workers não herdam o contexto (ex.: tempos do
+        # Server-Timing) da requisição que os iniciou
+        self._workers = [
+            asyncio.create_task(self._worker(), context=contextvars.Context())
+            for _ in range(self.concurrency)
+        ]
+
+    async def submit(
+        self,
+        email_contents: list[str],
+        priority: int = 0,
+        webhook_url: Union[str, None] = None,
+    ) -> JobStatus:
+        job_id = await asyncio.to_thread(
+            lambda: self.store.create_job(email_contents, priority, webhook_url)
+        )
+        self.start()
+        if self._wake is not None:
+            self._wake.set()
+        status = cast(JobStatus, await self.get_job(job_id))
+        # Job só com e-mails vazios já nasce concluído
+        if status["status"] == "completed":
+            asyncio.get_running_loop().create_task(self._notify(job_id))
+        return status
+
+    async def get_job(self, job_id: str) -> Union[JobStatus, None]:
+        return await asyncio.to_thread(lambda: self.store.get_job(job_id))
+
+    async def get_results(
+        self, job_id: str, offset: int = 0, limit: int = 100
+    ) -> JobResults:
+        return await asyncio.to_thread(
+            lambda: self.store.get_results(job_id, offset, limit)
+        )
+
+    async def _worker(self) -> None:
+        wake = self._wake
+        assert wake is not None
+        while True:
+            # Limpa o aviso antes de consultar a fila para não perder um submit
+            wake.clear()
+            try:
+                claimed = await asyncio.to_thread(lambda: self.store.claim_next())
+            except Exception as e:
+                # Ex.: "database is locked" com vários processos; tenta de novo
+                print(f"Erro ao consultar a fila de jobs: {e}")
+                claimed = None
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(wake.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, index, email_content = claimed
+            result: Union[EmailProcessingResult, None] = None
+            error: Union[str, None] = None
+            try:
+                result = await self.email_processing_service.process_email_async(
+                    email_content
+                )
+            except Exception as e:
+                print(f"Erro interno ao processar e-mail do job {job_id}: {e}")
+                error = PROCESSING_ERROR
+            try:
+                finished = await asyncio.to_thread(
+                    lambda: self.store.complete_item(job_id, index, result, error)
+                )
+            except Exception as e:
+                print(f"Erro ao gravar o resultado do job {job_id}: {e}")
+                finished = await self._fail_item(job_id, index)
+            if finished:
+                await self._notify(job_id)
+
+    async def _fail_item(self, job_id: str, index: int) -> bool:
+        """
+        Marca como erro o item cujo resultado não pôde ser gravado, para que ele
+        não fique "running" e o job possa terminar. Se nem isso for possível, o
+        item volta para a fila no próximo startup.
+        """
+        try:
+            return await asyncio.to_thread(
+                lambda: self.store.complete_item(job_id, index, error=PROCESSING_ERROR)
+            )
+        except Exception as e:
+            print(f"Erro ao marcar o item {index} do job {job_id} como falha: {e}")
+            return False
+
+    async def _notify(self, job_id: str) -> None:
+        """
+        Envia o status final do job para o webhook informado no envio.
+        O endereço é validado de novo (o DNS pode ter mudado desde o envio) e a
+        conexão é feita ao endereço validado.
+        """
+        try:
+            webhook_url = await asyncio.to_thread(
+                lambda: self.store.get_webhook_url(job_id)
+            )
+            if not webhook_url:
+                return
+            address = await check_webhook_url(webhook_url)
+            payload: Any = await self.get_job(job_id)
+        except Exception as e:
+            print(f"Erro ao notificar o webhook do job {job_id}: {e}")
+            return
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(timeout=JOB_WEBHOOK_TIMEOUT)
+        try:
+            request = self._http_client.build_request("POST", webhook_url, json=payload)
+            if address is not None:
+                request = pin_address(request, address)
+            response = await self._http_client.send(request)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Erro ao notificar o webhook do job {job_id}: {e}")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        if self._store is not None:
+            self._store.close()
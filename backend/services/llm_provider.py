@@ -0,0 +1,213 @@
+import os
+from typing import AsyncIterator, Protocol, Union
+
+import httpx
+
+from services.local_classifier import LocalClassifier, load_local_classifier
+from services.openai_service import (
+    LLM_BASE_URL,
+    VALID_CLASSIFICATIONS,
+    AsyncOpenAIService,
+    OpenAIService,
+)
+from services.scheduling_service import FairScheduler
+from services.template_service import ResponseTemplates, load_templates
+
+# Provedor usado para classificar e responder: openai, openai_compatible ou local
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
+
+LLM_PROVIDERS = ("openai", "openai_compatible", "local")
+
+# Termos que indicam mensagens sem ação necessária (felicitações, agradecimentos).
+# Incluem as formas lematizadas, pois a classificação recebe o texto pré-processado.
+IMPRODUCTIVE_TERMS = (
+    "natal",
+    "ano novo",
+    "feliz",
+    "parabén",
+    "aniversário",
+    "felicit",
+    "obrigad",
+    "obrigar",
+    "agradec",
+)
+# Termos que indicam um pedido, mesmo em uma mensagem com agradecimentos
+PRODUCTIVE_TERMS = (
+    "solicit",
+    "status",
+    "erro",
+    "problema",
+    "pedido",
+    "acesso",
+    "prazo",
+    "suporte",
+    "dúvida",
+    "urgente",
+)
+
+
+class LLMProvider(Protocol):
+    """
+    Interface usada pelo EmailProcessingService para classificar e responder.
+    Implementada pelo OpenAIService (OpenAI ou servidor compatível) e pelo
+    LocalLLMService (CPU, sem chamadas de rede).
+    """
+
+    def classify_email(self, email_content: str) -> str: ...
+
+    def generate_response(self, email_content: str, classification: str) -> str: ...
+
+    def classify_and_respond(
+        self, email_content: str
+    ) -> Union[tuple[str, str], None]: ...
+
+
+class AsyncLLMProvider(Protocol):
+    """
+    Variante assíncrona do LLMProvider, implementada pelo AsyncOpenAIService
+    e pelo AsyncLocalLLMService.
+    """
+
+    # Verdadeiro quando o provedor já respondeu (warm-up ou chamada real)
+    ready: bool
+
+    async def classify_email(self, email_content: str) -> str: ...
+
+    async def classify_emails(
+        self, email_contents: list[str]
+    ) -> Union[list[str], None]: ...
+
+    async def generate_response(
+        self, email_content: str, classification: str
+    ) -> str: ...
+
+    async def classify_and_respond(
+        self, email_content: str
+    ) -> Union[tuple[str, str], None]: ...
+
+    def stream_response(
+        self, email_content: str, classification: str
+    ) -> AsyncIterator[str]: ...
+
+    async def warm_up(self) -> bool: ...
+
+    async def close(self) -> None: ...
+
+
+class LocalLLMService:
+    """
+    Provedor em processo, sem chamadas de rede: classifica com o classificador
+    local (se houver um modelo treinado) ou por palavras-chave, e responde com
+    os modelos de resposta de todas as categorias.
+    """
+
+    def __init__(self, classifier: Union[LocalClassifier, None] = None) -> None:
+        self.classifier = classifier or load_local_classifier()
+        self.templates = ResponseTemplates(load_templates(), VALID_CLASSIFICATIONS)
+
+    def classify_email(self, email_content: str) -> str:
+        text = email_content.lower()
+        if self.classifier is not None:
+            label, _ = self.classifier.predict(text)
+            return label
+        if any(term in text for term in IMPRODUCTIVE_TERMS) and not any(
+            term in text for term in PRODUCTIVE_TERMS
+        ):
+            return "Improdutivo"
+        # Na dúvida, a mensagem recebe atenção
+        return "Produtivo"
+
+    def generate_response(self, email_content: str, classification: str) -> str:
+        response = self.templates.render(email_content, classification)
+        if response is None:
+            return "Não foi possível gerar uma resposta para esta classificação."
+        return response
+
+    def classify_and_respond(self, email_content: str) -> Union[tuple[str, str], None]:
+        classification = self.classify_email(email_content)
+        return classification, self.generate_response(email_content, classification)
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncLocalLLMService:
+    """
+    Variante assíncrona do LocalLLMService. O trabalho é curto e feito na
+    própria thread do event loop.
+    """
+
+    def __init__(self, classifier: Union[LocalClassifier, None] = None) -> None:
+        self.local = LocalLLMService(classifier)
+        # Sem chamadas de rede: pronto desde a criação
+        self.ready = True
+
+    async def classify_email(self, email_content: str) -> str:
+        return self.local.classify_email(email_content)
+
+    async def classify_emails(
+        self, email_contents: list[str]
+    ) -> Union[list[str], None]:
+        return [self.local.classify_email(content) for content in email_contents]
+
+    async def generate_response(self, email_content: str, classification: str) -> str:
+        return self.local.generate_response(email_content, classification)
+
+    async def classify_and_respond(
+        self, email_content: str
+    ) -> Union[tuple[str, str], None]:
+        return self.local.classify_and_respond(email_content)
+
+    async def stream_response(
+        self, email_content: str, classification: str
+    ) -> AsyncIterator[str]:
+        yield self.local.generate_response(email_content, classification)
+
+    async def warm_up(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        pass
+
+
+def _validate_provider(provider: str, base_url: Union[str, None]) -> None:
+    if provider not in LLM_PROVIDERS:
+        raise ValueError(
+            f"LLM_PROVIDER inválido: {provider!r} (use {', '.join(LLM_PROVIDERS)})."
+        )
+    if provider == "openai_compatible" and not base_url:
+        raise ValueError(
+            "LLM_BASE_URL é obrigatória com LLM_PROVIDER=openai_compatible."
+        )
+
+
+def create_llm_provider(
+    provider: str = LLM_PROVIDER,
+    base_url: Union[str, None] = LLM_BASE_URL,
+    http_client: Union[httpx.Client, None] = None,
+) -> LLMProvider:
+    """
+    Cria o provedor síncrono conforme LLM_PROVIDER.
+    """
+    _validate_provider(provider, base_url)
+    if provider == "local":
+        return LocalLLMService()
+    return OpenAIService(http_client=http_client, base_url=base_url)
+
+
+def create_async_llm_provider(
+    provider: str = LLM_PROVIDER,
+    base_url: Union[str, None] = LLM_BASE_URL,
+    http_client: Union[httpx.AsyncClient, None] = None,
+    scheduler: Union[FairScheduler, None] = None,
+) -> AsyncLLMProvider:
+    """
+    Cria o provedor assíncrono conforme LLM_PROVIDER.
+    O provedor local não faz chamadas de rede e dispensa o escalonador.
+    """
+    _validate_provider(provider, base_url)
+    if provider == "local":
+        return AsyncLocalLLMService()
+    return AsyncOpenAIService(
+        http_client=http_client, base_url=base_url, scheduler=scheduler
+    )
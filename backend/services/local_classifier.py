@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+from typing import Union
+
+import joblib
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline, make_pipeline
+
+from services.openai_service import VALID_CLASSIFICATIONS
+
+# Modelo local treinado com train_classifier.py (opcional)
+LOCAL_CLASSIFIER_PATH = os.getenv("LOCAL_CLASSIFIER_PATH", "local_classifier.joblib")
+# Confiança mínima para responder sem consultar o OpenAI
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.9"))
+# Arquivo JSONL onde as classificações do OpenAI são registradas para treino
+LLM_LABEL_LOG_PATH = os.getenv("LLM_LABEL_LOG_PATH", "")
+
+
+class LocalClassifier:
+    """
+    Classificador local (CPU) sobre o texto pré-processado:
+    vetorização por hashing + TF-IDF e regressão logística.
+    Só responde quando a confiança atinge o limite; os demais casos vão para o OpenAI.
+    """
+
+    def __init__(
+        self, pipeline: Pipeline, threshold: float = LOCAL_CLASSIFIER_THRESHOLD
+    ) -> None:
+        self.pipeline = pipeline
+        self.threshold = threshold
+
+    @classmethod
+    def train(
+        cls,
+        processed_texts: list[str],
+        labels: list[str],
+        threshold: float = LOCAL_CLASSIFIER_THRESHOLD,
+    ) -> "LocalClassifier":
+        pipeline = make_pipeline(
+            HashingVectorizer(
+                n_features=2**18, ngram_range=(1, 2), alternate_sign=False
+            ),
+            TfidfTransformer(),
+            LogisticRegression(max_iter=1000, class_weight="balanced"),
+        )
+        pipeline.fit(processed_texts, labels)
+        return cls(pipeline, threshold)
+
+    @classmethod
+    def load(
+        cls, path: str, threshold: float = LOCAL_CLASSIFIER_THRESHOLD
+    ) -> "LocalClassifier":
+        return cls(joblib.load(path), threshold)
+
+    def save(self, path: str) -> None:
+        joblib.dump(self.pipeline, path)
+
+    def predict(self, processed_text: str) -> tuple[str, float]:
+        """
+        Retorna a classe mais provável e sua probabilidade
+        """
+        probabilities = self.pipeline.predict_proba([processed_text])[0]
+        best = probabilities.argmax()
+        return str(self.pipeline.classes_[best]), float(probabilities[best])
+
+    def classify(self, processed_text: str) -> Union[str, None]:
+        """
+        Retorna a classificação se a confiança atingir o limite, senão None
+        """
+        label, confidence = self.predict(processed_text)
+        if confidence >= self.threshold:
+            return label
+        return None
+
+
+class LabelLog:
+    """
+    Registra em JSONL as classificações feitas pelo OpenAI,
+    usadas depois para treinar o classificador local
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, processed_text: str, classification: str) -> None:
+        if classification not in VALID_CLASSIFICATIONS:
+            return
+        line = json.dumps(
+            {"text": processed_text, "label": classification}, ensure_ascii=False
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def read(self) -> tuple[list[str], list[str]]:
+        texts: list[str] = []
+        labels: list[str] = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                texts.append(record["text"])
+                labels.append(record["label"])
+        return texts, labels
+
+
+def load_local_classifier() -> Union[LocalClassifier, None]:
+    """
+    Carrega o classificador local se o arquivo do modelo existir
+    """
+    if not os.path.exists(LOCAL_CLASSIFIER_PATH):
+        return None
+    return LocalClassifier.load(LOCAL_CLASSIFIER_PATH)
+
+
+def create_label_log() -> Union[LabelLog, None]:
+    if not LLM_LABEL_LOG_PATH:
+        return None
+    return LabelLog(LLM_LABEL_LOG_PATH)
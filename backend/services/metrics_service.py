@@ -0,0 +1,168 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Union
+
+from prometheus_client import (
+    GC_COLLECTOR,
+    PLATFORM_COLLECTOR,
+    PROCESS_COLLECTOR,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Métricas expostas em /metrics (formato Prometheus), em um registro próprio
+# da aplicação com os coletores padrão de processo, plataforma e GC
+REGISTRY = CollectorRegistry()
+for collector in (PROCESS_COLLECTOR, PLATFORM_COLLECTOR, GC_COLLECTOR):
+    REGISTRY.register(collector)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Requisições HTTP atendidas",
+    ["method", "path", "status"],
+    registry=REGISTRY,
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duração das requisições HTTP",
+    ["method", "path"],
+    registry=REGISTRY,
+)
+STAGE_DURATION = Histogram(
+    "email_stage_duration_seconds",
+    "Duração de cada etapa do processamento de um e-mail",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    registry=REGISTRY,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens consumidos nas chamadas ao LLM",
+    ["operation", "kind"],  # kind: prompt ou completion
+    registry=REGISTRY,
+)
+LLM_BATCH_SIZE = Histogram(
+    "llm_classification_batch_size",
+    "E-mails por chamada de classificação em lote (micro-batching)",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+    registry=REGISTRY,
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "llm_queue_depth",
+    "Chamadas ao LLM aguardando na fila do escalonador",
+    ["priority"],
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds",
+    "Espera na fila do escalonador antes da chamada ao LLM",
+    ["priority"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    registry=REGISTRY,
+)
+QUOTA_REJECTIONS = Counter(
+    "tenant_quota_rejections_total",
+    "Requisições recusadas por exceder a cota do cliente",
+    ["priority"],
+    registry=REGISTRY,
+)
+CACHE_LOOKUPS = Counter(
+    "result_cache_lookups_total",
+    "Consultas ao cache de resultados",
+    ["namespace", "result"],  # result: hit ou miss
+    registry=REGISTRY,
+)
+COALESCED_REQUESTS = Counter(
+    "coalesced_requests_total",
+    "Chamadas que aguardaram uma computação idêntica já em andamento",
+    ["operation"],
+    registry=REGISTRY,
+)
+TEMPLATE_RESPONSES = Counter(
+    "template_responses_total",
+    "Respostas geradas por modelo local, sem chamar o LLM",
+    ["classification", "locale"],
+    registry=REGISTRY,
+)
+COMPACTION_TOKENS_SAVED = Counter(
+    "compaction_tokens_saved_total",
+    "Tokens removidos dos e-mails pela compactação",
+    registry=REGISTRY,
+)
+ERRORS = Counter(
+    "errors_total",
+    "Erros por tipo (exceções do LLM e respostas HTTP 5xx)",
+    ["type"],
+    registry=REGISTRY,
+)
+
+# Tempos das etapas da requisição atual, usados no cabeçalho Server-Timing
+_stage_timings: ContextVar[Union[dict[str, float], None]] = ContextVar(
+    "stage_timings", default=None
+)
+
+
+def start_request_timings() -> dict[str, float]:
+    """
+    Inicia a coleta dos tempos de etapa da requisição atual.
+    O dicionário é compartilhado com as tasks criadas a partir deste contexto.
+    """
+    timings: dict[str, float] = {}
+    _stage_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """
+    Mede a duração de uma etapa: alimenta o histograma e o Server-Timing
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_DURATION.labels(stage).observe(duration)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + duration
+
+
+def server_timing_header(timings: dict[str, float], total: float) -> str:
+    """
+    Formata os tempos (em segundos) no cabeçalho Server-Timing (em milissegundos)
+    """
+    entries = [
+        f"{stage};dur={duration * 1000:.1f}" for stage, duration in timings.items()
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def record_llm_usage(operation: str, response: Any) -> None:
+    usage = getattr(response, "usage", None)
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int):
+            LLM_TOKENS.labels(operation, kind).inc(tokens)
+
+
+def record_error(error_type: str) -> None:
+    ERRORS.labels(error_type).inc()
+
+
+def render_metrics() -> bytes:
+    # Com vários workers (serve.py), cada processo grava as métricas em arquivos
+    # nesse diretório e o /metrics soma os valores de todos eles
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
@@ -1,15 +1,66 @@
+import os
+import threading
+from typing import Iterable, Iterator, Union
+
 import spacy
 import spacy.cli
 import spacy.cli.download
+from spacy.language import Language
+from spacy.tokens import Doc
 
-try:
-    nlp = spacy.load("pt_core_news_sm")
-except OSError:
-    print(
-        "Modelo 'pt_core_news_sm' não encontrado. Rodando 'python -m spacy download pt_core_news_sm'"
-    )
-    spacy.cli.download("pt_core_news_sm")  # type: ignore
-    nlp = spacy.load("pt_core_news_sm")
+MODEL_NAME = "pt_core_news_sm"
+
+# Só usamos lemas e as flags is_stop/is_punct/is_space:
+# o parser e o NER não são necessários e não são carregados
+EXCLUDED_COMPONENTS = ["parser", "ner"]
+
+# O download automático precisa de rede e bloqueia o processo; por padrão o modelo
+# deve vir instalado pelo requirements.txt
+SPACY_AUTO_DOWNLOAD = os.getenv("SPACY_AUTO_DOWNLOAD", "false").lower() == "true"
+
+# O modelo é carregado sob demanda (primeiro uso ou warm_up no lifespan da aplicação)
+_nlp: Union[Language, None] = None
+_nlp_lock = threading.Lock()
+
+
+def _load_model() -> Language:
+    try:
+        return spacy.load(MODEL_NAME, exclude=EXCLUDED_COMPONENTS)
+    except OSError:
+        if not SPACY_AUTO_DOWNLOAD:
+            raise OSError(
+                "Modelo 'pt_core_news_sm' não encontrado. Instale com "
+                "'python -m spacy download pt_core_news_sm' ou defina SPACY_AUTO_DOWNLOAD=true"
+            )
+        print(
+            "Modelo 'pt_core_news_sm' não encontrado. Rodando 'python -m spacy download pt_core_news_sm'"
+        )
+        spacy.cli.download(MODEL_NAME)  # type: ignore
+        return spacy.load(MODEL_NAME, exclude=EXCLUDED_COMPONENTS)
+
+
+def get_nlp() -> Language:
+    """
+    Retorna o modelo do spacy, carregando-o na primeira chamada.
+    É seguro chamar de várias threads: o modelo é carregado uma única vez.
+    """
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                _nlp = _load_model()
+    return _nlp
+
+
+def is_model_loaded() -> bool:
+    return _nlp is not None
+
+
+def warm_up() -> None:
+    """
+    Carrega o modelo e processa um texto curto para inicializar os componentes
+    """
+    get_nlp()("aquecimento")
 
 
 def preprocess_text(text: str) -> str:
@@ -18,8 +69,30 @@ def preprocess_text(text: str) -> str:
     Inclui tokenização, remoção de stop words e lematização
     """
 
-    doc = nlp(text.lower())  # Converte e processa com spacy
+    doc = get_nlp()(text.lower())  # Converte e processa com spacy
+
+    return _doc_to_text(doc)
+
+
+def preprocess_texts(
+    texts: Iterable[str], batch_size: int = 64, n_process: int = 1
+) -> Iterator[str]:
+    """
+    Pré-processa vários textos usando nlp.pipe, que agrupa os documentos em lotes
+    e é mais rápido que chamar preprocess_text em loop.
+    Os resultados são gerados sob demanda (na ordem de entrada), então o iterável
+    pode ser um stream maior que a memória. n_process > 1 usa vários processos.
+    """
+
+    docs = get_nlp().pipe(
+        (text.lower() for text in texts), batch_size=batch_size, n_process=n_process
+    )
+
+    for doc in docs:
+        yield _doc_to_text(doc)
+
 
+def _doc_to_text(doc: Doc) -> str:
     processed_tokens = [
         token.lemma_.lower()
         for token in doc
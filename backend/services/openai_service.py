@@ -1,52 +1,282 @@
+import json
 import os
-from openai import OpenAI
+from contextlib import nullcontext
+from functools import partial
+from typing import Any, AsyncIterator, Union
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletionMessageParam
 from dotenv import load_dotenv
 
+from services.metrics_service import record_error, record_llm_usage
+from services.resilience import Resilience, estimate_tokens
+from services.scheduling_service import FairScheduler
+
 load_dotenv()
 
+VALID_CLASSIFICATIONS = ("Produtivo", "Improdutivo")
+
+# Modelo usado nas chamadas de chat
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+# URL base de um servidor compatível com a API do OpenAI (vLLM, llama.cpp, Ollama...)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+# Chave do servidor compatível (tem precedência sobre OPENAPI_APIKEY)
+LLM_API_KEY = os.getenv("LLM_API_KEY", "")
+
+
+# As partes fixas dos prompts são montadas uma única vez, no carregamento do
+# módulo; a cada chamada só o conteúdo do e-mail é inserido
+
+_CONTACT_INSTRUCTIONS = (
+    "Para dados de contato: Meu nome: Bruno Masello, cargo: Analista Júnior."
+)
+
+_CLASSIFICATION_SYSTEM_MESSAGE: ChatCompletionMessageParam = {
+    "role": "system",
+    "content": "Você é um assistente que classifica e-mails.",
+}
+_CLASSIFICATION_PROMPT = (
+    "Classifique o seguinte e-mail em uma das categorias: 'Produtivo' ou "
+    "'Improdutivo'.\nResponda apenas com a categoria.\n\nE-mail: "
+)
+
+_RESPONSE_SYSTEM_MESSAGE: ChatCompletionMessageParam = {
+    "role": "system",
+    "content": "Você é um assistente que gera respostas automáticas para e-mails.",
+}
+_RESPONSE_PROMPTS = {
+    "Produtivo": (
+        "O e-mail a seguir foi classificado como 'Produtivo'.\n"
+        "Gere uma resposta automática profissional e concisa para este e-mail, "
+        "indicando que a solicitação será processada e que o remetente será "
+        f"contatado em breve. {_CONTACT_INSTRUCTIONS}\nE-mail: "
+    ),
+    "Improdutivo": (
+        "O e-mail a seguir foi classificado como 'Improdutivo'.\n"
+        "Gere uma resposta automática educada e breve, agradecendo a mensagem "
+        "e informando que nenhuma ação adicional é necessária. "
+        f"{_CONTACT_INSTRUCTIONS}\nE-mail: "
+    ),
+}
+
+_COMBINED_SYSTEM_MESSAGE: ChatCompletionMessageParam = {
+    "role": "system",
+    "content": "Você é um assistente que classifica e-mails e gera respostas automáticas. Responda sempre em JSON.",
+}
+_COMBINED_PROMPT = (
+    "Classifique o e-mail a seguir como 'Produtivo' ou 'Improdutivo' e gere uma "
+    "resposta automática.\n"
+    "Se for 'Produtivo', a resposta deve ser profissional e concisa, indicando que "
+    "a solicitação será processada e que o remetente será contatado em breve.\n"
+    "Se for 'Improdutivo', a resposta deve ser educada e breve, agradecendo a "
+    "mensagem e informando que nenhuma ação adicional é necessária.\n"
+    f"{_CONTACT_INSTRUCTIONS}\n"
+    "Responda apenas com um objeto JSON no formato:\n"
+    '{"classification": "Produtivo" ou "Improdutivo", '
+    '"suggested_response": "texto da resposta"}\n\nE-mail: '
+)
+
+
+def _classification_messages(email_content: str) -> list[ChatCompletionMessageParam]:
+    """
+    Monta as mensagens enviadas ao modelo para classificar um e-mail
+    """
+    return [
+        _CLASSIFICATION_SYSTEM_MESSAGE,
+        {"role": "user", "content": _CLASSIFICATION_PROMPT + email_content},
+    ]
+
+
+def _parse_classification(content: Union[str, None]) -> str:
+    """
+    Normaliza a resposta do modelo para 'Produtivo', 'Improdutivo' ou 'Desconhecido'
+    """
+    if content is None:
+        return "Erro: resposta sem conteúdo"
+    classification = content.strip()
+
+    if classification not in VALID_CLASSIFICATIONS:
+        if "Produtivo" in classification:
+            return "Produtivo"
+        elif "Improdutivo" in classification:
+            return "Improdutivo"
+        else:
+            return "Desconhecido"
+    return classification
+
+
+def _response_messages(
+    email_content: str, classification: str
+) -> Union[list[ChatCompletionMessageParam], None]:
+    """
+    Monta as mensagens para gerar a resposta automática.
+    Retorna None se a classificação não permite gerar uma resposta.
+    """
+    prompt = _RESPONSE_PROMPTS.get(classification)
+    if prompt is None:
+        return None
+    return [
+        _RESPONSE_SYSTEM_MESSAGE,
+        {"role": "user", "content": prompt + email_content},
+    ]
+
+
+def _parse_response(content: Union[str, None]) -> str:
+    if content is None:
+        return "Erro: resposta sem conteúdo"
+    return content.strip()
+
+
+def _combined_messages(email_content: str) -> list[ChatCompletionMessageParam]:
+    """
+    Monta as mensagens para classificar e responder o e-mail em uma única chamada,
+    pedindo a resposta em JSON
+    """
+    return [
+        _COMBINED_SYSTEM_MESSAGE,
+        {"role": "user", "content": _COMBINED_PROMPT + email_content},
+    ]
+
+
+def _parse_combined(content: Union[str, None]) -> Union[tuple[str, str], None]:
+    """
+    Valida estritamente a resposta JSON do modo combinado.
+    Retorna (classificação, resposta) ou None se o formato não for o esperado.
+    """
+    if content is None:
+        return None
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    classification = data.get("classification")
+    suggested_response = data.get("suggested_response")
+    if classification not in VALID_CLASSIFICATIONS:
+        return None
+    if not isinstance(suggested_response, str) or not suggested_response.strip():
+        return None
+    return classification, suggested_response.strip()
+
+
+def _batch_classification_messages(
+    email_contents: list[str],
+) -> list[ChatCompletionMessageParam]:
+    """
+    Monta as mensagens para classificar vários e-mails em uma única chamada,
+    pedindo as categorias em um array JSON na mesma ordem dos e-mails
+    """
+    emails = "\n\n".join(
+        f'<email id="{index}">\n{email_content}\n</email>'
+        for index, email_content in enumerate(email_contents, start=1)
+    )
+    return [
+        {
+            "role": "system",
+            "content": "Você é um assistente que classifica e-mails. Responda sempre em JSON.",
+        },
+        {
+            "role": "user",
+            "content": f"""Classifique cada um dos {len(email_contents)} e-mails a seguir em uma das categorias: 'Produtivo' ou 'Improdutivo'.
+                    Responda apenas com um objeto JSON no formato:
+                    {{"classifications": ["Produtivo" ou "Improdutivo", ...]}}
+                    com uma categoria por e-mail, na mesma ordem.
+
+                    {emails}""",
+        },
+    ]
+
+
+def _parse_batch_classification(
+    content: Union[str, None], expected: int
+) -> Union[list[str], None]:
+    """
+    Valida a resposta JSON da classificação em lote.
+    Retorna as categorias normalizadas (como em _parse_classification) ou None
+    se o formato ou a quantidade não forem os esperados.
+    """
+    if content is None:
+        return None
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    labels = data.get("classifications") if isinstance(data, dict) else None
+    if not isinstance(labels, list) or len(labels) != expected:
+        return None
+    if not all(isinstance(label, str) for label in labels):
+        return None
+    return [_parse_classification(label) for label in labels]
+
 
 class OpenAIService:
-    def __init__(self) -> None:
-        self.client = OpenAI(api_key=os.getenv("OPENAPI_APIKEY"))
+    def __init__(
+        self,
+        http_client: Union[httpx.Client, None] = None,
+        resilience: Union[Resilience, None] = None,
+        base_url: Union[str, None] = LLM_BASE_URL,
+        model: str = LLM_MODEL,
+    ) -> None:
+        # Servidores compatíveis locais costumam ignorar a chave, mas o SDK exige uma
+        api_key = (
+            LLM_API_KEY
+            or os.getenv("OPENAPI_APIKEY")
+            or ("sk-local" if base_url else None)
+        )
+        # As retentativas ficam a cargo da camada de resiliência, não do SDK
+        self.client = OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=http_client,
+            max_retries=0,
+        )
         if not self.client.api_key:
             raise ValueError("OPENAPI_APIKEY não encontrada nas variáveis de ambiente.")
+        self.model = model
+        self.resilience = resilience or Resilience()
+
+    def _create(
+        self,
+        operation: str,
+        messages: list[ChatCompletionMessageParam],
+        max_tokens: int,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Chama a API passando pela camada de resiliência (limite de taxa,
+        circuit breaker, prazo e retentativas) e registra tokens e erros nas métricas
+        """
+        try:
+            response = self.resilience.call(
+                partial(
+                    self.client.chat.completions.create,
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    **kwargs,
+                ),
+                estimate_tokens(messages, max_tokens),
+            )
+        except Exception as e:
+            record_error(type(e).__name__)
+            raise
+        record_llm_usage(operation, response)
+        return response
 
     def classify_email(self, email_content: str) -> str:
         """
         Classifica o conteúdo de um email como 'Produtivo' ou 'Improdutivo' usando a API do OpenAI
         """
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Você é um assistente que classifica e-mails.",
-                    },
-                    {
-                        "role": "user",
-                        "content": f"""Classifique o seguinte e-mail em uma das categorias: 'Produtivo' ou 'Improdutivo'.
-                    Responda apenas com a categoria.
-                    
-                    E-mail: {email_content}""",
-                    },
-                ],
+            response = self._create(
+                "classification",
+                _classification_messages(email_content),
                 max_tokens=10,  # Limita a reposta
                 temperature=0.1,  # Torna a resposta mais determinística
             )
-            message = response.choices[0].message
-            if message.content is None:
-                return "Erro: resposta sem conteúdo"
-            classification = message.content.strip()
-
-            if classification not in ["Produtivo", "Improdutivo"]:
-                if "Produtivo" in classification:
-                    return "Produtivo"
-                elif "Improdutivo" in classification:
-                    return "Improdutivo"
-                else:
-                    return "Desconhecido"
-            return classification
+            return _parse_classification(response.choices[0].message.content)
         except Exception as e:
             print(f"Erro ao classificar e-mail com OpenAI: {e}")
             return "Erro na Classificação"
@@ -55,41 +285,237 @@ class OpenAIService:
         """
         Gera uma reposta automática para o e-mail com base na sua classificação usando a API do OpenAI.
         """
-        prompt = ""
-        if classification == "Produtivo":
-            prompt = f"""
-                    O e-mail a seguir foi classificado como 'Produtivo'.
-                    Gere uma resposta automática profissional e concisa para este e-mail,
-                    indicando que a solicitação será processada e que o remetente será contatado em breve. Para dados de contato: Meu nome: Bruno Masello, cargo: Analista Júnior.
-                    E-mail: {email_content}
-                    """
-        elif classification == "Improdutivo":
-            prompt = f"""O e-mail a seguir foi classificado como 'Improdutivo'.
-                        Gere uma resposta automática educada e breve, agradecendo a mensagem
-                        e informando que nenhuma ação adicional é necessária. Para dados de contato: Meu nome: Bruno Masello, cargo: Analista Júnior.
-                        E-mail: {email_content}"""
-        else:
+        messages = _response_messages(email_content, classification)
+        if messages is None:
             return "Não foi possível gerar uma resposta para esta classificação."
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Ou outro modelo de sua preferência
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Você é um assistente que gera respostas automáticas para e-mails.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            response = self._create(
+                "response",
+                messages,
                 max_tokens=150,
                 temperature=0.7,
             )  # Permite um pouco mais de criatividade na resposta)
+            return _parse_response(response.choices[0].message.content)
+        except Exception as e:
+            print(f"Erro ao gerar resposta com OpenAI: {e}")
+            return "Erro na Geração de Resposta"
 
-            message = response.choices[0].message
-            if message.content is None:
-                return "Erro: resposta sem conteúdo"
-            classification = message.content.strip()
-            return classification
+    def classify_and_respond(self, email_content: str) -> Union[tuple[str, str], None]:
+        """
+        Classifica e gera a resposta em uma única chamada (resposta em JSON).
+        Retorna None se a chamada falhar ou o JSON não for válido, para que o
+        chamador use o fluxo de duas chamadas.
+        """
+        try:
+            response = self._create(
+                "combined",
+                _combined_messages(email_content),
+                max_tokens=200,
+                temperature=0.3,
+                response_format={"type": "json_object"},
+            )
+            return _parse_combined(response.choices[0].message.content)
+        except Exception as e:
+            print(f"Erro ao classificar e responder e-mail com OpenAI: {e}")
+            return None
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class AsyncOpenAIService:
+    """
+    Variante assíncrona do OpenAIService, baseada no AsyncOpenAI.
+    Não bloqueia o event loop enquanto aguarda a resposta da API.
+    """
+
+    def __init__(
+        self,
+        http_client: Union[httpx.AsyncClient, None] = None,
+        resilience: Union[Resilience, None] = None,
+        base_url: Union[str, None] = LLM_BASE_URL,
+        model: str = LLM_MODEL,
+        scheduler: Union[FairScheduler, None] = None,
+    ) -> None:
+        # Servidores compatíveis locais costumam ignorar a chave, mas o SDK exige uma
+        api_key = (
+            LLM_API_KEY
+            or os.getenv("OPENAPI_APIKEY")
+            or ("sk-local" if base_url else None)
+        )
+        # As retentativas ficam a cargo da camada de resiliência, não do SDK
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=http_client,
+            max_retries=0,
+        )
+        if not self.client.api_key:
+            raise ValueError("OPENAPI_APIKEY não encontrada nas variáveis de ambiente.")
+        self.model = model
+        self.resilience = resilience or Resilience()
+        # Fila justa entre clientes e classes de prioridade (opcional)
+        self.scheduler = scheduler
+        # Verdadeiro após o warm-up ou a primeira chamada bem-sucedida à API
+        self.ready = False
+
+    async def _create(
+        self,
+        operation: str,
+        messages: list[ChatCompletionMessageParam],
+        max_tokens: int,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Chama a API passando pelo escalonador (vez do cliente na fila justa) e
+        pela camada de resiliência (limite de taxa, circuit breaker, prazo e
+        retentativas) e registra tokens e erros nas métricas
+        """
+        estimated_tokens = estimate_tokens(messages, max_tokens)
+        try:
+            async with (
+                self.scheduler.slot(estimated_tokens)
+                if self.scheduler is not None
+                else nullcontext()
+            ):
+                response = await self.resilience.acall(
+                    partial(
+                        self.client.chat.completions.create,
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        **kwargs,
+                    ),
+                    estimated_tokens,
+                )
+        except Exception as e:
+            record_error(type(e).__name__)
+            raise
+        self.ready = True
+        # Em streaming, o uso de tokens chega no último trecho
+        if not kwargs.get("stream"):
+            record_llm_usage(operation, response)
+        return response
+
+    async def classify_email(self, email_content: str) -> str:
+        """
+        Classifica o conteúdo de um email como 'Produtivo' ou 'Improdutivo' usando a API do OpenAI
+        """
+        try:
+            response = await self._create(
+                "classification",
+                _classification_messages(email_content),
+                max_tokens=10,
+                temperature=0.1,
+            )
+            return _parse_classification(response.choices[0].message.content)
+        except Exception as e:
+            print(f"Erro ao classificar e-mail com OpenAI: {e}")
+            return "Erro na Classificação"
+
+    async def classify_emails(
+        self, email_contents: list[str]
+    ) -> Union[list[str], None]:
+        """
+        Classifica vários e-mails em uma única chamada (array JSON de categorias).
+        Retorna None se a chamada falhar ou a resposta não for válida, para que
+        o chamador classifique cada e-mail individualmente.
+        """
+        try:
+            response = await self._create(
+                "batch_classification",
+                _batch_classification_messages(email_contents),
+                max_tokens=10 * len(email_contents) + 20,
+                temperature=0.1,
+                response_format={"type": "json_object"},
+            )
+            return _parse_batch_classification(
+                response.choices[0].message.content, len(email_contents)
+            )
+        except Exception as e:
+            print(f"Erro ao classificar lote de e-mails com OpenAI: {e}")
+            return None
+
+    async def generate_response(self, email_content: str, classification: str) -> str:
+        """
+        Gera uma reposta automática para o e-mail com base na sua classificação usando a API do OpenAI.
+        """
+        messages = _response_messages(email_content, classification)
+        if messages is None:
+            return "Não foi possível gerar uma resposta para esta classificação."
+
+        try:
+            response = await self._create(
+                "response",
+                messages,
+                max_tokens=150,
+                temperature=0.7,
+            )
+            return _parse_response(response.choices[0].message.content)
         except Exception as e:
             print(f"Erro ao gerar resposta com OpenAI: {e}")
             return "Erro na Geração de Resposta"
+
+    async def classify_and_respond(
+        self, email_content: str
+    ) -> Union[tuple[str, str], None]:
+        """
+        Classifica e gera a resposta em uma única chamada (resposta em JSON).
+        Retorna None se a chamada falhar ou o JSON não for válido, para que o
+        chamador use o fluxo de duas chamadas.
+        """
+        try:
+            response = await self._create(
+                "combined",
+                _combined_messages(email_content),
+                max_tokens=200,
+                temperature=0.3,
+                response_format={"type": "json_object"},
+            )
+            return _parse_combined(response.choices[0].message.content)
+        except Exception as e:
+            print(f"Erro ao classificar e responder e-mail com OpenAI: {e}")
+            return None
+
+    async def stream_response(
+        self, email_content: str, classification: str
+    ) -> AsyncIterator[str]:
+        """
+        Gera a resposta automática em partes, à medida que os tokens chegam da API.
+        Diferente de generate_response, erros da API são propagados para quem consome o stream.
+        """
+        messages = _response_messages(email_content, classification)
+        if messages is None:
+            yield "Não foi possível gerar uma resposta para esta classificação."
+            return
+
+        stream = await self._create(
+            "response",
+            messages,
+            max_tokens=150,
+            temperature=0.7,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if chunk.usage is not None:
+                record_llm_usage("response", chunk)
+
+    async def warm_up(self) -> bool:
+        """
+        Faz uma chamada leve (lista de modelos) para abrir a conexão com a API
+        antes da primeira requisição. Retorna False se a API não respondeu.
+        """
+        try:
+            await self.client.models.list()
+            self.ready = True
+            return True
+        except Exception as e:
+            print(f"Erro ao aquecer o cliente do OpenAI: {e}")
+            return False
+
+    async def close(self) -> None:
+        await self.client.close()
@@ -0,0 +1,156 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Protocol, Union
+
+from pypdf import PdfReader
+
+# Só as primeiras páginas são lidas: bastam para classificar e responder
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "5"))
+# Texto máximo extraído por documento (caracteres); a leitura para ao atingi-lo
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "20000"))
+# Tempo máximo de extração de um documento (segundos)
+PDF_TIMEOUT = float(os.getenv("PDF_TIMEOUT", "10"))
+# Processos do pool de extração (a leitura de PDF é CPU-bound)
+PDF_MAX_WORKERS = int(os.getenv("PDF_MAX_WORKERS", "2"))
+# Cada processo é reciclado após N documentos, limitando o acúmulo de memória
+PDF_MAX_TASKS_PER_CHILD = int(os.getenv("PDF_MAX_TASKS_PER_CHILD", "50"))
+# Margem (segundos) além de PDF_TIMEOUT antes de desistir de um processo que o
+# alarme não conseguiu interromper
+PDF_TIMEOUT_MARGIN = 5.0
+
+
+class PdfExtractionError(Exception):
+    """Lançada quando o PDF é inválido ou a extração excede o tempo limite"""
+
+
+class PdfExtractorUnavailableError(Exception):
+    """Lançada quando o pool de extração caiu (ex.: um processo foi encerrado)"""
+
+
+class DocumentExtractor(Protocol):
+    """
+    Interface dos extratores de texto de documentos usados pelo router.
+    Permite trocar a implementação (ex.: outra biblioteca de PDF) no ServiceContainer.
+    """
+
+    async def extract(self, data: bytes) -> str: ...
+
+    def close(self) -> None: ...
+
+
+def _raise_timeout(signum: int, frame: object) -> None:
+    raise TimeoutError()
+
+
+def extract_pdf_text(
+    data: bytes,
+    max_pages: int = PDF_MAX_PAGES,
+    max_chars: int = PDF_MAX_CHARS,
+    timeout: float = PDF_TIMEOUT,
+) -> str:
+    """
+    Extrai o texto das primeiras páginas do PDF, uma página por vez, parando ao
+    atingir max_pages ou max_chars. Roda no processo de extração; o tempo limite
+    usa um alarme (SIGALRM) para interromper PDFs patológicos.
+    """
+    use_alarm = timeout > 0 and hasattr(signal, "setitimer")
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        parts: list[str] = []
+        total_chars = 0
+        # As páginas são interpretadas sob demanda: as demais nem são lidas
+        for page_number, page in enumerate(reader.pages):
+            if page_number >= max_pages or total_chars >= max_chars:
+                break
+            text = page.extract_text() or ""
+            parts.append(text)
+            total_chars += len(text)
+        return "\n\n".join(parts)[:max_chars]
+    except TimeoutError:
+        raise PdfExtractionError("Tempo limite excedido ao ler o PDF.")
+    except Exception as e:
+        raise PdfExtractionError(f"PDF inválido: {e}")
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+
+class PdfExtractor:
+    """
+    Extrai texto de PDFs em um pool de processos, sem bloquear o event loop
+    nem disputar o GIL com o pré-processamento
+    """
+
+    def __init__(
+        self,
+        max_pages: int = PDF_MAX_PAGES,
+        max_chars: int = PDF_MAX_CHARS,
+        timeout: float = PDF_TIMEOUT,
+        max_workers: int = PDF_MAX_WORKERS,
+    ) -> None:
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.timeout = timeout
+        self.max_workers = max_workers
+        # O pool é criado no primeiro PDF recebido
+        self._executor: Union[ProcessPoolExecutor, None] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn": o processo filho não herda as threads do servidor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=PDF_MAX_TASKS_PER_CHILD,
+            )
+        return self._executor
+
+    async def extract(self, data: bytes) -> str:
+        """
+        Extrai o texto no pool. Se o processo não responde nem após a margem do
+        tempo limite ou se o pool caiu, o pool é descartado (encerrando os seus
+        processos) e recriado no próximo PDF.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            future = loop.run_in_executor(
+                executor,
+                extract_pdf_text,
+                data,
+                self.max_pages,
+                self.max_chars,
+                self.timeout,
+            )
+            # Margem além do alarme do processo, caso ele não consiga interromper
+            return await asyncio.wait_for(future, self.timeout + PDF_TIMEOUT_MARGIN)
+        except asyncio.TimeoutError:
+            self._discard(executor)
+            raise PdfExtractionError("Tempo limite excedido ao ler o PDF.")
+        except BrokenProcessPool as e:
+            self._discard(executor)
+            raise PdfExtractorUnavailableError(f"Pool de extração indisponível: {e}")
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        if self._executor is executor:
+            self._executor = None
+        # O ProcessPoolExecutor não encerra processos em execução: sem isso, um
+        # processo travado continuaria ocupando uma vaga e a CPU
+        processes = getattr(executor, "_processes", None) or {}
+        for process in list(processes.values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
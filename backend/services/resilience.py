@@ -0,0 +1,337 @@
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, TypeVar, Union
+
+import openai
+
+T = TypeVar("T")
+
+# Tempo máximo de cada tentativa e prazo total da chamada (somando as retentativas)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "45"))
+# Retentativas com backoff exponencial e jitter em 429/5xx/timeouts
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+# Circuit breaker: abre após N falhas seguidas e tenta de novo após o intervalo
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+# Limites do lado do cliente (0 = sem limite)
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+
+
+class CircuitOpenError(Exception):
+    """Lançada quando o circuito está aberto e a chamada nem é tentada"""
+
+
+class DeadlineExceededError(Exception):
+    """Lançada quando o prazo total da chamada acaba antes de uma resposta"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Erros transitórios: limite de taxa (429), erros do servidor (5xx),
+    timeouts e falhas de conexão
+    """
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def retry_after(error: Exception) -> Union[float, None]:
+    """
+    Lê o cabeçalho Retry-After (em segundos) da resposta de erro, se houver
+    """
+    if not isinstance(error, openai.APIStatusError):
+        return None
+    value = error.response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_retries: int = LLM_MAX_RETRIES,
+        base_delay: float = LLM_RETRY_BASE_DELAY,
+        max_delay: float = LLM_RETRY_MAX_DELAY,
+    ) -> None:
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """
+        Espera antes da próxima tentativa: o Retry-After do servidor, se informado,
+        senão backoff exponencial com jitter completo
+        """
+        server_delay = retry_after(error)
+        if server_delay is not None:
+            return min(server_delay, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Depois de failure_threshold falhas seguidas, o circuito abre e as chamadas
+    falham imediatamente. Após reset_timeout, uma chamada de teste é liberada
+    (meio-aberto): se der certo o circuito fecha, se falhar volta a abrir.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Union[float, None] = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """
+        Libera ou recusa a chamada. Retorna True se ela é a chamada de teste do
+        circuito meio-aberto, que precisa ser devolvida com release_trial
+        """
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half_open" and self._trial_in_progress):
+                raise CircuitOpenError("Circuito aberto: OpenAI indisponível")
+            if state == "half_open":
+                self._trial_in_progress = True
+                return True
+            return False
+
+    def release_trial(self) -> None:
+        """
+        Libera a vaga da chamada de teste que terminou sem registrar sucesso ou
+        falha (cancelada ou com erro que não conta para o circuito)
+        """
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_progress = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class TokenBucket:
+    """
+    Balde de tokens reabastecido continuamente (rate por minuto).
+    As reservas podem deixar o saldo negativo; quem reservou espera até ele zerar.
+    Por padrão o balde comporta um minuto de reabastecimento (capacity).
+    """
+
+    def __init__(
+        self, rate_per_minute: float, capacity: Union[float, None] = None
+    ) -> None:
+        self.capacity = rate_per_minute if capacity is None else capacity
+        self.refill_per_second = rate_per_minute / 60
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Reserva a quantidade e retorna quantos segundos esperar antes de usá-la
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated_at) * self.refill_per_second,
+            )
+            self.updated_at = now
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.refill_per_second
+
+    def try_take(self, amount: float) -> float:
+        """
+        Retira a quantidade só se houver saldo. Retorna 0 se retirou ou quantos
+        segundos faltam para haver saldo (sem retirar nada). Uma quantidade
+        maior que a capacidade nunca cabe no balde e retorna infinito.
+        """
+        if amount > self.capacity:
+            return math.inf
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated_at) * self.refill_per_second,
+            )
+            self.updated_at = now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.refill_per_second
+
+
+class RateLimiter:
+    """
+    Limita requisições e tokens por minuto enviados ao OpenAI
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+    ) -> None:
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def reserve(self, estimated_tokens: int) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        return wait
+
+
+def estimate_tokens(messages: list[Any], max_tokens: int) -> int:
+    """
+    Estimativa grosseira de tokens (≈ 4 caracteres por token) para o limite por minuto
+    """
+    characters = sum(len(str(message.get("content", ""))) for message in messages)
+    return characters // 4 + max_tokens
+
+
+class Resilience:
+    """
+    Camada compartilhada pelas chamadas ao OpenAI: limite de taxa do lado do
+    cliente, circuit breaker, prazo por tentativa/total e retentativas com
+    backoff exponencial, jitter e respeito ao Retry-After.
+
+    A função chamada recebe o argumento `timeout` com o tempo da tentativa.
+    """
+
+    def __init__(
+        self,
+        retry_policy: Union[RetryPolicy, None] = None,
+        circuit_breaker: Union[CircuitBreaker, None] = None,
+        rate_limiter: Union[RateLimiter, None] = None,
+        timeout: float = LLM_TIMEOUT,
+        deadline: float = LLM_DEADLINE,
+    ) -> None:
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.timeout = timeout
+        self.deadline = deadline
+
+    def call(self, fn: Callable[..., T], estimated_tokens: int = 0) -> T:
+        # O circuito aberto falha antes de consumir o limite de taxa
+        trial = self.circuit_breaker.before_call()
+        try:
+            time.sleep(self.rate_limiter.reserve(estimated_tokens))
+            deadline_at = time.monotonic() + self.deadline
+            attempt = 0
+            while True:
+                try:
+                    result = fn(timeout=self._attempt_timeout(deadline_at))
+                except Exception as e:
+                    delay = self._handle_failure(
+                        e, attempt, deadline_at, estimated_tokens
+                    )
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                self.circuit_breaker.record_success()
+                return result
+        finally:
+            # Uma chamada de teste cancelada não pode deixar o circuito preso
+            if trial:
+                self.circuit_breaker.release_trial()
+
+    async def acall(
+        self, fn: Callable[..., Awaitable[T]], estimated_tokens: int = 0
+    ) -> T:
+        # O circuito aberto falha antes de consumir o limite de taxa
+        trial = self.circuit_breaker.before_call()
+        try:
+            await asyncio.sleep(self.rate_limiter.reserve(estimated_tokens))
+            deadline_at = time.monotonic() + self.deadline
+            attempt = 0
+            while True:
+                try:
+                    result = await fn(timeout=self._attempt_timeout(deadline_at))
+                except Exception as e:
+                    delay = self._handle_failure(
+                        e, attempt, deadline_at, estimated_tokens
+                    )
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                self.circuit_breaker.record_success()
+                return result
+        finally:
+            # Uma chamada de teste cancelada não pode deixar o circuito preso
+            if trial:
+                self.circuit_breaker.release_trial()
+
+    def _attempt_timeout(self, deadline_at: float) -> float:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError("Prazo da chamada ao OpenAI esgotado")
+        return min(self.timeout, remaining)
+
+    def _handle_failure(
+        self, error: Exception, attempt: int, deadline_at: float, estimated_tokens: int
+    ) -> float:
+        """
+        Decide se a falha será tentada de novo e retorna a espera.
+        Relança o erro quando não há mais tentativas ou prazo.
+        Só erros transitórios e prazos esgotados contam para o circuito: um 400
+        causado pela entrada de um cliente não indica OpenAI indisponível.
+        Cada retentativa é uma nova requisição e reserva de novo o limite de
+        taxa; a espera é o maior entre o backoff e essa reserva.
+        """
+        if not is_retryable(error):
+            if isinstance(error, DeadlineExceededError):
+                self.circuit_breaker.record_failure()
+            raise error
+        if attempt >= self.retry_policy.max_retries:
+            self.circuit_breaker.record_failure()
+            raise error
+        delay = max(
+            self.retry_policy.delay(attempt, error),
+            self.rate_limiter.reserve(estimated_tokens),
+        )
+        if time.monotonic() + delay >= deadline_at:
+            self.circuit_breaker.record_failure()
+            raise error
+        return delay
@@ -0,0 +1,258 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, NamedTuple, Union
+
+from services.metrics_service import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT
+from services.resilience import TokenBucket
+
+# Chamadas simultâneas ao LLM; acima disso esperam na fila justa (0 = sem fila)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "0"))
+# Peso de cada classe de prioridade na divisão da capacidade do LLM
+LLM_PRIORITY_WEIGHTS = os.getenv("LLM_PRIORITY_WEIGHTS", "interactive:4,bulk:1")
+# Cabeçalho com a chave de API do cliente
+TENANT_ID_HEADER = os.getenv("TENANT_ID_HEADER", "X-API-Key")
+# Chaves de API conhecidas e o cliente de cada uma: "chave:cliente,...". Sem
+# chave ou com uma chave fora da lista, o cliente é o IP de origem
+TENANT_API_KEYS = os.getenv("TENANT_API_KEYS", "")
+# Cota de e-mails por minuto de cada cliente (0 = sem cota)
+TENANT_REQUESTS_PER_MINUTE = float(os.getenv("TENANT_REQUESTS_PER_MINUTE", "0"))
+# Cotas específicas por cliente: "cliente:e-mails por minuto,..."
+TENANT_QUOTAS = os.getenv("TENANT_QUOTAS", "")
+# Processos que atendem a aplicação (definido pelo serve.py): cada um reabastece
+# a cota do cliente com a sua fração, mas aceita lotes do tamanho da cota inteira
+TENANT_QUOTA_WORKERS = int(os.getenv("TENANT_QUOTA_WORKERS", "1"))
+# Máximo de clientes com cota em memória (remove os menos recentes)
+TENANT_MAX_CLIENTS = 10000
+
+PRIORITY_CLASSES = ("interactive", "bulk")
+
+
+class ClientContext(NamedTuple):
+    client_id: str
+    priority: str  # "interactive" ou "bulk"
+
+
+# Cliente da requisição atual. Fora de uma requisição (fila de jobs, ingestão
+# em lote) o trabalho é interno e de baixa prioridade
+_current_client: contextvars.ContextVar[ClientContext] = contextvars.ContextVar(
+    "current_client", default=ClientContext("internal", "bulk")
+)
+
+
+def current_client() -> ClientContext:
+    return _current_client.get()
+
+
+def set_current_client(client: ClientContext) -> None:
+    """
+    Define o cliente da requisição atual; as tasks criadas a partir deste
+    contexto (e as chamadas ao LLM feitas nelas) herdam o cliente
+    """
+    _current_client.set(client)
+
+
+def client_context(client: ClientContext) -> contextvars.Context:
+    """
+    Contexto vazio com apenas o cliente definido, para tasks que não devem
+    herdar o restante do contexto de uma requisição
+    """
+    context = contextvars.Context()
+    context.run(_current_client.set, client)
+    return context
+
+
+def parse_rates(value: str) -> dict[str, float]:
+    """
+    Converte "nome:valor,nome:valor" em um dicionário
+    """
+    rates: dict[str, float] = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        name, _, rate = entry.rpartition(":")
+        if not name.strip():
+            raise ValueError(f"Entrada inválida: {entry!r} (use nome:valor)")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+@lru_cache(maxsize=1)
+def parse_tenant_keys(value: str) -> dict[str, str]:
+    """
+    Converte "chave:cliente,chave:cliente" em um dicionário chave -> cliente
+    """
+    keys: dict[str, str] = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        key, _, tenant = entry.rpartition(":")
+        if not key.strip() or not tenant.strip():
+            raise ValueError("Entrada inválida em TENANT_API_KEYS (use chave:cliente)")
+        keys[key.strip()] = tenant.strip()
+    return keys
+
+
+def tenant_for_key(api_key: Union[str, None]) -> Union[str, None]:
+    """
+    Retorna o cliente dono da chave de API, ou None se a chave não é conhecida
+    """
+    if not api_key:
+        return None
+    return parse_tenant_keys(TENANT_API_KEYS).get(api_key)
+
+
+class FairScheduler:
+    """
+    Fila justa ponderada (weighted fair queueing) na frente das chamadas ao LLM.
+    Até max_concurrency chamadas rodam ao mesmo tempo; as demais esperam e são
+    liberadas pela menor etiqueta de término virtual. Cada fluxo (classe de
+    prioridade + cliente) avança sua etiqueta em custo / peso da classe, de
+    modo que um cliente com muitas chamadas em fila não impede os demais de
+    serem atendidos e a classe interativa recebe uma fatia maior da capacidade.
+    O custo de uma chamada é a sua estimativa de tokens.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        weights: Union[dict[str, float], None] = None,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.weights = weights or parse_rates(LLM_PRIORITY_WEIGHTS)
+        self._active = 0
+        self._virtual_time = 0.0
+        self._last_finish: dict[tuple[str, str], float] = {}
+        # (etiqueta de término, ordem de chegada, etiqueta de início, classe, future)
+        self._queue: list[tuple[float, int, float, str, "asyncio.Future[None]"]] = []
+        self._order = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, cost: float = 1) -> AsyncIterator[None]:
+        """
+        Aguarda a vez do cliente atual e mantém a vaga durante a chamada
+        """
+        await self._acquire(current_client(), max(cost, 1))
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, client: ClientContext, cost: float) -> None:
+        flow = (client.priority, client.client_id)
+        start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        finish = start + cost / self.weights.get(client.priority, 1)
+        self._last_finish[flow] = finish
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._queue, (finish, next(self._order), start, client.priority, future)
+        )
+        LLM_QUEUE_DEPTH.labels(client.priority).inc()
+        enqueued_at = time.monotonic()
+        # Com vaga livre, a própria chamada (ou outra de etiqueta menor) é liberada já
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                # Ainda na fila: a entrada é descartada quando chegar a vez dela
+                LLM_QUEUE_DEPTH.labels(client.priority).dec()
+            else:
+                # A vaga foi concedida junto com o cancelamento: devolve
+                self._release()
+            raise
+        LLM_QUEUE_WAIT.labels(client.priority).observe(time.monotonic() - enqueued_at)
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrency and self._queue:
+            _, _, start, priority, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            LLM_QUEUE_DEPTH.labels(priority).dec()
+            self._active += 1
+            self._virtual_time = max(self._virtual_time, start)
+            future.set_result(None)
+        if len(self._last_finish) > TENANT_MAX_CLIENTS:
+            # Fluxos que já ficaram para trás do tempo virtual não têm mais efeito
+            self._last_finish = {
+                flow: finish
+                for flow, finish in self._last_finish.items()
+                if finish > self._virtual_time
+            }
+
+
+class TenantQuotas:
+    """
+    Cota por cliente em e-mails por minuto (balde de tokens por cliente).
+    Uma requisição que excede a cota é recusada, sem consumir a cota.
+    Com vários workers, cada um reabastece o balde com 1/workers da cota, de
+    modo que a soma respeita a cota configurada, e o balde comporta a cota
+    inteira para que um lote dentro dela continue sendo aceito.
+    """
+
+    def __init__(
+        self,
+        default_rate: float = TENANT_REQUESTS_PER_MINUTE,
+        rates: Union[dict[str, float], None] = None,
+        max_clients: int = TENANT_MAX_CLIENTS,
+        workers: int = TENANT_QUOTA_WORKERS,
+    ) -> None:
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self.max_clients = max_clients
+        self.workers = max(1, workers)
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    def try_acquire(self, client: ClientContext, cost: int = 1) -> float:
+        """
+        Consome `cost` da cota do cliente. Retorna 0 se havia saldo, quantos
+        segundos esperar antes de tentar de novo ou infinito se `cost` excede a
+        cota por minuto do cliente (a requisição nunca seria aceita)
+        """
+        rate = self.rates.get(client.client_id, self.default_rate)
+        if not rate:
+            return 0.0
+        bucket = self._buckets.get(client.client_id)
+        if bucket is None:
+            bucket = self._buckets[client.client_id] = TokenBucket(
+                rate / self.workers, capacity=rate
+            )
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(client.client_id)
+        return bucket.try_take(cost)
+
+
+def create_llm_scheduler() -> Union[FairScheduler, None]:
+    """
+    Cria o escalonador conforme LLM_MAX_CONCURRENCY.
+    Retorna None quando desabilitado.
+    """
+    if LLM_MAX_CONCURRENCY <= 0:
+        return None
+    weights = parse_rates(LLM_PRIORITY_WEIGHTS)
+    if set(weights) != set(PRIORITY_CLASSES) or min(weights.values()) <= 0:
+        raise ValueError(f"LLM_PRIORITY_WEIGHTS inválido: {LLM_PRIORITY_WEIGHTS}")
+    return FairScheduler(LLM_MAX_CONCURRENCY, weights)
+
+
+def create_tenant_quotas() -> Union[TenantQuotas, None]:
+    """
+    Cria as cotas por cliente conforme TENANT_REQUESTS_PER_MINUTE e TENANT_QUOTAS.
+    Retorna None quando não há nenhuma cota configurada.
+    """
+    rates = parse_rates(TENANT_QUOTAS)
+    if not TENANT_REQUESTS_PER_MINUTE and not rates:
+        return None
+    return TenantQuotas(TENANT_REQUESTS_PER_MINUTE, rates)
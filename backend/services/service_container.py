@@ -0,0 +1,149 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+
+import httpx
+from fastapi import FastAPI
+from openai import DefaultAsyncHttpxClient
+
+from services.batching_service import create_classification_batcher
+from services.cache_service import create_result_cache
+from services.compaction_service import create_email_compactor
+from services.dedup_service import create_near_duplicate_index
+from services.email_processing_service import (
+    PREPROCESS_MAX_WORKERS,
+    EmailProcessingService,
+)
+from services.job_service import JobQueue
+from services.local_classifier import create_label_log, load_local_classifier
+from services.nlp_service import is_model_loaded
+from services.nlp_service import warm_up as warm_up_nlp
+from services.llm_provider import create_async_llm_provider
+from services.pdf_service import PdfExtractor
+from services.scheduling_service import create_llm_scheduler, create_tenant_quotas
+from services.template_service import create_response_templates
+
+# Configuração do pool de conexões HTTP compartilhado com a API do OpenAI
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")
+)
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+# Abre a conexão com o OpenAI no startup (uma chamada leve à lista de modelos)
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() == "true"
+# Espera entre tentativas de warm-up que falharam (dobra a cada falha até o máximo)
+WARMUP_RETRY_BASE_DELAY = 1.0
+WARMUP_RETRY_MAX_DELAY = 60.0
+
+
+class ServiceContainer:
+    """
+    Mantém as instâncias compartilhadas durante a vida da aplicação:
+    um único cliente HTTP (com keep-alive) para o OpenAI, o executor de
+    pré-processamento, o cache de resultados e o EmailProcessingService que os utiliza.
+    """
+
+    def __init__(self) -> None:
+        self.http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+            )
+        )
+        self.preprocess_executor = ThreadPoolExecutor(
+            max_workers=PREPROCESS_MAX_WORKERS, thread_name_prefix="preprocess"
+        )
+        self.async_openai_service = create_async_llm_provider(
+            http_client=self.http_client, scheduler=create_llm_scheduler()
+        )
+        # Cotas de e-mails por minuto de cada cliente (None = sem cota)
+        self.tenant_quotas = create_tenant_quotas()
+        self.result_cache = create_result_cache()
+        # Índice de quase-duplicatas (SQLite aberto só no primeiro e-mail)
+        self.near_duplicate_index = create_near_duplicate_index()
+        self.email_processing_service = EmailProcessingService(
+            async_openai_service=self.async_openai_service,
+            preprocess_executor=self.preprocess_executor,
+            result_cache=self.result_cache,
+            local_classifier=load_local_classifier(),
+            label_log=create_label_log(),
+            compactor=create_email_compactor(),
+            near_duplicate_index=self.near_duplicate_index,
+            classification_batcher=create_classification_batcher(
+                self.async_openai_service
+            ),
+            response_templates=create_response_templates(),
+        )
+        # Fila de jobs em lote; os workers iniciam no primeiro envio ou, se houver
+        # itens pendentes de uma execução anterior, no startup
+        self.job_queue = JobQueue(self.email_processing_service)
+        # Pool de processos para PDFs, criado só quando o primeiro PDF chega
+        self.pdf_extractor = PdfExtractor()
+        self._warm_up_task: Union[asyncio.Task[None], None] = None
+
+    @property
+    def llm_ready(self) -> bool:
+        """
+        Cliente do LLM aquecido: pelo warm-up ou pela primeira chamada real
+        bem-sucedida (o que vier antes)
+        """
+        return not LLM_WARMUP or self.async_openai_service.ready
+
+    def start_warm_up(self) -> None:
+        """
+        Inicia o warm-up em segundo plano, se ainda não está rodando nem terminou
+        """
+        if self._warm_up_task is None or self._warm_up_task.done():
+            if not (is_model_loaded() and self.llm_ready):
+                self._warm_up_task = asyncio.create_task(self.warm_up())
+
+    async def warm_up(self) -> None:
+        """
+        Carrega o modelo do spacy (no executor, sem bloquear o event loop)
+        e aquece o cliente do OpenAI. Usado pelo endpoint de readiness.
+        Falhas transitórias são tentadas de novo, com espera crescente, até as
+        duas partes ficarem prontas.
+        """
+        loop = asyncio.get_running_loop()
+        delay = WARMUP_RETRY_BASE_DELAY
+        while True:
+            if not is_model_loaded():
+                try:
+                    await loop.run_in_executor(self.preprocess_executor, warm_up_nlp)
+                except Exception as e:
+                    print(f"Erro ao carregar o modelo do spacy: {e}")
+            if not self.llm_ready:
+                await self.async_openai_service.warm_up()
+            if is_model_loaded() and self.llm_ready:
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WARMUP_RETRY_MAX_DELAY)
+
+    async def aclose(self) -> None:
+        """
+        Fecha o cliente HTTP e encerra o executor. Chamado no shutdown da aplicação.
+        """
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+        await self.job_queue.stop()
+        await self.async_openai_service.close()
+        self.preprocess_executor.shutdown(wait=False, cancel_futures=True)
+        self.pdf_extractor.close()
+        if self.result_cache is not None:
+            self.result_cache.close()
+        if self.near_duplicate_index is not None:
+            self.near_duplicate_index.close()
+
+
+def get_service_container(app: FastAPI) -> ServiceContainer:
+    """
+    Retorna o container criado no lifespan da aplicação.
+    Se o lifespan não rodou (ex.: TestClient sem context manager), cria sob demanda.
+    """
+    container = getattr(app.state, "services", None)
+    if container is None:
+        container = ServiceContainer()
+        app.state.services = container
+    return container
@@ -0,0 +1,223 @@
+import json
+import os
+import re
+from string import Template
+from typing import Iterable, Union
+
+from typing_extensions import TypedDict
+
+from services.metrics_service import TEMPLATE_RESPONSES
+from services.openai_service import VALID_CLASSIFICATIONS
+
+# Categorias respondidas por modelo local, sem chamar o LLM (vazio desabilita)
+TEMPLATE_RESPONSE_LABELS = os.getenv("TEMPLATE_RESPONSE_LABELS", "Improdutivo")
+# Idioma usado quando o do e-mail não é reconhecido
+RESPONSE_TEMPLATE_LOCALE = os.getenv("RESPONSE_TEMPLATE_LOCALE", "pt-BR")
+# Arquivo JSON ({"idioma": {"categoria": "modelo"}}) que substitui ou complementa os padrões
+RESPONSE_TEMPLATES_PATH = os.getenv("RESPONSE_TEMPLATES_PATH", "")
+
+# Variáveis disponíveis nos modelos ($sender_name, $subject). Um trecho entre
+# [[ e ]] só aparece quando todas as variáveis dele estão preenchidas.
+TEMPLATE_SLOTS = ("sender_name", "subject")
+
+DEFAULT_TEMPLATES: dict[str, dict[str, str]] = {
+    "pt-BR": {
+        "Produtivo": (
+            "Olá[[, $sender_name]],\n\n"
+            'Recebemos sua mensagem[[ sobre "$subject"]] e ela já está sendo '
+            "analisada pela nossa equipe. Retornaremos em breve com uma "
+            "atualização.\n\nAtenciosamente,\nBruno Masello\nAnalista Júnior"
+        ),
+        "Improdutivo": (
+            "Olá[[, $sender_name]],\n\n"
+            'Agradecemos a sua mensagem[[ sobre "$subject"]]! Nenhuma ação '
+            "adicional é necessária no momento.\n\n"
+            "Atenciosamente,\nBruno Masello\nAnalista Júnior"
+        ),
+    },
+    "en": {
+        "Produtivo": (
+            "Hello[[ $sender_name]],\n\n"
+            'We have received your message[[ about "$subject"]] and our team is '
+            "already reviewing it. We will get back to you shortly with an "
+            "update.\n\nBest regards,\nBruno Masello\nJunior Analyst"
+        ),
+        "Improdutivo": (
+            "Hello[[ $sender_name]],\n\n"
+            'Thank you for your message[[ about "$subject"]]! No further action '
+            "is needed at this time.\n\nBest regards,\nBruno Masello\nJunior Analyst"
+        ),
+    },
+    "es": {
+        "Produtivo": (
+            "Hola[[, $sender_name]],\n\n"
+            'Hemos recibido su mensaje[[ sobre "$subject"]] y nuestro equipo ya '
+            "lo está analizando. Le responderemos en breve con una "
+            "actualización.\n\nAtentamente,\nBruno Masello\nAnalista Júnior"
+        ),
+        "Improdutivo": (
+            "Hola[[, $sender_name]],\n\n"
+            '¡Gracias por su mensaje[[ sobre "$subject"]]! No es necesaria '
+            "ninguna acción adicional por ahora.\n\n"
+            "Atentamente,\nBruno Masello\nAnalista Júnior"
+        ),
+    },
+}
+
+# Palavras frequentes usadas para reconhecer o idioma do e-mail
+LOCALE_HINTS = {
+    "pt-BR": {"não", "você", "obrigado", "obrigada", "olá", "com", "uma", "está"},
+    "en": {"the", "and", "you", "thanks", "thank", "please", "hello", "dear"},
+    "es": {"gracias", "usted", "hola", "estimado", "favor", "con", "muy", "está"},
+}
+
+_OPTIONAL = re.compile(r"\[\[(.*?)\]\]", re.DOTALL)
+_WORD = re.compile(r"\w+")
+_SENDER_HEADER = re.compile(r"^(?:de|from|remetente)\s*:\s*(.+)$", re.I | re.M)
+_SUBJECT_HEADER = re.compile(r"^(?:assunto|subject)\s*:\s*(.+)$", re.I | re.M)
+_REPLY_PREFIX = re.compile(r"^(?:(?:re|res|fw|fwd|enc)\s*:\s*)+", re.I)
+# Só os cabeçalhos do início do e-mail são considerados
+HEADER_LINES = 10
+MAX_SUBJECT_LENGTH = 80
+
+
+class TemplateSlots(TypedDict):
+    sender_name: str
+    subject: str
+
+
+# Um modelo compilado: trechos fixos (opcional=False) e trechos entre [[ ]]
+_CompiledTemplate = list[tuple[Template, bool]]
+
+
+def _compile(text: str) -> _CompiledTemplate:
+    """
+    Divide o modelo em trechos e valida as variáveis uma única vez, no carregamento
+    """
+    parts: _CompiledTemplate = []
+    position = 0
+    for match in _OPTIONAL.finditer(text):
+        parts.append((Template(text[position : match.start()]), False))
+        parts.append((Template(match.group(1)), True))
+        position = match.end()
+    parts.append((Template(text[position:]), False))
+    for template, _ in parts:
+        unknown = set(template.get_identifiers()) - set(TEMPLATE_SLOTS)
+        if unknown or not template.is_valid():
+            raise ValueError(f"Modelo de resposta inválido: {text!r}")
+    return parts
+
+
+def _render(template: _CompiledTemplate, slots: TemplateSlots) -> str:
+    rendered: list[str] = []
+    for part, optional in template:
+        if optional and not all(slots[name] for name in part.get_identifiers()):
+            continue
+        rendered.append(part.substitute(slots))
+    return "".join(rendered)
+
+
+def extract_slots(email_content: str) -> TemplateSlots:
+    """
+    Extrai o primeiro nome do remetente e o assunto dos cabeçalhos no início do
+    e-mail ("De:"/"From:" e "Assunto:"/"Subject:"). Vazios se não encontrados.
+    """
+    head = "\n".join(email_content.strip().splitlines()[:HEADER_LINES])
+    sender_name = ""
+    sender = _SENDER_HEADER.search(head)
+    if sender:
+        name = re.sub(r"<[^>]*>|\S+@\S+", "", sender.group(1)).strip(" \"'")
+        first_name = name.split()[0] if name else ""
+        if first_name.isalpha():
+            sender_name = first_name.capitalize()
+    subject = ""
+    subject_match = _SUBJECT_HEADER.search(head)
+    if subject_match:
+        subject = _REPLY_PREFIX.sub("", subject_match.group(1)).strip()
+        if len(subject) > MAX_SUBJECT_LENGTH:
+            subject = subject[: MAX_SUBJECT_LENGTH - 1].rstrip() + "…"
+    return {"sender_name": sender_name, "subject": subject}
+
+
+def detect_locale(email_content: str, locales: Iterable[str], default: str) -> str:
+    """
+    Escolhe, entre os idiomas disponíveis, o que tem mais palavras frequentes
+    no e-mail. Em caso de empate (ou nenhuma ocorrência), usa o padrão.
+    """
+    words = set(_WORD.findall(email_content.lower()))
+    best, best_score = default, 0
+    for locale in locales:
+        score = len(words & LOCALE_HINTS.get(locale, set()))
+        if score > best_score or (score == best_score and locale == default):
+            best, best_score = locale, score
+    return best
+
+
+class ResponseTemplates:
+    """
+    Respostas por modelo, por categoria e idioma, compiladas uma única vez.
+    Serve as categorias configuradas (por padrão, só Improdutivo) sem chamar
+    o LLM, preenchendo o nome do remetente e o assunto quando disponíveis.
+    """
+
+    def __init__(
+        self,
+        templates: Union[dict[str, dict[str, str]], None] = None,
+        labels: Iterable[str] = ("Improdutivo",),
+        default_locale: str = RESPONSE_TEMPLATE_LOCALE,
+    ) -> None:
+        self._templates = {
+            locale: {label: _compile(text) for label, text in by_label.items()}
+            for locale, by_label in (templates or DEFAULT_TEMPLATES).items()
+        }
+        if default_locale not in self._templates:
+            raise ValueError(f"Não há modelos para o idioma padrão: {default_locale}")
+        self.labels = frozenset(labels)
+        self.default_locale = default_locale
+
+    def render(self, email_content: str, classification: str) -> Union[str, None]:
+        """
+        Retorna a resposta por modelo ou None se a categoria deve ir para o LLM
+        """
+        if classification not in self.labels:
+            return None
+        locale = detect_locale(
+            email_content, self._templates.keys(), self.default_locale
+        )
+        if classification not in self._templates[locale]:
+            locale = self.default_locale
+        template = self._templates[locale].get(classification)
+        if template is None:
+            return None
+        TEMPLATE_RESPONSES.labels(classification, locale).inc()
+        return _render(template, extract_slots(email_content))
+
+
+def load_templates(path: str = RESPONSE_TEMPLATES_PATH) -> dict[str, dict[str, str]]:
+    """
+    Modelos padrão, com os do arquivo JSON (se configurado) por cima
+    """
+    templates = {
+        locale: dict(by_label) for locale, by_label in DEFAULT_TEMPLATES.items()
+    }
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for locale, by_label in json.load(f).items():
+                templates.setdefault(locale, {}).update(by_label)
+    return templates
+
+
+def create_response_templates() -> Union[ResponseTemplates, None]:
+    """
+    Cria as respostas por modelo conforme TEMPLATE_RESPONSE_LABELS.
+    Retorna None quando desabilitado.
+    """
+    labels = [
+        label.strip() for label in TEMPLATE_RESPONSE_LABELS.split(",") if label.strip()
+    ]
+    if not labels:
+        return None
+    invalid = set(labels) - set(VALID_CLASSIFICATIONS)
+    if invalid:
+        raise ValueError(f"TEMPLATE_RESPONSE_LABELS inválido: {', '.join(invalid)}")
+    return ResponseTemplates(load_templates(), labels)
@@ -0,0 +1,226 @@
+import codecs
+import os
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesParser
+from html.parser import HTMLParser
+from typing import AsyncIterator, Union, cast
+
+from charset_normalizer import from_bytes
+from fastapi import UploadFile
+
+# Tamanho máximo de um arquivo enviado (bytes)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(5 * 1024 * 1024)))
+# Os arquivos são lidos em blocos para não carregar tudo na memória de uma vez
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Codificação usada quando a detecção não chega a um resultado (ou empata)
+FALLBACK_ENCODING = "cp1252"
+
+EML_CONTENT_TYPES = ("message/rfc822",)
+
+
+class UploadTooLargeError(Exception):
+    """Lançada quando o arquivo enviado excede MAX_UPLOAD_BYTES"""
+
+
+async def iter_upload(
+    upload: UploadFile,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Lê o arquivo em blocos, interrompendo assim que o limite de tamanho é excedido
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLargeError(upload.size)
+    total = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            return
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLargeError(total)
+        yield chunk
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Detecta a codificação a partir de um trecho: BOM, depois UTF-8 e,
+    se não for UTF-8 válido, o charset_normalizer
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        # Incremental: o trecho pode terminar no meio de um caractere
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    matches = from_bytes(sample)
+    best = matches.best()
+    if best is None:
+        return FALLBACK_ENCODING
+    # Em trechos curtos várias codificações empatam; entre elas, prefere a
+    # mais comum em e-mails em português
+    tied = {
+        match.encoding
+        for match in matches
+        if match.chaos == best.chaos and match.coherence == best.coherence
+    }
+    return FALLBACK_ENCODING if FALLBACK_ENCODING in tied else best.encoding
+
+
+class IncrementalTextDecoder:
+    """
+    Decodifica um arquivo bloco a bloco. A codificação é detectada no primeiro
+    bloco; se um arquivo que parecia UTF-8 deixar de sê-lo mais adiante, o
+    restante é decodificado com a codificação detectada naquele bloco.
+    """
+
+    def __init__(self) -> None:
+        self.encoding = ""
+        self._decoder: Union[codecs.IncrementalDecoder, None] = None
+
+    def decode(self, chunk: bytes, final: bool = False) -> str:
+        if self._decoder is None:
+            self._set_encoding(detect_encoding(chunk))
+        decoder = cast(codecs.IncrementalDecoder, self._decoder)
+        try:
+            return decoder.decode(chunk, final)
+        except UnicodeDecodeError:
+            pending, _ = decoder.getstate()
+            chunk = pending + chunk
+            encoding = detect_encoding(chunk)
+            self._set_encoding(
+                encoding if encoding != self.encoding else FALLBACK_ENCODING
+            )
+            return cast(codecs.IncrementalDecoder, self._decoder).decode(chunk, final)
+
+    def _set_encoding(self, encoding: str) -> None:
+        self.encoding = encoding
+        # Só o UTF-8 é estrito, para que uma sequência inválida troque a codificação
+        errors = "strict" if encoding.startswith("utf-8") else "replace"
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+
+
+async def read_text_upload(
+    upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES
+) -> str:
+    decoder = IncrementalTextDecoder()
+    parts: list[str] = []
+    async for chunk in iter_upload(upload, max_bytes):
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+async def read_upload_bytes(
+    upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES
+) -> bytes:
+    return b"".join([chunk async for chunk in iter_upload(upload, max_bytes)])
+
+
+def is_eml(upload: UploadFile) -> bool:
+    return upload.content_type in EML_CONTENT_TYPES or (
+        upload.filename or ""
+    ).lower().endswith(".eml")
+
+
+class _HTMLTextExtractor(HTMLParser):
+    BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6"}
+    SKIPPED_TAGS = {"script", "style", "head", "title"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """
+    Converte HTML em texto simples, ignorando scripts/estilos e
+    quebrando linhas nos elementos de bloco
+    """
+    extractor = _HTMLTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    lines = (" ".join(line.split()) for line in "".join(extractor.parts).splitlines())
+    text = "\n".join(lines)
+    while "\n\n\n" in text:
+        text = text.replace("\n\n\n", "\n\n")
+    return text.strip()
+
+
+def parse_eml(raw: bytes) -> str:
+    """
+    Extrai o nome do remetente, o assunto e o corpo de uma mensagem MIME (.eml),
+    preferindo a parte text/plain e convertendo a text/html em texto quando for a única
+    """
+    return message_text(parse_message(raw))
+
+
+def parse_message(raw: bytes) -> EmailMessage:
+    return cast(EmailMessage, BytesParser(policy=policy.default).parsebytes(raw))
+
+
+def sender_name(message: EmailMessage) -> str:
+    """
+    Nome de exibição do remetente (cabeçalho From), sem o endereço; vazio se
+    não houver nome ou o cabeçalho for inválido
+    """
+    try:
+        sender = message["from"]
+        addresses = sender.addresses if sender is not None else ()
+    except Exception:
+        return ""
+    return addresses[0].display_name.strip() if addresses else ""
+
+
+def message_text(message: EmailMessage) -> str:
+    """
+    Remetente, assunto e corpo de uma mensagem já interpretada (ver parse_eml).
+    O remetente e o assunto vão em cabeçalhos "De:" e "Assunto:" no início do
+    texto, de onde as respostas por modelo tiram o nome e o assunto.
+    """
+    body = message.get_body(preferencelist=("plain", "html"))
+    text = ""
+    if body is not None:
+        try:
+            content = body.get_content()
+        except (LookupError, UnicodeError):
+            # Charset declarado inválido: detecta a partir dos bytes
+            payload = body.get_payload(decode=True) or b""
+            decoder = IncrementalTextDecoder()
+            content = decoder.decode(payload, final=True)
+        text = (
+            html_to_text(content)
+            if body.get_content_type() == "text/html"
+            else content.strip()
+        )
+    headers = []
+    name = sender_name(message)
+    if name:
+        headers.append(f"De: {name}")
+    subject = message.get("subject")
+    if subject:
+        headers.append(f"Assunto: {subject}")
+    return "\n".join(headers) + f"\n\n{text}" if headers else text
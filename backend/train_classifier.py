@@ -0,0 +1,78 @@
+"""
+Treina o classificador local a partir das classificações registradas do OpenAI.
+
+Com LLM_LABEL_LOG_PATH definido, o backend grava cada classificação do OpenAI
+(texto pré-processado + rótulo) em JSONL. Este comando usa esse arquivo para
+treinar o modelo usado por LOCAL_CLASSIFIER_PATH.
+
+Uso (a partir da pasta backend):
+    python train_classifier.py --labels llm_labels.jsonl --output local_classifier.joblib
+"""
+
+import argparse
+import random
+
+from services.local_classifier import (
+    LLM_LABEL_LOG_PATH,
+    LOCAL_CLASSIFIER_PATH,
+    LOCAL_CLASSIFIER_THRESHOLD,
+    LabelLog,
+    LocalClassifier,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--labels", default=LLM_LABEL_LOG_PATH or "llm_labels.jsonl")
+    parser.add_argument("--output", default=LOCAL_CLASSIFIER_PATH)
+    parser.add_argument("--threshold", type=float, default=LOCAL_CLASSIFIER_THRESHOLD)
+    parser.add_argument(
+        "--holdout",
+        type=float,
+        default=0.2,
+        help="Fração dos exemplos reservada para avaliação",
+    )
+    args = parser.parse_args()
+
+    texts, labels = LabelLog(args.labels).read()
+    # Remove duplicatas mantendo o último rótulo de cada texto
+    examples = list(dict(zip(texts, labels)).items())
+    if len(set(label for _, label in examples)) < 2:
+        raise SystemExit("São necessários exemplos de 'Produtivo' e 'Improdutivo'.")
+
+    random.Random(42).shuffle(examples)
+    holdout_size = int(len(examples) * args.holdout)
+    evaluation, training = examples[:holdout_size], examples[holdout_size:]
+
+    classifier = LocalClassifier.train(
+        [text for text, _ in training],
+        [label for _, label in training],
+        threshold=args.threshold,
+    )
+
+    if evaluation:
+        answered = correct = 0
+        for text, label in evaluation:
+            prediction = classifier.classify(text)
+            if prediction is not None:
+                answered += 1
+                correct += prediction == label
+        print(
+            f"Avaliação em {len(evaluation)} exemplos: "
+            f"{answered / len(evaluation):.1%} respondidos localmente "
+            f"(limite {args.threshold}), "
+            f"precisão {correct / answered if answered else 0:.1%}"
+        )
+
+    # O modelo final usa todos os exemplos
+    classifier = LocalClassifier.train(
+        [text for text, _ in examples],
+        [label for _, label in examples],
+        threshold=args.threshold,
+    )
+    classifier.save(args.output)
+    print(f"Modelo treinado com {len(examples)} exemplos salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
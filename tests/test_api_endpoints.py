@@ -2,23 +2,56 @@
 
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock, Mock
+from unittest.mock import MagicMock, Mock, patch
 from backend.main import app  # Importa a aplicação FastAPI
-from backend.services.email_processing_service import EmailProcessingResult
+from backend.services.email_processing_service import (
+    EmailProcessingResult,
+    EmailProcessingService,
+)
 
 # REMOVA ESTA LINHA: from backend.api.v1.email_router import get_email_processing_service
 from backend.api.v1.email_router import (
     get_email_processing_service,
+    get_job_queue,
+    get_pdf_extractor,
+    get_tenant_quotas,
 )  # Importar para poder sobrescrever
-from typing import cast
+from backend.services.job_service import JobQueue
+from backend.services.metrics_service import track_stage
+from backend.services.pdf_service import (
+    DocumentExtractor,
+    PdfExtractionError,
+    PdfExtractorUnavailableError,
+)
+from backend.services.scheduling_service import TenantQuotas
+from typing import Union, cast
 
 client = TestClient(app)
 
 
+# Substitui todas as dependências que vêm do container da aplicação: sem isso,
+# get_service_container() criaria o cliente real do OpenAI (e exigiria uma chave)
+@pytest.fixture(autouse=True)
+def hermetic_dependencies():
+    app.dependency_overrides.update(
+        {
+            get_email_processing_service: lambda: MagicMock(
+                spec=EmailProcessingService
+            ),
+            get_job_queue: lambda: MagicMock(spec=JobQueue),
+            get_pdf_extractor: lambda: MagicMock(spec=DocumentExtractor),
+            get_tenant_quotas: lambda: None,
+        }
+    )
+    yield
+    app.dependency_overrides = {}
+
+
 # Fixture para mockar o EmailProcessingService para todos os testes de API
 @pytest.fixture
 def mock_email_processor_service():
-    mock_service = MagicMock()
+    # spec faz com que os métodos async (process_email_async) virem AsyncMock
+    mock_service = MagicMock(spec=EmailProcessingService)
     # Sobrescreve a dependência get_email_processing_service na aplicação FastAPI
     app.dependency_overrides[get_email_processing_service] = lambda: mock_service
     yield mock_service  # Retorna o mock para que os testes possam configurá-lo
@@ -32,9 +65,11 @@ def test_process_email_text_productive(
     """
     Testa o endpoint /process-email com texto direto para um e-mail produtivo.
     """
-    mock_email_processor_service.process_email.return_value = EmailProcessingResult(
-        classification="Produtivo",
-        suggested_response="Sua solicitação será processada em breve.",
+    mock_email_processor_service.process_email_async.return_value = (
+        EmailProcessingResult(
+            classification="Produtivo",
+            suggested_response="Sua solicitação será processada em breve.",
+        )
     )
 
     email_content = "Preciso de ajuda com meu pedido."
@@ -48,15 +83,19 @@ def test_process_email_text_productive(
         "classification": "Produtivo",
         "suggested_response": "Sua solicitação será processada em breve.",
     }
-    mock_email_processor_service.process_email.assert_called_once_with(email_content)
+    mock_email_processor_service.process_email_async.assert_awaited_once_with(
+        email_content
+    )
 
 
 def test_process_email_text_unproductive(mock_email_processor_service: Mock):
     """
     Testa o endpoint /process-email com texto direto para um e-mail improdutivo.
     """
-    mock_email_processor_service.process_email.return_value = EmailProcessingResult(
-        classification="Improdutivo", suggested_response="Agradecemos sua mensagem."
+    mock_email_processor_service.process_email_async.return_value = (
+        EmailProcessingResult(
+            classification="Improdutivo", suggested_response="Agradecemos sua mensagem."
+        )
     )
 
     email_content = "Feliz aniversário!"
@@ -69,15 +108,20 @@ def test_process_email_text_unproductive(mock_email_processor_service: Mock):
         "classification": "Improdutivo",
         "suggested_response": "Agradecemos sua mensagem.",
     }
-    mock_email_processor_service.process_email.assert_called_once_with(email_content)
+    mock_email_processor_service.process_email_async.assert_awaited_once_with(
+        email_content
+    )
 
 
 def test_process_email_file_txt(mock_email_processor_service: Mock):
     """
     Testa o endpoint /process-email com upload de arquivo .txt.
     """
-    mock_email_processor_service.process_email.return_value = EmailProcessingResult(
-        classification="Produtivo", suggested_response="Arquivo processado com sucesso."
+    mock_email_processor_service.process_email_async.return_value = (
+        EmailProcessingResult(
+            classification="Produtivo",
+            suggested_response="Arquivo processado com sucesso.",
+        )
     )
 
     file_content = "Conteúdo do e-mail do arquivo TXT."
@@ -90,7 +134,68 @@ def test_process_email_file_txt(mock_email_processor_service: Mock):
         "classification": "Produtivo",
         "suggested_response": "Arquivo processado com sucesso.",
     }
-    mock_email_processor_service.process_email.assert_called_once_with(file_content)
+    mock_email_processor_service.process_email_async.assert_awaited_once_with(
+        file_content
+    )
+
+
+def test_process_email_file_txt_non_utf8(mock_email_processor_service: Mock):
+    """
+    Testa que arquivos .txt em outras codificações (ex.: Windows-1252) são aceitos.
+    """
+    mock_email_processor_service.process_email_async.return_value = (
+        EmailProcessingResult(classification="Produtivo", suggested_response="Ok.")
+    )
+
+    file_content = "Solicitação de atualização do cadastro, por favor."
+    files = {"email_file": ("email.txt", file_content.encode("cp1252"), "text/plain")}
+
+    response = client.post("/api/v1/process-email", files=files)
+
+    assert response.status_code == 200
+    mock_email_processor_service.process_email_async.assert_awaited_once_with(
+        file_content
+    )
+
+
+def test_process_email_file_eml(mock_email_processor_service: Mock):
+    """
+    Testa o upload de uma mensagem .eml: assunto e corpo HTML convertido em texto.
+    """
+    mock_email_processor_service.process_email_async.return_value = (
+        EmailProcessingResult(classification="Produtivo", suggested_response="Ok.")
+    )
+
+    eml = (
+        "From: Cliente <cliente@exemplo.com>\r\n"
+        "Subject: Status do chamado\r\n"
+        "MIME-Version: 1.0\r\n"
+        "Content-Type: text/html; charset=utf-8\r\n"
+        "\r\n"
+        "<html><body><p>Qual o status do chamado 42?</p></body></html>\r\n"
+    )
+    files = {"email_file": ("mensagem.eml", eml, "message/rfc822")}
+
+    response = client.post("/api/v1/process-email", files=files)
+
+    assert response.status_code == 200
+    mock_email_processor_service.process_email_async.assert_awaited_once_with(
+        "De: Cliente\nAssunto: Status do chamado\n\nQual o status do chamado 42?"
+    )
+
+
+@patch("backend.api.v1.email_router.MAX_UPLOAD_BYTES", 16)
+def test_process_email_file_too_large(mock_email_processor_service: Mock):
+    """
+    Testa que arquivos acima do limite são rejeitados com 413.
+    """
+    files = {"email_file": ("email.txt", "x" * 17, "text/plain")}
+
+    response = client.post("/api/v1/process-email", files=files)
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "O arquivo excede o limite de 16 bytes."}
+    mock_email_processor_service.process_email_async.assert_not_awaited()
 
 
 def test_process_email_no_input():  # Este teste não precisa do mock, pois a validação ocorre antes
@@ -123,29 +228,88 @@ def test_process_email_unsupported_file_type():  # Este teste não precisa do mo
     response = client.post("/api/v1/process-email", files=files)
     assert response.status_code == 400
     assert response.json() == {
-        "detail": "Tipo de arquivo não suportado. Apenas .txt ou .pdf."
+        "detail": "Tipo de arquivo não suportado. Apenas .txt, .eml ou .pdf."
     }
 
 
-def test_process_email_pdf_not_implemented():  # Este teste não precisa do mock
+class FakePdfExtractor:
+    def __init__(self, text: str = "", error: Union[Exception, None] = None) -> None:
+        self.text = text
+        self.error = error
+
+    async def extract(self, data: bytes) -> str:
+        if self.error is not None:
+            raise self.error
+        return self.text
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def fake_pdf_extractor():
+    extractor = FakePdfExtractor()
+    app.dependency_overrides[get_pdf_extractor] = lambda: extractor
+    yield extractor
+    app.dependency_overrides.pop(get_pdf_extractor, None)
+
+
+def test_process_email_file_pdf(
+    mock_email_processor_service: Mock, fake_pdf_extractor: FakePdfExtractor
+):
     """
-    Testa o endpoint /process-email com arquivo PDF (ainda não implementado).
+    Testa o endpoint /process-email com arquivo PDF (texto vindo do extrator).
     """
-    file_content = "Conteúdo de um PDF simulado."
-    files = {"email_file": ("document.pdf", file_content, "application/pdf")}
+    mock_email_processor_service.process_email_async.return_value = (
+        EmailProcessingResult(classification="Produtivo", suggested_response="Ok.")
+    )
+    fake_pdf_extractor.text = "Texto extraído do PDF."
+    files = {"email_file": ("document.pdf", b"%PDF-1.4 ...", "application/pdf")}
 
     response = client.post("/api/v1/process-email", files=files)
-    assert response.status_code == 501
-    assert response.json() == {
-        "detail": "Leitura de arquivos PDF ainda não implementada."
-    }
+
+    assert response.status_code == 200
+    mock_email_processor_service.process_email_async.assert_awaited_once_with(
+        "Texto extraído do PDF."
+    )
+
+
+def test_process_email_file_pdf_invalid(
+    mock_email_processor_service: Mock, fake_pdf_extractor: FakePdfExtractor
+):
+    """
+    Testa que PDFs ilegíveis (ou que excedem o tempo limite) retornam 422.
+    """
+    fake_pdf_extractor.error = PdfExtractionError("PDF inválido")
+    files = {"email_file": ("document.pdf", b"nao e pdf", "application/pdf")}
+
+    response = client.post("/api/v1/process-email", files=files)
+
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Não foi possível extrair o texto do PDF."}
+    mock_email_processor_service.process_email_async.assert_not_awaited()
+
+
+def test_process_email_file_pdf_extractor_unavailable(
+    mock_email_processor_service: Mock, fake_pdf_extractor: FakePdfExtractor
+):
+    """
+    Testa que um pool de extração quebrado retorna 503 em vez de 500.
+    """
+    fake_pdf_extractor.error = PdfExtractorUnavailableError("pool quebrado")
+    files = {"email_file": ("document.pdf", b"%PDF-1.4 ...", "application/pdf")}
+
+    response = client.post("/api/v1/process-email", files=files)
+
+    assert response.status_code == 503
+    mock_email_processor_service.process_email_async.assert_not_awaited()
 
 
 def test_process_email_internal_error(mock_email_processor_service: Mock):
     """
     Testa o tratamento de erro interno no serviço de processamento.
     """
-    mock_email_processor_service.process_email.side_effect = Exception(
+    mock_email_processor_service.process_email_async.side_effect = Exception(
         "Erro simulado no serviço"
     )
 
@@ -156,4 +320,386 @@ def test_process_email_internal_error(mock_email_processor_service: Mock):
 
     assert response.status_code == 500
     assert response.json() == {"detail": "Erro interno ao processar o e-mail."}
-    mock_email_processor_service.process_email.assert_called_once_with(email_content)
+    mock_email_processor_service.process_email_async.assert_awaited_once_with(
+        email_content
+    )
+
+
+def test_process_emails_batch(mock_email_processor_service: Mock):
+    """
+    Testa o endpoint /process-emails com textos e arquivos, incluindo um item inválido.
+    """
+    mock_email_processor_service.process_emails_async.return_value = [
+        EmailProcessingResult(classification="Produtivo", suggested_response="R1"),
+        EmailProcessingResult(classification="Improdutivo", suggested_response="R2"),
+        EmailProcessingResult(classification="Produtivo", suggested_response="R3"),
+    ]
+
+    files = [
+        ("email_files", ("email.txt", "E-mail do arquivo.", "text/plain")),
+        ("email_files", ("image.jpg", "imagem", "image/jpeg")),
+    ]
+    response = client.post(
+        "/api/v1/process-emails",
+        data={"email_contents": ["Preciso de ajuda.", "Feliz Natal!"]},
+        files=files,
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [item["index"] for item in results] == [0, 1, 2, 3]
+    assert results[0]["result"] == {
+        "classification": "Produtivo",
+        "suggested_response": "R1",
+    }
+    assert results[2]["source"] == "email.txt"
+    assert results[2]["result"]["suggested_response"] == "R3"
+    assert results[3]["result"] is None
+    assert (
+        results[3]["error"]
+        == "Tipo de arquivo não suportado. Apenas .txt, .eml ou .pdf."
+    )
+    args, kwargs = mock_email_processor_service.process_emails_async.call_args
+    assert args[0] == ["Preciso de ajuda.", "Feliz Natal!", "E-mail do arquivo."]
+
+
+def test_process_emails_batch_item_error(mock_email_processor_service: Mock):
+    """
+    Testa que a falha de um item do lote é reportada sem afetar os demais.
+    """
+    mock_email_processor_service.process_emails_async.return_value = [
+        Exception("Erro simulado"),
+        EmailProcessingResult(classification="Produtivo", suggested_response="R2"),
+    ]
+
+    response = client.post(
+        "/api/v1/process-emails",
+        data={"email_contents": ["E-mail com erro.", "E-mail bom."]},
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["error"] == "Erro interno ao processar o e-mail."
+    assert results[1]["result"]["classification"] == "Produtivo"
+
+
+def test_process_emails_no_input():
+    """
+    Testa o endpoint /process-emails sem nenhum input.
+    """
+    response = client.post("/api/v1/process-emails")
+    assert response.status_code == 400
+    assert response.json() == {
+        "detail": "É necessário fornecer ao menos um e-mail ou arquivo."
+    }
+
+
+@pytest.fixture
+def mock_services_state():
+    previous = getattr(app.state, "services", None)
+    app.state.services = MagicMock(llm_ready=True)
+    yield app.state.services
+    app.state.services = previous
+
+
+@patch("backend.main.is_model_loaded", return_value=True)
+def test_readiness_ready(mock_is_model_loaded: Mock, mock_services_state: Mock):
+    """
+    Testa o endpoint /readiness com modelo carregado e cliente aquecido.
+    """
+    response = client.get("/readiness")
+    assert response.status_code == 200
+    assert response.json() == {
+        "ready": True,
+        "model_loaded": True,
+        "llm_client_ready": True,
+    }
+
+
+@patch("backend.main.is_model_loaded", return_value=False)
+def test_readiness_model_not_loaded(
+    mock_is_model_loaded: Mock, mock_services_state: Mock
+):
+    """
+    Testa que /readiness retorna 503 enquanto o modelo não foi carregado.
+    """
+    response = client.get("/readiness")
+    assert response.status_code == 503
+    assert response.json()["model_loaded"] is False
+
+
+def test_process_email_stream(mock_email_processor_service: Mock):
+    """
+    Testa o endpoint /process-email/stream (Server-Sent Events).
+    """
+
+    async def fake_stream(email_content: str):
+        yield {"event": "classification", "data": {"classification": "Produtivo"}}
+        yield {"event": "token", "data": {"text": "Sua solicitação "}}
+        yield {"event": "token", "data": {"text": "será processada."}}
+        yield {
+            "event": "done",
+            "data": {
+                "classification": "Produtivo",
+                "suggested_response": "Sua solicitação será processada.",
+            },
+        }
+
+    mock_email_processor_service.stream_email_async = fake_stream
+
+    response = client.post(
+        "/api/v1/process-email/stream",
+        data={"email_content": "Preciso de ajuda com meu pedido."},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    assert events[0] == ('event: classification\ndata: {"classification": "Produtivo"}')
+    assert events[1] == 'event: token\ndata: {"text": "Sua solicitação "}'
+    assert events[-1].startswith("event: done\n")
+
+
+def test_process_email_stream_empty_content():
+    """
+    Testa que o endpoint em streaming valida o conteúdo antes de abrir o stream.
+    """
+    response = client.post("/api/v1/process-email/stream", data={"email_content": " "})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "O conteúdo do e-mail não pode estar vazio."}
+
+
+@pytest.fixture
+def mock_job_queue():
+    queue = MagicMock(spec=JobQueue)
+    app.dependency_overrides[get_job_queue] = lambda: queue
+    yield queue
+    app.dependency_overrides.pop(get_job_queue, None)
+
+
+JOB_STATUS = {
+    "job_id": "abc",
+    "status": "queued",
+    "priority": 1,
+    "total": 2,
+    "processed": 0,
+    "failed": 0,
+    "progress": 0.0,
+    "created_at": 1.0,
+    "finished_at": None,
+}
+
+
+def test_submit_job(mock_job_queue: Mock):
+    """
+    Testa o envio de um job: retorna 202 com o id sem aguardar o processamento.
+    """
+    mock_job_queue.submit.return_value = JOB_STATUS
+
+    response = client.post(
+        "/api/v1/jobs",
+        json={"emails": ["E-mail 1", "E-mail 2"], "priority": 1},
+    )
+
+    assert response.status_code == 202
+    assert response.json() == JOB_STATUS
+    mock_job_queue.submit.assert_awaited_once_with(["E-mail 1", "E-mail 2"], 1, None)
+
+
+def test_submit_job_invalid_webhook(mock_job_queue: Mock):
+    """
+    Testa que webhooks que não são http(s) são rejeitados.
+    """
+    response = client.post(
+        "/api/v1/jobs", json={"emails": ["E-mail"], "webhook_url": "file:///etc"}
+    )
+
+    assert response.status_code == 400
+    mock_job_queue.submit.assert_not_called()
+
+
+def test_submit_job_internal_webhook(mock_job_queue: Mock):
+    """
+    Testa que webhooks para a rede interna (ex.: metadados da nuvem) são rejeitados.
+    """
+    response = client.post(
+        "/api/v1/jobs",
+        json={
+            "emails": ["E-mail"],
+            "webhook_url": "http://169.254.169.254/latest/meta-data",
+        },
+    )
+
+    assert response.status_code == 400
+    mock_job_queue.submit.assert_not_called()
+
+
+def test_get_job_status_and_results(mock_job_queue: Mock):
+    """
+    Testa a consulta do status e dos resultados paginados de um job.
+    """
+    mock_job_queue.get_job.return_value = JOB_STATUS
+    mock_job_queue.get_results.return_value = {
+        "job_id": "abc",
+        "offset": 0,
+        "total": 2,
+        "items": [
+            {"index": 0, "status": "queued", "result": None, "error": None},
+        ],
+    }
+
+    assert client.get("/api/v1/jobs/abc").json() == JOB_STATUS
+    response = client.get("/api/v1/jobs/abc/results?offset=0&limit=1")
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["status"] == "queued"
+    mock_job_queue.get_results.assert_awaited_once_with("abc", 0, 1)
+
+
+def test_get_job_not_found(mock_job_queue: Mock):
+    """
+    Testa a consulta de um job inexistente.
+    """
+    mock_job_queue.get_job.return_value = None
+
+    response = client.get("/api/v1/jobs/nao-existe")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Job não encontrado."}
+
+
+def test_process_email_server_timing_header(mock_email_processor_service: Mock):
+    """
+    Testa que /process-email informa o tempo de cada etapa no Server-Timing.
+    """
+
+    async def process(email_content: str) -> EmailProcessingResult:
+        with track_stage("classification"):
+            pass
+        return EmailProcessingResult(
+            classification="Produtivo", suggested_response="Ok."
+        )
+
+    mock_email_processor_service.process_email_async.side_effect = process
+
+    response = client.post("/api/v1/process-email", data={"email_content": "Oi"})
+
+    assert response.status_code == 200
+    assert "classification;dur=" in response.headers["server-timing"]
+    assert "total;dur=" in response.headers["server-timing"]
+
+
+def test_process_email_tenant_quota(mock_email_processor_service: Mock):
+    """
+    Testa que o cliente acima da cota recebe 429 com Retry-After, sem afetar os demais.
+    """
+    mock_email_processor_service.process_email_async.return_value = (
+        EmailProcessingResult(classification="Produtivo", suggested_response="Ok.")
+    )
+    quotas = TenantQuotas(default_rate=1)
+    app.dependency_overrides[get_tenant_quotas] = lambda: quotas
+
+    with patch(
+        "backend.services.scheduling_service.TENANT_API_KEYS",
+        "chave-a:cliente-a,chave-b:cliente-b",
+    ):
+        first = client.post(
+            "/api/v1/process-email",
+            data={"email_content": "Oi"},
+            headers={"X-API-Key": "chave-a"},
+        )
+        second = client.post(
+            "/api/v1/process-email",
+            data={"email_content": "Oi"},
+            headers={"X-API-Key": "chave-a"},
+        )
+        other = client.post(
+            "/api/v1/process-email",
+            data={"email_content": "Oi"},
+            headers={"X-API-Key": "chave-b"},
+        )
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second.headers["retry-after"]) >= 1
+    assert other.status_code == 200
+    assert mock_email_processor_service.process_email_async.await_count == 2
+
+
+def test_unknown_api_keys_share_the_ip_quota(mock_email_processor_service: Mock):
+    """
+    Testa que chaves fora de TENANT_API_KEYS não criam cotas novas nem assumem
+    a cota de um cliente configurado: o cliente passa a ser o IP de origem.
+    """
+    mock_email_processor_service.process_email_async.return_value = (
+        EmailProcessingResult(classification="Produtivo", suggested_response="Ok.")
+    )
+    quotas = TenantQuotas(default_rate=1, rates={"vip": 100})
+    app.dependency_overrides[get_tenant_quotas] = lambda: quotas
+
+    with patch("backend.services.scheduling_service.TENANT_API_KEYS", "chave:vip"):
+        responses = [
+            client.post(
+                "/api/v1/process-email",
+                data={"email_content": "Oi"},
+                headers={"X-API-Key": key},
+            )
+            for key in ("aleatoria-1", "aleatoria-2", "vip")
+        ]
+
+    assert [response.status_code for response in responses] == [200, 429, 429]
+    assert list(quotas._buckets) == ["ip:testclient"]
+
+
+def test_invalid_request_does_not_consume_quota(mock_email_processor_service: Mock):
+    """
+    Testa que requisições recusadas na validação não consomem a cota do cliente.
+    """
+    mock_email_processor_service.process_email_async.return_value = (
+        EmailProcessingResult(classification="Produtivo", suggested_response="Ok.")
+    )
+    app.dependency_overrides[get_tenant_quotas] = lambda: TenantQuotas(default_rate=1)
+
+    empty = client.post("/api/v1/process-email", data={"email_content": "   "})
+    unsupported = client.post(
+        "/api/v1/process-email",
+        files={"email_file": ("foto.png", b"png", "image/png")},
+    )
+    valid = client.post("/api/v1/process-email", data={"email_content": "Oi"})
+
+    assert empty.status_code == 400
+    assert unsupported.status_code == 400
+    assert valid.status_code == 200
+
+
+def test_process_emails_batch_above_tenant_quota(mock_email_processor_service: Mock):
+    """
+    Testa que um lote maior que a cota por minuto do cliente é recusado com 413.
+    """
+    app.dependency_overrides[get_tenant_quotas] = lambda: TenantQuotas(default_rate=2)
+
+    response = client.post(
+        "/api/v1/process-emails",
+        data={"email_contents": ["Um", "Dois", "Três"]},
+        headers={"X-API-Key": "cliente-a"},
+    )
+
+    assert response.status_code == 413
+    mock_email_processor_service.process_email_async.assert_not_awaited()
+
+
+def test_metrics_endpoint():
+    """
+    Testa que /metrics expõe as métricas no formato do Prometheus.
+    """
+    client.get("/healthcheck")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_requests_total{method="GET",path="/healthcheck",status="200"}'
+        in response.text
+    )
+    assert "email_stage_duration_seconds" in response.text
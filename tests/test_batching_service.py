@@ -0,0 +1,108 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.services.batching_service import ClassificationBatcher
+from backend.services.scheduling_service import (
+    ClientContext,
+    current_client,
+    set_current_client,
+)
+from backend.services.openai_service import _parse_batch_classification
+
+
+def _openai_service(batch_result, individual="Produtivo") -> MagicMock:
+    service = MagicMock()
+    service.classify_emails = AsyncMock(return_value=batch_result)
+    service.classify_email = AsyncMock(return_value=individual)
+    return service
+
+
+def _classify_all(batcher: ClassificationBatcher, texts: list[str]) -> list[str]:
+    async def run():
+        return await asyncio.gather(*(batcher.classify(text) for text in texts))
+
+    return asyncio.run(run())
+
+
+def test_concurrent_requests_share_one_call():
+    """Testa que pedidos dentro da janela são classificados em uma única chamada."""
+    service = _openai_service(["Produtivo", "Improdutivo", "Produtivo"])
+    batcher = ClassificationBatcher(service, window=0.01, max_size=10)
+
+    labels = _classify_all(batcher, ["a", "b", "c"])
+
+    assert labels == ["Produtivo", "Improdutivo", "Produtivo"]
+    service.classify_emails.assert_awaited_once_with(["a", "b", "c"])
+    service.classify_email.assert_not_awaited()
+
+
+def test_full_batch_is_sent_without_waiting():
+    """Testa que o lote é enviado ao atingir max_size, sem esperar a janela."""
+    service = _openai_service(["Produtivo", "Improdutivo"])
+    batcher = ClassificationBatcher(service, window=60, max_size=2)
+
+    labels = _classify_all(batcher, ["a", "b"])
+
+    assert labels == ["Produtivo", "Improdutivo"]
+
+
+def test_invalid_batch_falls_back_to_individual_calls():
+    """Testa o fallback para chamadas individuais quando a resposta do lote é inválida."""
+    service = _openai_service(None, individual="Improdutivo")
+    batcher = ClassificationBatcher(service, window=0.01, max_size=10)
+
+    labels = _classify_all(batcher, ["a", "b"])
+
+    assert labels == ["Improdutivo", "Improdutivo"]
+    assert service.classify_email.await_count == 2
+
+
+def test_invalid_label_is_classified_individually():
+    """Testa que só o item com rótulo inválido é reclassificado individualmente."""
+    service = _openai_service(["Produtivo", "Desconhecido"], individual="Improdutivo")
+    batcher = ClassificationBatcher(service, window=0.01, max_size=10)
+
+    labels = _classify_all(batcher, ["a", "b"])
+
+    assert labels == ["Produtivo", "Improdutivo"]
+    service.classify_email.assert_awaited_once_with("b")
+
+
+def test_batches_are_split_by_client():
+    """Testa que cada lote contém um único cliente e roda em nome dele na fila do LLM."""
+    calls: list[tuple[list[str], ClientContext]] = []
+
+    async def classify_emails(texts: list[str]) -> list[str]:
+        calls.append((texts, current_client()))
+        return ["Produtivo"] * len(texts)
+
+    service = _openai_service(None)
+    service.classify_emails = AsyncMock(side_effect=classify_emails)
+    batcher = ClassificationBatcher(service, window=0.01, max_size=10)
+    client_a = ClientContext("a", "interactive")
+    client_b = ClientContext("b", "bulk")
+
+    async def classify_as(client: ClientContext, text: str) -> str:
+        set_current_client(client)
+        return await batcher.classify(text)
+
+    async def run():
+        return await asyncio.gather(
+            classify_as(client_a, "a1"),
+            classify_as(client_b, "b1"),
+            classify_as(client_a, "a2"),
+            classify_as(client_b, "b2"),
+        )
+
+    assert asyncio.run(run()) == ["Produtivo"] * 4
+    assert sorted(calls) == [(["a1", "a2"], client_a), (["b1", "b2"], client_b)]
+
+
+def test_parse_batch_classification():
+    """Testa a validação da resposta JSON da classificação em lote."""
+    content = '{"classifications": ["Produtivo", "Improdutivo."]}'
+
+    assert _parse_batch_classification(content, 2) == ["Produtivo", "Improdutivo"]
+    assert _parse_batch_classification(content, 3) is None
+    assert _parse_batch_classification("não é JSON", 2) is None
+    assert _parse_batch_classification('{"classifications": [1, 2]}', 2) is None
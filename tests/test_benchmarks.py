@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from backend.benchmarks.fake_openai_server import FakeOpenAIServer
+from backend.benchmarks.stats import percentile
+from backend.services.openai_service import AsyncOpenAIService, OpenAIService
+
+
+@pytest.fixture(scope="module")
+def fake_server():
+    with FakeOpenAIServer(latency=0) as server:
+        yield server
+
+
+@pytest.fixture
+def llm_env(monkeypatch, fake_server):
+    monkeypatch.setenv("OPENAI_BASE_URL", fake_server.base_url)
+    monkeypatch.setenv("OPENAPI_APIKEY", "sk-fake")
+    return fake_server
+
+
+def test_percentile_interpolates():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 95) == 0.0
+
+
+def test_fake_server_classifies_and_responds(llm_env):
+    service = OpenAIService()
+    calls_before = llm_env.calls
+
+    assert service.classify_email("Feliz Natal a todos!") == "Improdutivo"
+    assert service.classify_email("Qual o status do protocolo 123?") == "Produtivo"
+    assert service.classify_and_respond("Qual o status do protocolo 123?") == (
+        "Produtivo",
+        "Recebemos sua solicitação e ela será processada em breve.",
+    )
+    service.close()
+    assert llm_env.calls - calls_before == 3
+
+
+def test_fake_server_streams_response(llm_env):
+    async def collect():
+        service = AsyncOpenAIService()
+        chunks = [
+            chunk
+            async for chunk in service.stream_response(
+                "Parabéns pelo trabalho!", "Improdutivo"
+            )
+        ]
+        await service.close()
+        return chunks
+
+    chunks = asyncio.run(collect())
+
+    assert "".join(chunks).strip() == (
+        "Agradecemos a mensagem! Nenhuma ação adicional é necessária."
+    )
@@ -0,0 +1,99 @@
+import asyncio
+import sqlite3
+import threading
+
+from backend.services.cache_service import (
+    MemoryCache,
+    ResultCache,
+    SQLiteCache,
+)
+
+
+def test_memory_cache_lru_eviction():
+    """Testa que a entrada menos usada recentemente é removida ao atingir o limite."""
+    cache = MemoryCache(max_entries=2, ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")  # "a" passa a ser a mais recente
+    cache.set("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+
+
+def test_memory_cache_ttl_expiration():
+    """Testa que entradas expiradas não são retornadas."""
+    cache = MemoryCache(max_entries=10, ttl=-1)
+    cache.set("a", "1")
+    assert cache.get("a") is None
+
+
+def test_sqlite_cache_persists_between_instances(tmp_path):
+    """Testa que o cache em disco sobrevive à recriação da instância."""
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path, max_entries=10, ttl=60)
+    cache.set("a", "1")
+    cache.close()
+
+    reopened = SQLiteCache(path, max_entries=10, ttl=60)
+    assert reopened.get("a") == "1"
+    assert reopened.get("b") is None
+    reopened.close()
+
+
+def test_result_cache_keys_and_stats():
+    """Testa as chaves por conteúdo e os contadores de hit/miss."""
+    cache = ResultCache(MemoryCache(max_entries=10, ttl=60))
+
+    assert cache.get_classification("texto") is None
+    cache.set_classification("texto", "Produtivo")
+    assert cache.get_classification("texto") == "Produtivo"
+
+    cache.set_response("E-mail original", "Produtivo", "Resposta")
+    assert cache.get_response("E-mail original", "Produtivo") == "Resposta"
+    assert cache.get_response("E-mail original", "Improdutivo") is None
+
+    assert cache.stats["classification"] == {"hits": 1, "misses": 1}
+    assert cache.stats["response"] == {"hits": 1, "misses": 1}
+
+
+class LockedCache:
+    """Backend em disco que sempre falha, como um SQLite travado por outro worker"""
+
+    blocking = True
+
+    def __init__(self) -> None:
+        self.threads: list[int] = []
+
+    def get(self, key: str) -> None:
+        self.threads.append(threading.get_ident())
+        raise sqlite3.OperationalError("database is locked")
+
+    def set(self, key: str, value: str) -> None:
+        self.threads.append(threading.get_ident())
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_result_cache_errors_count_as_miss():
+    """Testa que erros do backend viram miss (e gravação descartada) em vez de exceção."""
+    cache = ResultCache(LockedCache())
+
+    cache.set_classification("texto", "Produtivo")
+    assert cache.get_classification("texto") is None
+    assert cache.stats["classification"] == {"hits": 0, "misses": 1}
+
+
+def test_result_cache_async_runs_disk_backend_off_event_loop():
+    """Testa que, com backend em disco, as versões assíncronas rodam em uma thread."""
+    backend = LockedCache()
+    cache = ResultCache(backend)
+
+    async def run() -> None:
+        await cache.set_response_async("E-mail", "Produtivo", "Resposta")
+        assert await cache.get_response_async("E-mail", "Produtivo") is None
+
+    asyncio.run(run())
+
+    assert len(backend.threads) == 2
+    assert threading.get_ident() not in backend.threads
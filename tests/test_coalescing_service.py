@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from backend.services.coalescing_service import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    """Testa que chamadas simultâneas com a mesma chave executam uma única vez."""
+    flight: SingleFlight[str] = SingleFlight("test")
+    calls = []
+
+    async def compute(key: str) -> str:
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return f"resultado {key}"
+
+    async def run():
+        return await asyncio.gather(
+            *(flight.do(key, lambda key=key: compute(key)) for key in "aaab")
+        )
+
+    results = asyncio.run(run())
+
+    assert results == ["resultado a"] * 3 + ["resultado b"]
+    assert sorted(calls) == ["a", "b"]
+    assert len(flight) == 0
+
+
+def test_errors_are_shared_and_not_cached():
+    """Testa que a exceção chega a todos e que a chamada seguinte recomputa."""
+    flight: SingleFlight[str] = SingleFlight("test")
+    calls = 0
+
+    async def failing() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("falhou")
+
+    async def run():
+        first = await asyncio.gather(
+            flight.do("a", failing), flight.do("a", failing), return_exceptions=True
+        )
+        with pytest.raises(RuntimeError):
+            await flight.do("a", failing)
+        return first
+
+    first = asyncio.run(run())
+
+    assert all(isinstance(outcome, RuntimeError) for outcome in first)
+    assert calls == 2
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    """Testa que o cancelamento de quem iniciou não interrompe os demais."""
+    flight: SingleFlight[str] = SingleFlight("test")
+
+    async def compute() -> str:
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def run():
+        leader = asyncio.create_task(flight.do("a", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("a", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == "ok"
@@ -0,0 +1,99 @@
+import time
+
+from backend.services.compaction_service import (
+    TRUNCATION_MARKER,
+    compact_email,
+    count_tokens,
+    strip_disclaimers,
+    strip_quoted_history,
+    strip_signature,
+    truncate_to_budget,
+)
+
+
+def test_strip_quoted_history_cuts_reply_header():
+    """Testa que o histórico citado após "escreveu:" é removido."""
+    email = (
+        "Pode verificar o status do chamado 123?\n\n"
+        "Em seg., 1 de jan. de 2024 às 10:00, Suporte <suporte@empresa.com> escreveu:\n"
+        "> Seu chamado foi aberto.\n"
+        "> Obrigado."
+    )
+    assert strip_quoted_history(email).strip() == (
+        "Pode verificar o status do chamado 123?"
+    )
+
+
+def test_strip_quoted_history_handles_outlook_header():
+    """Testa o corte no cabeçalho "De:/Enviado:" do Outlook."""
+    email = (
+        "Segue o relatório.\n\n"
+        "De: Maria <maria@empresa.com>\n"
+        "Enviado: segunda-feira, 1 de janeiro de 2024 10:00\n"
+        "Assunto: Relatório\n\n"
+        "Mensagem anterior."
+    )
+    assert strip_quoted_history(email).strip() == "Segue o relatório."
+
+
+def test_strip_quoted_history_keeps_email_that_is_only_quote():
+    """Testa que o e-mail não é esvaziado se começar pelo cabeçalho."""
+    email = "On Mon, Jan 1, 2024, John wrote:\nHello"
+    assert strip_quoted_history(email) == email
+
+
+def test_strip_signature_and_mobile_footer():
+    """Testa a remoção da assinatura ("-- ") e do rodapé de celular."""
+    email = "Preciso de ajuda.\nEnviado do meu iPhone\n-- \nJoão Silva\nAnalista"
+    assert strip_signature(email).strip() == "Preciso de ajuda."
+
+
+def test_strip_disclaimers():
+    """Testa que apenas o parágrafo de aviso legal é removido."""
+    email = (
+        "Qual o prazo da fatura?\n\n"
+        "Esta mensagem é confidencial e destinada apenas ao destinatário."
+    )
+    assert strip_disclaimers(email) == "Qual o prazo da fatura?"
+    assert strip_disclaimers("Envio o documento confidencial.") == (
+        "Envio o documento confidencial."
+    )
+
+
+def test_truncate_to_budget_keeps_head_and_tail():
+    """Testa que textos acima do orçamento mantêm início e fim."""
+    text = "início " + "palavra " * 2000 + "fim"
+    truncated = truncate_to_budget(text, 300)
+
+    assert truncated.startswith("início")
+    assert truncated.endswith("fim")
+    assert TRUNCATION_MARKER in truncated
+    assert count_tokens(truncated) <= 310
+
+
+def test_compact_email_reports_tokens_saved():
+    """Testa que a compactação retorna o texto reduzido e os tokens economizados."""
+    email = (
+        "Preciso da segunda via do boleto.\n\n"
+        "On Mon, Jan 1, 2024, Financeiro wrote:\n" + "> histórico antigo\n" * 50
+    )
+    compacted, tokens_saved = compact_email(email)
+
+    assert compacted == "Preciso da segunda via do boleto."
+    assert tokens_saved == count_tokens(email) - count_tokens(compacted)
+    assert tokens_saved > 0
+
+
+def test_compact_email_leaves_short_email_untouched():
+    """Testa que e-mails sem nada a remover não são alterados."""
+    assert compact_email("  Feliz natal!  ") == ("  Feliz natal!  ", 0)
+
+
+def test_compact_email_is_linear_in_blank_lines():
+    """Testa que muitas linhas em branco não tornam a compactação quadrática."""
+    start = time.perf_counter()
+    compacted, _ = compact_email("Oi\n" + "\n" * 20000 + "x")
+
+    assert time.perf_counter() - start < 1
+    assert compacted.startswith("Oi")
+    assert compacted.endswith("x")
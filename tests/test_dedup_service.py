@@ -0,0 +1,120 @@
+import sqlite3
+
+from backend.services import dedup_service
+from backend.services.dedup_service import NearDuplicateIndex, simhash, similarity
+
+TEMPLATE = (
+    "Olá, sou {name}. Gostaria de verificar o status da minha solicitação de acesso "
+    "ao sistema interno, protocolo {number}. O relatório mensal não está sendo "
+    "gerado desde a última atualização."
+)
+PROCESSED = (
+    "gostar verificar status solicitação acesso sistema interno protocolo {number} "
+    "relatório mensal gerar atualização precisar sexta-feira {name}"
+)
+
+
+def _email(name: str, number: str) -> tuple[str, str]:
+    return (
+        TEMPLATE.format(name=name, number=number),
+        PROCESSED.format(name=name.lower(), number=number),
+    )
+
+
+def test_simhash_similarity():
+    """Testa que e-mails do mesmo modelo ficam próximos e textos diferentes não."""
+    _, first = _email("Marcos", "1234")
+    _, second = _email("Ana", "9876")
+    other = "desejar feliz natal próspero ano novo obrigado ajuda ontem parabéns equipe"
+
+    assert similarity(simhash(first), simhash(second)) >= 0.85  # type: ignore
+    assert similarity(simhash(first), simhash(other)) < 0.85  # type: ignore
+    assert simhash("texto curto") is None
+
+
+def test_lookup_reuses_generic_response():
+    """Testa que a resposta é reutilizada quando não cita detalhes do e-mail original."""
+    index = NearDuplicateIndex(threshold=0.85)
+    email, processed = _email("Marcos", "1234")
+    index.add(email, processed, "Produtivo", "Recebemos sua solicitação.")
+
+    match = index.lookup(*_email("Ana", "9876"))
+
+    assert match is not None
+    assert match["classification"] == "Produtivo"
+    assert match["suggested_response"] == "Recebemos sua solicitação."
+
+
+def test_lookup_skips_response_with_original_details():
+    """Testa que só a classificação é reutilizada se a resposta cita o nome ou o protocolo."""
+    index = NearDuplicateIndex(threshold=0.85)
+    email, processed = _email("Marcos", "1234")
+    index.add(
+        email, processed, "Produtivo", "Olá Marcos, o protocolo 1234 está em análise."
+    )
+
+    match = index.lookup(*_email("Ana", "9876"))
+    same_details = index.lookup(*_email("Marcos", "1234"))
+
+    assert match is not None
+    assert match["classification"] == "Produtivo"
+    assert match["suggested_response"] is None
+    assert same_details is not None
+    assert same_details["suggested_response"] is not None
+
+
+def test_index_is_bounded_and_persisted(tmp_path):
+    """Testa o limite de entradas e que o índice sobrevive à recriação da instância."""
+    path = str(tmp_path / "near_duplicates.sqlite3")
+    index = NearDuplicateIndex(path, max_entries=1, threshold=0.85)
+    index.add(*_email("Marcos", "1234"), "Produtivo", "Recebemos sua solicitação.")
+    other = "desejar feliz natal próspero ano novo obrigado ajuda ontem parabéns equipe"
+    index.add("Feliz Natal!", other, "Improdutivo", "Obrigado!")
+    assert len(index) == 1
+    index.close()
+
+    reopened = NearDuplicateIndex(path, max_entries=1, threshold=0.85)
+    assert reopened.lookup(*_email("Ana", "9876")) is None
+    match = reopened.lookup("Feliz Natal!", other)
+    assert match is not None
+    assert match["classification"] == "Improdutivo"
+    reopened.close()
+
+
+def test_index_writes_to_disk_in_background(tmp_path, monkeypatch):
+    """Testa que buscas e inclusões não gravam no SQLite na hora, só em lote."""
+    monkeypatch.setattr(dedup_service, "NEAR_DUPLICATE_FLUSH_INTERVAL", 60)
+    path = str(tmp_path / "near_duplicates.sqlite3")
+    index = NearDuplicateIndex(path, threshold=0.85)
+    index.add(*_email("Marcos", "1234"), "Produtivo", "Recebemos sua solicitação.")
+    assert index.lookup(*_email("Ana", "9876")) is not None
+
+    def stored_rows() -> int:
+        conn = sqlite3.connect(path)
+        (count,) = conn.execute("SELECT COUNT(*) FROM near_duplicates").fetchone()
+        conn.close()
+        return count
+
+    assert stored_rows() == 0
+    index.close()  # grava as alterações pendentes
+    assert stored_rows() == 1
+
+
+def test_processes_sharing_the_index_keep_each_others_entries(tmp_path):
+    """
+    Testa que dois processos com o mesmo arquivo (serve.py) não sobrescrevem
+    nem removem as entradas um do outro.
+    """
+    path = str(tmp_path / "near_duplicates.sqlite3")
+    other = "desejar feliz natal próspero ano novo obrigado ajuda ontem parabéns equipe"
+    first = NearDuplicateIndex(path, max_entries=1, threshold=0.85)
+    second = NearDuplicateIndex(path, max_entries=1, threshold=0.85)
+    first.add(*_email("Marcos", "1234"), "Produtivo", "Recebemos sua solicitação.")
+    second.add("Feliz Natal!", other, "Improdutivo", "Obrigado!")
+    first.close()
+    second.close()
+
+    reopened = NearDuplicateIndex(path, max_entries=2, threshold=0.85)
+    assert reopened.lookup(*_email("Ana", "9876")) is not None
+    assert reopened.lookup("Feliz Natal!", other) is not None
+    reopened.close()
@@ -1,10 +1,16 @@
-from unittest.mock import patch, MagicMock, Mock
+import asyncio
+import threading
+from unittest.mock import patch, MagicMock, Mock, AsyncMock
 from backend.services.email_processing_service import EmailProcessingService
+from backend.services.cache_service import MemoryCache, ResultCache, SQLiteCache
+from backend.services.compaction_service import EmailCompactor
+from backend.services.dedup_service import NearDuplicateIndex
+from backend.services.template_service import ResponseTemplates
 from typing import cast
 
 
 @patch("backend.services.email_processing_service.preprocess_text")
-@patch("backend.services.email_processing_service.OpenAIService")
+@patch("backend.services.llm_provider.OpenAIService")
 def test_process_email_productive(
     mock_openai_service_class: Mock,
     mock_preprocess_text: Mock,
@@ -35,7 +41,7 @@ def test_process_email_productive(
 
 
 @patch("backend.services.email_processing_service.preprocess_text")
-@patch("backend.services.email_processing_service.OpenAIService")
+@patch("backend.services.llm_provider.OpenAIService")
 def test_process_email_unproductive(
     mock_openai_service_class: Mock, mock_preprocess_text: Mock
 ):
@@ -65,7 +71,7 @@ def test_process_email_unproductive(
 
 
 @patch("backend.services.email_processing_service.preprocess_text")
-@patch("backend.services.email_processing_service.OpenAIService")
+@patch("backend.services.llm_provider.OpenAIService")
 def test_process_email_error_in_classification(
     mock_openai_service_class: Mock, mock_preprocess_text: Mock
 ):
@@ -92,3 +98,491 @@ def test_process_email_error_in_classification(
         "classification": "Erro na Classificação",
         "suggested_response": "Erro na Geração de Resposta",
     }
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.AsyncOpenAIService")
+def test_process_email_async_productive(
+    mock_async_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa o caminho assíncrono: pré-processamento no executor e chamadas aguardadas.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    mock_openai_instance = cast(MagicMock, mock_async_openai_service_class.return_value)
+    mock_openai_instance.classify_email = AsyncMock(return_value="Produtivo")
+    mock_openai_instance.generate_response = AsyncMock(
+        return_value="Resposta produtiva gerada."
+    )
+
+    service = EmailProcessingService()
+    email_content = "Conteúdo do e-mail produtivo."
+    result = asyncio.run(service.process_email_async(email_content))
+
+    mock_preprocess_text.assert_called_once_with(email_content)
+    mock_openai_instance.classify_email.assert_awaited_once_with("texto pre-processado")
+    mock_openai_instance.generate_response.assert_awaited_once_with(
+        email_content, "Produtivo"
+    )
+
+    assert result == {
+        "classification": "Produtivo",
+        "suggested_response": "Resposta produtiva gerada.",
+    }
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.OpenAIService")
+def test_process_email_uses_result_cache(
+    mock_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que um e-mail repetido é respondido pelo cache sem novas chamadas ao OpenAI.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    mock_openai_instance = cast(MagicMock, mock_openai_service_class.return_value)
+    mock_openai_instance.classify_email.return_value = "Produtivo"
+    mock_openai_instance.generate_response.return_value = "Resposta produtiva gerada."
+
+    service = EmailProcessingService(
+        result_cache=ResultCache(MemoryCache(max_entries=10, ttl=60))
+    )
+    email_content = "Conteúdo do e-mail produtivo."
+    first = service.process_email(email_content)
+    second = service.process_email(email_content)
+
+    assert first == second
+    mock_openai_instance.classify_email.assert_called_once()
+    mock_openai_instance.generate_response.assert_called_once()
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.AsyncOpenAIService")
+def test_process_email_async_survives_cache_errors(
+    mock_async_openai_service_class: Mock, mock_preprocess_text: Mock, tmp_path
+):
+    """
+    Testa que um cache em disco com erro não impede a resposta do OpenAI.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+    mock_openai_instance = cast(MagicMock, mock_async_openai_service_class.return_value)
+    mock_openai_instance.classify_email = AsyncMock(return_value="Produtivo")
+    mock_openai_instance.generate_response = AsyncMock(return_value="Resposta.")
+
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_entries=10, ttl=60)
+    cache.close()  # toda consulta ao SQLite passa a falhar
+    service = EmailProcessingService(result_cache=ResultCache(cache))
+    result = asyncio.run(service.process_email_async("E-mail."))
+
+    assert result == {"classification": "Produtivo", "suggested_response": "Resposta."}
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.OpenAIService")
+def test_process_email_does_not_cache_errors(
+    mock_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que falhas de classificação não são armazenadas no cache.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    mock_openai_instance = cast(MagicMock, mock_openai_service_class.return_value)
+    mock_openai_instance.classify_email.return_value = "Erro na Classificação"
+    mock_openai_instance.generate_response.return_value = "Erro na Geração de Resposta"
+
+    service = EmailProcessingService(
+        result_cache=ResultCache(MemoryCache(max_entries=10, ttl=60))
+    )
+    service.process_email("E-mail com erro.")
+    service.process_email("E-mail com erro.")
+
+    assert mock_openai_instance.classify_email.call_count == 2
+
+
+@patch("backend.services.email_processing_service.preprocess_texts")
+@patch("backend.services.llm_provider.AsyncOpenAIService")
+def test_process_emails_async_deduplicates(
+    mock_async_openai_service_class: Mock, mock_preprocess_texts: Mock
+):
+    """
+    Testa que o lote pré-processa com nlp.pipe e chama o OpenAI uma vez por conteúdo único.
+    """
+    mock_preprocess_texts.side_effect = lambda texts: [f"pp {t}" for t in texts]
+
+    mock_openai_instance = cast(MagicMock, mock_async_openai_service_class.return_value)
+    mock_openai_instance.classify_email = AsyncMock(return_value="Produtivo")
+    mock_openai_instance.generate_response = AsyncMock(return_value="Resposta.")
+
+    service = EmailProcessingService()
+    results = asyncio.run(service.process_emails_async(["a", "b", "a"]))
+
+    mock_preprocess_texts.assert_called_once_with(["a", "b"])
+    assert mock_openai_instance.classify_email.await_count == 2
+    assert len(results) == 3
+    assert (
+        results[0]
+        == results[2]
+        == {
+            "classification": "Produtivo",
+            "suggested_response": "Resposta.",
+        }
+    )
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.OpenAIService")
+def test_process_email_local_classifier_skips_llm(
+    mock_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que uma classificação local confiante dispensa a chamada de classificação ao OpenAI.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    mock_openai_instance = cast(MagicMock, mock_openai_service_class.return_value)
+    mock_openai_instance.generate_response.return_value = "Resposta improdutiva."
+    local_classifier = MagicMock()
+    local_classifier.classify.return_value = "Improdutivo"
+
+    service = EmailProcessingService(local_classifier=local_classifier)
+    result = service.process_email("Feliz Natal!")
+
+    local_classifier.classify.assert_called_once_with("texto pre-processado")
+    mock_openai_instance.classify_email.assert_not_called()
+    assert result["classification"] == "Improdutivo"
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.OpenAIService")
+def test_process_email_uncertain_local_classifier_escalates(
+    mock_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que casos incertos vão para o OpenAI e o rótulo é registrado para treino.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    mock_openai_instance = cast(MagicMock, mock_openai_service_class.return_value)
+    mock_openai_instance.classify_email.return_value = "Produtivo"
+    mock_openai_instance.generate_response.return_value = "Resposta produtiva."
+    local_classifier = MagicMock()
+    local_classifier.classify.return_value = None
+    label_log = MagicMock()
+
+    service = EmailProcessingService(
+        local_classifier=local_classifier, label_log=label_log
+    )
+    result = service.process_email("Preciso de ajuda.")
+
+    mock_openai_instance.classify_email.assert_called_once_with("texto pre-processado")
+    label_log.append.assert_called_once_with("texto pre-processado", "Produtivo")
+    assert result["classification"] == "Produtivo"
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.OpenAIService")
+def test_process_email_falls_back_to_local_classifier_on_llm_error(
+    mock_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que, se o OpenAI falhar, a previsão do classificador local é usada.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    mock_openai_instance = cast(MagicMock, mock_openai_service_class.return_value)
+    mock_openai_instance.classify_email.return_value = "Erro na Classificação"
+    mock_openai_instance.generate_response.return_value = "Resposta improdutiva."
+    local_classifier = MagicMock()
+    local_classifier.classify.return_value = None
+    local_classifier.predict.return_value = ("Improdutivo", 0.6)
+
+    service = EmailProcessingService(local_classifier=local_classifier)
+    result = service.process_email("Feliz natal!")
+
+    local_classifier.predict.assert_called_once_with("texto pre-processado")
+    mock_openai_instance.generate_response.assert_called_once_with(
+        "Feliz natal!", "Improdutivo"
+    )
+    assert result["classification"] == "Improdutivo"
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.OpenAIService")
+def test_process_email_compacts_before_llm(
+    mock_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que o histórico citado é removido antes das chamadas ao OpenAI
+    e que os tokens economizados são informados.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    mock_openai_instance = cast(MagicMock, mock_openai_service_class.return_value)
+    mock_openai_instance.classify_email.return_value = "Produtivo"
+    mock_openai_instance.generate_response.return_value = "Resposta produtiva."
+
+    email = "Preciso de ajuda.\n\nOn Mon, Jan 1, 2024, X wrote:\n" + "> antigo\n" * 20
+    service = EmailProcessingService(compactor=EmailCompactor())
+    result = service.process_email(email)
+
+    mock_preprocess_text.assert_called_once_with("Preciso de ajuda.")
+    mock_openai_instance.generate_response.assert_called_once_with(
+        "Preciso de ajuda.", "Produtivo"
+    )
+    assert result["tokens_saved"] > 0
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.AsyncOpenAIService")
+def test_process_email_async_compacts_off_event_loop(
+    mock_async_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """Testa que a compactação da versão assíncrona roda fora do event loop."""
+    mock_preprocess_text.return_value = "texto pre-processado"
+    mock_openai_instance = cast(MagicMock, mock_async_openai_service_class.return_value)
+    mock_openai_instance.classify_email = AsyncMock(return_value="Produtivo")
+    mock_openai_instance.generate_response = AsyncMock(return_value="Resposta.")
+
+    threads: list[int] = []
+
+    class RecordingCompactor(EmailCompactor):
+        def compact(self, text: str) -> tuple[str, int]:
+            threads.append(threading.get_ident())
+            return super().compact(text)
+
+    service = EmailProcessingService(compactor=RecordingCompactor())
+    email = "Preciso de ajuda.\n\nOn Mon, Jan 1, 2024, X wrote:\n" + "> antigo\n" * 20
+    result = asyncio.run(service.process_email_async(email))
+
+    assert threads and threading.get_ident() not in threads
+    mock_preprocess_text.assert_called_once_with("Preciso de ajuda.")
+    assert result["tokens_saved"] > 0
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.AsyncOpenAIService")
+def test_stream_email_async_emits_classification_then_tokens(
+    mock_async_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que o streaming emite a classificação antes dos trechos da resposta.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    async def fake_stream_response(email_content: str, classification: str):
+        yield "Resposta "
+        yield "produtiva."
+
+    mock_openai_instance = cast(MagicMock, mock_async_openai_service_class.return_value)
+    mock_openai_instance.classify_email = AsyncMock(return_value="Produtivo")
+    mock_openai_instance.stream_response = fake_stream_response
+
+    service = EmailProcessingService()
+
+    async def collect():
+        return [event async for event in service.stream_email_async("E-mail.")]
+
+    events = asyncio.run(collect())
+
+    assert [event["event"] for event in events] == [
+        "classification",
+        "token",
+        "token",
+        "done",
+    ]
+    assert events[0]["data"] == {"classification": "Produtivo"}
+    assert events[-1]["data"] == {
+        "classification": "Produtivo",
+        "suggested_response": "Resposta produtiva.",
+    }
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.OpenAIService")
+def test_process_email_combined_mode(
+    mock_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que o modo combinado faz uma única chamada ao OpenAI.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    mock_openai_instance = cast(MagicMock, mock_openai_service_class.return_value)
+    mock_openai_instance.classify_and_respond.return_value = (
+        "Produtivo",
+        "Resposta produtiva gerada.",
+    )
+
+    service = EmailProcessingService(pipeline_mode="combined")
+    email_content = "Conteúdo do e-mail produtivo."
+    result = service.process_email(email_content)
+
+    mock_openai_instance.classify_and_respond.assert_called_once_with(email_content)
+    mock_openai_instance.classify_email.assert_not_called()
+    mock_openai_instance.generate_response.assert_not_called()
+    assert result == {
+        "classification": "Produtivo",
+        "suggested_response": "Resposta produtiva gerada.",
+    }
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.OpenAIService")
+def test_process_email_combined_mode_falls_back(
+    mock_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa o fallback para duas chamadas quando a resposta combinada é inválida.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    mock_openai_instance = cast(MagicMock, mock_openai_service_class.return_value)
+    mock_openai_instance.classify_and_respond.return_value = None
+    mock_openai_instance.classify_email.return_value = "Improdutivo"
+    mock_openai_instance.generate_response.return_value = "Resposta improdutiva."
+
+    service = EmailProcessingService(pipeline_mode="combined")
+    result = service.process_email("Feliz Natal!")
+
+    mock_openai_instance.classify_email.assert_called_once_with("texto pre-processado")
+    assert result == {
+        "classification": "Improdutivo",
+        "suggested_response": "Resposta improdutiva.",
+    }
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.AsyncOpenAIService")
+def test_process_email_speculative_mode(
+    mock_async_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que o modo especulativo rascunha as respostas em paralelo à classificação,
+    mantém o rascunho do rótulo final e cancela o outro.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+    cancelled: list[str] = []
+
+    async def classify_email(processed_text: str) -> str:
+        await asyncio.sleep(0.01)
+        return "Improdutivo"
+
+    async def generate_response(email_content: str, classification: str) -> str:
+        try:
+            await asyncio.sleep(0.02 if classification == "Improdutivo" else 1)
+        except asyncio.CancelledError:
+            cancelled.append(classification)
+            raise
+        return f"Rascunho {classification}."
+
+    mock_openai_instance = cast(MagicMock, mock_async_openai_service_class.return_value)
+    mock_openai_instance.classify_email = AsyncMock(side_effect=classify_email)
+    mock_openai_instance.generate_response = AsyncMock(side_effect=generate_response)
+
+    service = EmailProcessingService(pipeline_mode="speculative")
+    result = asyncio.run(service.process_email_async("Feliz Natal!"))
+
+    assert result == {
+        "classification": "Improdutivo",
+        "suggested_response": "Rascunho Improdutivo.",
+    }
+    assert mock_openai_instance.generate_response.await_count == 2
+    assert cancelled == ["Produtivo"]
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.OpenAIService")
+def test_process_email_reuses_near_duplicate(
+    mock_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que um e-mail quase idêntico a outro já processado não chama o OpenAI.
+    """
+    mock_preprocess_text.side_effect = lambda text: (
+        "gostar verificar status solicitação acesso sistema interno protocolo "
+        "relatório mensal gerar atualização precisar " + text.split()[-1].lower()
+    )
+
+    mock_openai_instance = cast(MagicMock, mock_openai_service_class.return_value)
+    mock_openai_instance.classify_email.return_value = "Produtivo"
+    mock_openai_instance.generate_response.return_value = "Recebemos sua solicitação."
+
+    service = EmailProcessingService(near_duplicate_index=NearDuplicateIndex())
+    first = service.process_email("Status do meu acesso? Marcos")
+    second = service.process_email("Status do meu acesso? Ana")
+
+    assert first == second
+    mock_openai_instance.classify_email.assert_called_once()
+    mock_openai_instance.generate_response.assert_called_once()
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.AsyncOpenAIService")
+def test_process_email_async_coalesces_concurrent_requests(
+    mock_async_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que requisições simultâneas idênticas compartilham um único processamento.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    async def slow_classify(text: str) -> str:
+        await asyncio.sleep(0.01)
+        return "Produtivo"
+
+    mock_openai_instance = cast(MagicMock, mock_async_openai_service_class.return_value)
+    mock_openai_instance.classify_email = AsyncMock(side_effect=slow_classify)
+    mock_openai_instance.generate_response = AsyncMock(
+        return_value="Resposta produtiva gerada."
+    )
+
+    service = EmailProcessingService()
+
+    async def run():
+        return await asyncio.gather(
+            *(service.process_email_async("Mesmo e-mail.") for _ in range(5))
+        )
+
+    results = asyncio.run(run())
+
+    assert (
+        results
+        == [
+            {
+                "classification": "Produtivo",
+                "suggested_response": "Resposta produtiva gerada.",
+            }
+        ]
+        * 5
+    )
+    assert results[0] is not results[1]
+    mock_openai_instance.classify_email.assert_awaited_once()
+    mock_preprocess_text.assert_called_once()
+
+
+@patch("backend.services.email_processing_service.preprocess_text")
+@patch("backend.services.llm_provider.AsyncOpenAIService")
+def test_process_email_async_answers_unproductive_from_template(
+    mock_async_openai_service_class: Mock, mock_preprocess_text: Mock
+):
+    """
+    Testa que e-mails improdutivos são respondidos pelo modelo local, sem
+    chamar o OpenAI para gerar a resposta.
+    """
+    mock_preprocess_text.return_value = "texto pre-processado"
+
+    mock_openai_instance = cast(MagicMock, mock_async_openai_service_class.return_value)
+    mock_openai_instance.classify_email = AsyncMock(return_value="Improdutivo")
+    mock_openai_instance.generate_response = AsyncMock()
+
+    service = EmailProcessingService(response_templates=ResponseTemplates())
+    email_content = "De: Maria <maria@exemplo.com>\nFeliz Natal a todos!"
+
+    result = asyncio.run(service.process_email_async(email_content))
+
+    assert result["classification"] == "Improdutivo"
+    assert result["suggested_response"].startswith("Olá, Maria,")
+    mock_openai_instance.generate_response.assert_not_awaited()
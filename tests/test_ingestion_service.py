@@ -0,0 +1,180 @@
+import asyncio
+import csv
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from backend.services import ingestion_service
+from backend.services.email_processing_service import EmailProcessingService
+from backend.services.ingestion_service import (
+    PROCESSING_ERROR,
+    ingest,
+    iter_maildir,
+    iter_mbox,
+    load_checkpoint,
+)
+
+
+def _message(number: int, body: str = "Qual o status do pedido?") -> bytes:
+    return (
+        f"From remetente@exemplo.com Mon Jan  1 00:00:00 2024\n"
+        f"Message-ID: <{number}@exemplo.com>\n"
+        f"From: Remetente <remetente@exemplo.com>\n"
+        f"Subject: Pedido {number}\n"
+        f"\n"
+        f"{body}\n"
+        f"\n"
+    ).encode("utf-8")
+
+
+def _write_mbox(path, count: int) -> None:
+    path.write_bytes(b"".join(_message(number) for number in range(count)))
+
+
+def _service() -> MagicMock:
+    service = MagicMock(spec=EmailProcessingService)
+    service.process_email_async = AsyncMock(
+        return_value={"classification": "Produtivo", "suggested_response": "Ok."}
+    )
+    return service
+
+
+def test_iter_mbox_streams_and_resumes(tmp_path):
+    """Testa a leitura do mbox, o escape de '>From ' e a retomada pelo cursor."""
+    path = tmp_path / "caixa.mbox"
+    path.write_bytes(
+        _message(1, body=">From o início, tudo certo.") + _message(2) + _message(3)
+    )
+
+    messages = list(iter_mbox(str(path)))
+    resumed = list(iter_mbox(str(path), messages[0][0]))
+
+    assert len(messages) == 3
+    assert b"\nFrom o in" in messages[0][1]
+    assert b"Message-ID: <1@exemplo.com>" in messages[0][1]
+    assert [raw for _, raw in resumed] == [raw for _, raw in messages[1:]]
+    assert messages[-1][0] == str(path.stat().st_size)
+
+
+def test_iter_maildir_in_stable_order(tmp_path):
+    """Testa a leitura de cur/ e new/ em ordem estável e o salto das já processadas."""
+    for folder, name in (("new", "b"), ("cur", "c:2,S"), ("cur", "a:2,")):
+        (tmp_path / folder).mkdir(exist_ok=True)
+        (tmp_path / folder / name).write_bytes(_message(0))
+
+    keys = [key for key, _ in iter_maildir(str(tmp_path))]
+    resumed = [key for key, _ in iter_maildir(str(tmp_path), {"a", "c"})]
+
+    assert keys == ["a", "b", "c"]
+    assert resumed == ["b"]
+
+
+def test_ingest_maildir_resumes_by_message_key(tmp_path):
+    """
+    Testa que, ao retomar um Maildir, mensagens que mudaram de pasta ou de flags
+    não são processadas de novo e mensagens ainda não vistas são lidas.
+    """
+    for folder in ("cur", "new", "tmp"):
+        (tmp_path / "Maildir" / folder).mkdir(parents=True)
+    maildir = tmp_path / "Maildir"
+    (maildir / "new" / "1.a").write_bytes(_message(0))
+    (maildir / "new" / "3.c").write_bytes(_message(2))
+    output = str(tmp_path / "resultados.jsonl")
+    checkpoint = f"{output}.checkpoint"
+    service = _service()
+
+    asyncio.run(ingest(service, str(maildir), output, checkpoint))
+    # Um cliente de e-mail lê as mensagens e chega uma nova, com nome "menor"
+    (maildir / "new" / "1.a").rename(maildir / "cur" / "1.a:2,S")
+    (maildir / "new" / "3.c").rename(maildir / "cur" / "3.c:2,RS")
+    (maildir / "new" / "2.b").write_bytes(_message(1))
+    total = asyncio.run(ingest(service, str(maildir), output, checkpoint))
+
+    with open(output, encoding="utf-8") as f:
+        subjects = [json.loads(line)["subject"] for line in f]
+    assert total == 3
+    assert subjects == ["Pedido 0", "Pedido 2", "Pedido 1"]
+    assert service.process_email_async.await_count == 3
+
+
+def test_ingest_refuses_existing_output_without_checkpoint(tmp_path):
+    """Testa que uma saída existente não é apagada quando não há checkpoint."""
+    source = tmp_path / "caixa.mbox"
+    _write_mbox(source, 1)
+    output = tmp_path / "resultados.jsonl"
+    output.write_text('{"subject": "resultado anterior"}\n', encoding="utf-8")
+
+    with pytest.raises(FileExistsError):
+        asyncio.run(
+            ingest(_service(), str(source), str(output), f"{output}.checkpoint")
+        )
+
+    assert output.read_text(encoding="utf-8") == '{"subject": "resultado anterior"}\n'
+
+
+def test_ingest_writes_jsonl_and_resumes(tmp_path):
+    """Testa a gravação incremental e que uma nova execução continua do checkpoint."""
+    source = tmp_path / "caixa.mbox"
+    _write_mbox(source, 5)
+    output = str(tmp_path / "resultados.jsonl")
+    checkpoint = f"{output}.checkpoint"
+    service = _service()
+
+    first = asyncio.run(
+        ingest(service, str(source), output, checkpoint, concurrency=2, limit=3)
+    )
+    second = asyncio.run(ingest(service, str(source), output, checkpoint))
+
+    with open(output, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert (first, second) == (3, 5)
+    assert [record["subject"] for record in records] == [
+        f"Pedido {number}" for number in range(5)
+    ]
+    assert records[0]["message_id"] == "<0@exemplo.com>"
+    assert records[0]["classification"] == "Produtivo"
+    assert service.process_email_async.await_count == 5
+    assert load_checkpoint(checkpoint, str(source))["processed"] == 5  # type: ignore
+
+
+def test_ingest_discards_output_after_checkpoint(tmp_path):
+    """Testa que linhas gravadas após o último checkpoint são descartadas ao retomar."""
+    source = tmp_path / "caixa.mbox"
+    _write_mbox(source, 2)
+    output = tmp_path / "resultados.csv"
+    checkpoint = f"{output}.checkpoint"
+    service = _service()
+
+    asyncio.run(ingest(service, str(source), str(output), checkpoint, limit=1))
+    with open(output, "a", encoding="utf-8") as f:
+        f.write("linha,incompleta")  # simula uma queda no meio da gravação
+    asyncio.run(ingest(service, str(source), str(output), checkpoint))
+
+    with open(output, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["subject"] for row in rows] == ["Pedido 0", "Pedido 1"]
+
+
+def test_ingest_records_malformed_message_and_continues(tmp_path):
+    """Testa que uma mensagem que não pode ser interpretada vira uma linha de erro."""
+    source = tmp_path / "caixa.mbox"
+    _write_mbox(source, 3)
+    output = str(tmp_path / "resultados.jsonl")
+    service = _service()
+    parse_message = ingestion_service.parse_message
+
+    def parse_or_fail(raw: bytes):
+        if b"Pedido 1" in raw:
+            raise ValueError("cabeçalho malformado")
+        return parse_message(raw)
+
+    with patch.object(ingestion_service, "parse_message", side_effect=parse_or_fail):
+        total = asyncio.run(ingest(service, str(source), output, f"{output}.cp"))
+
+    with open(output, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert total == 3
+    assert [record["error"] for record in records] == [None, PROCESSING_ERROR, None]
+    assert records[1]["subject"] == ""
+    assert service.process_email_async.await_count == 2
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import os
+import socket
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from backend.services import job_service
+from backend.services.email_processing_service import EmailProcessingService
+from backend.services.job_service import (
+    EMPTY_CONTENT_ERROR,
+    PROCESSING_ERROR,
+    JobQueue,
+    JobStore,
+    WebhookURLError,
+    check_webhook_url,
+    pin_address,
+)
+
+
+def test_job_store_claims_by_priority_then_arrival():
+    """Testa que itens de jobs com prioridade maior saem da fila primeiro."""
+    store = JobStore(":memory:")
+    low = store.create_job(["a", "b"], priority=0)
+    high = store.create_job(["c"], priority=5)
+
+    assert store.claim_next() == (high, 0, "c")
+    assert store.claim_next() == (low, 0, "a")
+    assert store.claim_next() == (low, 1, "b")
+    assert store.claim_next() is None
+
+
+def test_job_store_shared_between_processes(tmp_path):
+    """Testa que conexões distintas ao mesmo banco (um por worker) não retiram o mesmo item."""
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = JobStore(path), JobStore(path)
+    job_id = first.create_job(["a", "b"])
+
+    claimed = [first.claim_next(), second.claim_next(), first.claim_next()]
+
+    assert claimed == [(job_id, 0, "a"), (job_id, 1, "b"), None]
+
+
+def test_job_store_tracks_progress():
+    """Testa o progresso e a conclusão do job."""
+    store = JobStore(":memory:")
+    job_id = store.create_job(["a", "  "])
+
+    status = store.get_job(job_id)
+    assert status is not None
+    assert status["status"] == "queued"
+    assert status["failed"] == 1  # o e-mail vazio já entra como erro
+    assert status["progress"] == 0.5
+
+    claimed = store.claim_next()
+    assert claimed == (job_id, 0, "a")
+    result = {"classification": "Produtivo", "suggested_response": "Ok."}
+    assert store.complete_item(job_id, 0, result=result) is True
+
+    status = store.get_job(job_id)
+    assert status is not None
+    assert status["status"] == "completed"
+    assert status["processed"] == 1
+    assert status["progress"] == 1.0
+
+    results = store.get_results(job_id)
+    assert results["total"] == 2
+    assert results["items"][0]["result"] == result
+    assert results["items"][1]["error"] == EMPTY_CONTENT_ERROR
+
+
+def test_job_store_requeues_interrupted_items():
+    """Testa que itens em processamento voltam para a fila após uma parada."""
+    store = JobStore(":memory:")
+    job_id = store.create_job(["a"])
+    store.claim_next()
+
+    assert store.claim_next() is None
+    store.requeue_running()
+    assert store.claim_next() == (job_id, 0, "a")
+
+
+def test_job_store_requeues_items_of_one_worker(tmp_path):
+    """Testa que só os itens do worker que terminou voltam para a fila."""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job(["a"])
+    store.claim_next()
+
+    assert store.requeue_running(claimed_by=os.getpid() + 1) == 0
+    assert store.claim_next() is None
+    assert store.requeue_running(claimed_by=os.getpid()) == 1
+    assert store.claim_next() == (job_id, 0, "a")
+
+
+def test_job_queue_processes_jobs_and_calls_webhook(monkeypatch):
+    """Testa os workers processando um job e notificando o webhook ao final."""
+    monkeypatch.setattr(job_service, "JOB_WEBHOOK_ALLOWED_HOSTS", "hook")
+    processor = MagicMock(spec=EmailProcessingService)
+
+    async def process(email_content: str):
+        if email_content == "falha":
+            raise Exception("Erro simulado")
+        return {"classification": "Produtivo", "suggested_response": email_content}
+
+    processor.process_email_async = AsyncMock(side_effect=process)
+    webhook_calls: list[dict] = []
+
+    def webhook(request: httpx.Request) -> httpx.Response:
+        webhook_calls.append(json.loads(request.content))
+        return httpx.Response(200)
+
+    async def run() -> str:
+        queue = JobQueue(processor, store=JobStore(":memory:"), concurrency=2)
+        queue._http_client = httpx.AsyncClient(transport=httpx.MockTransport(webhook))
+        job = await queue.submit(
+            ["um", "falha", "tres"], webhook_url="http://hook/jobs"
+        )
+        while not webhook_calls:
+            await asyncio.sleep(0.01)
+        results = queue.store.get_results(job["job_id"])
+        await queue.stop()
+        return json.dumps(results)
+
+    results = json.loads(asyncio.run(run()))
+
+    assert webhook_calls[0]["status"] == "completed"
+    assert webhook_calls[0]["processed"] == 2
+    assert webhook_calls[0]["failed"] == 1
+    assert [item["status"] for item in results["items"]] == ["done", "error", "done"]
+    assert results["items"][1]["error"] == PROCESSING_ERROR
+    assert results["items"][2]["result"]["suggested_response"] == "tres"
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "ftp://exemplo.com/hook",
+        "http://127.0.0.1:8000/admin",
+        "http://169.254.169.254/latest/meta-data",
+        "http://10.0.0.5/hook",
+        "http://[::1]/hook",
+        "http://localhost/hook",
+    ],
+)
+def test_check_webhook_url_blocks_internal_targets(url):
+    """Testa que o webhook não pode apontar para a rede interna ou metadados."""
+    with pytest.raises(WebhookURLError):
+        asyncio.run(check_webhook_url(url))
+
+
+def test_check_webhook_url_allowlist(monkeypatch):
+    """Testa a lista de hosts permitidos e a aceitação de endereços públicos."""
+    asyncio.run(check_webhook_url("https://8.8.8.8/hook"))
+
+    monkeypatch.setattr(job_service, "JOB_WEBHOOK_ALLOWED_HOSTS", "hooks.exemplo.com")
+    asyncio.run(check_webhook_url("https://hooks.exemplo.com/jobs"))
+    with pytest.raises(WebhookURLError):
+        asyncio.run(check_webhook_url("https://8.8.8.8/hook"))
+
+
+def test_webhook_connects_to_validated_address(monkeypatch):
+    """
+    Testa que a notificação se conecta ao endereço validado: uma nova resolução
+    do DNS (DNS rebinding) não a desvia para a rede interna.
+    """
+    answers = ["93.184.216.34", "127.0.0.1"]
+
+    async def getaddrinfo(host, port, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (answers.pop(0), port))]
+
+    requests: list[httpx.Request] = []
+
+    def webhook(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200)
+
+    async def run():
+        monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+        address = await check_webhook_url("https://hooks.exemplo.com/jobs")
+        async with httpx.AsyncClient(transport=httpx.MockTransport(webhook)) as client:
+            request = client.build_request("POST", "https://hooks.exemplo.com/jobs")
+            await client.send(pin_address(request, address))  # type: ignore
+
+    asyncio.run(run())
+
+    assert str(requests[0].url) == "https://93.184.216.34/jobs"
+    assert requests[0].headers["host"] == "hooks.exemplo.com"
+    assert requests[0].extensions["sni_hostname"] == "hooks.exemplo.com"
+
+
+def test_job_queue_worker_survives_store_errors(monkeypatch):
+    """Testa que um erro do banco (ex.: "database is locked") não derruba o worker."""
+    monkeypatch.setattr(job_service, "JOB_POLL_INTERVAL", 0.01)
+    processor = MagicMock(spec=EmailProcessingService)
+    processor.process_email_async = AsyncMock(
+        return_value={"classification": "Produtivo", "suggested_response": "Ok"}
+    )
+    store = JobStore(":memory:")
+    claim_next = store.claim_next
+    failures = [Exception("database is locked")]
+
+    def flaky_claim_next():
+        if failures:
+            raise failures.pop()
+        return claim_next()
+
+    monkeypatch.setattr(store, "claim_next", flaky_claim_next)
+
+    async def run():
+        queue = JobQueue(processor, store=store, concurrency=1)
+        job = await queue.submit(["um"])
+        while (await queue.get_job(job["job_id"]))["status"] != "completed":
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+    assert not failures
+
+
+def test_job_queue_resume_starts_only_with_pending_items(monkeypatch, tmp_path):
+    """Testa que o startup só abre o banco e inicia os workers se houver pendências."""
+    path = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(job_service, "JOB_QUEUE_PATH", path)
+    processor = MagicMock(spec=EmailProcessingService)
+
+    async def resume() -> bool:
+        queue = JobQueue(processor)
+        await queue.resume()
+        running = bool(queue._workers)
+        await queue.stop()
+        return running
+
+    assert asyncio.run(resume()) is False
+    assert not (tmp_path / "jobs.sqlite3").exists()
+
+    store = JobStore(path)
+    store.create_job(["a"])
+    store.claim_next()  # interrompido por uma parada anterior
+    store.close()
+    assert asyncio.run(resume()) is True
+
+
+def test_job_queue_marks_item_failed_when_result_cannot_be_saved(monkeypatch):
+    """Testa que um item cujo resultado não foi gravado não fica "running"."""
+    processor = MagicMock(spec=EmailProcessingService)
+    processor.process_email_async = AsyncMock(
+        return_value={"classification": "Produtivo", "suggested_response": "Ok"}
+    )
+    store = JobStore(":memory:")
+    complete_item = store.complete_item
+
+    def complete_without_result(job_id, index, result=None, error=None):
+        if result is not None:
+            raise Exception("database is locked")
+        return complete_item(job_id, index, result, error)
+
+    monkeypatch.setattr(store, "complete_item", complete_without_result)
+
+    async def run():
+        queue = JobQueue(processor, store=store, concurrency=1)
+        job = await queue.submit(["um"])
+        while (status := await queue.get_job(job["job_id"]))["status"] != "completed":
+            await asyncio.sleep(0.01)
+        results = await queue.get_results(job["job_id"])
+        await queue.stop()
+        return status, results
+
+    status, results = asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+    assert status["failed"] == 1
+    assert results["items"][0]["error"] == PROCESSING_ERROR
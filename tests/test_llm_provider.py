@@ -0,0 +1,91 @@
+import asyncio
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend.services.email_processing_service import EmailProcessingService
+from backend.services.llm_provider import (
+    AsyncLocalLLMService,
+    LocalLLMService,
+    create_async_llm_provider,
+)
+from backend.services.openai_service import AsyncOpenAIService, OpenAIService
+
+
+def test_local_provider_classifies_by_keywords():
+    """Testa a classificação por palavras-chave quando não há modelo treinado."""
+    service = LocalLLMService(classifier=None)
+    service.classifier = None
+
+    assert service.classify_email("Feliz Natal a toda a equipe!") == "Improdutivo"
+    assert service.classify_email("Obrigado, mas o erro continua.") == "Produtivo"
+    assert service.classify_email("Qual o prazo do relatório?") == "Produtivo"
+
+
+def test_local_provider_uses_trained_classifier():
+    """Testa que o classificador local treinado é usado quando disponível."""
+    classifier = MagicMock()
+    classifier.predict.return_value = ("Improdutivo", 0.6)
+    service = LocalLLMService(classifier=classifier)
+
+    label, response = service.classify_and_respond("Qualquer texto")
+
+    assert label == "Improdutivo"
+    assert "Agradecemos" in response
+    classifier.predict.assert_called_once_with("qualquer texto")
+
+
+def test_async_local_provider_streams_template():
+    """Testa a variante assíncrona, incluindo o stream e a classificação em lote."""
+    service = AsyncLocalLLMService(classifier=None)
+    service.local.classifier = None
+
+    async def run():
+        labels = await service.classify_emails(["Parabéns!", "Preciso de suporte"])
+        parts = [part async for part in service.stream_response("", "Produtivo")]
+        return labels, parts, await service.warm_up()
+
+    labels, parts, ready = asyncio.run(run())
+
+    assert labels == ["Improdutivo", "Produtivo"]
+    assert "".join(parts).startswith("Olá")
+    assert ready is True
+    assert "Não foi possível" in asyncio.run(service.generate_response("", "Outro"))
+
+
+def test_factory_selects_provider():
+    """Testa a seleção do provedor e a validação da configuração."""
+    assert isinstance(create_async_llm_provider("local"), AsyncLocalLLMService)
+
+    with patch.dict(os.environ, {"OPENAPI_APIKEY": "sk-test"}):
+        assert isinstance(create_async_llm_provider("openai"), AsyncOpenAIService)
+
+    with pytest.raises(ValueError):
+        create_async_llm_provider("desconhecido")
+    with pytest.raises(ValueError):
+        create_async_llm_provider("openai_compatible", base_url=None)
+
+
+def test_openai_compatible_server_without_key():
+    """Testa que um servidor compatível dispensa a chave do OpenAI e usa o modelo configurado."""
+    with patch.dict(os.environ, {}, clear=True):
+        service = OpenAIService(base_url="http://localhost:11434/v1", model="llama3")
+
+    assert str(service.client.base_url).startswith("http://localhost:11434/v1")
+    assert service.client.api_key == "sk-local"
+    assert service.model == "llama3"
+
+
+@patch(
+    "backend.services.llm_provider._validate_provider",
+    side_effect=ValueError("LLM_PROVIDER inválido"),
+)
+def test_processing_service_uses_provider_factory(mock_validate):
+    """Testa que o serviço sem container também valida o provedor configurado."""
+    service = EmailProcessingService()
+
+    with pytest.raises(ValueError):
+        service.openai_service
+    with pytest.raises(ValueError):
+        service.async_openai_service
@@ -0,0 +1,63 @@
+from backend.services.local_classifier import LabelLog, LocalClassifier
+
+PRODUTIVOS = [
+    "solicitar acesso sistema protocolo",
+    "status pedido atraso entrega",
+    "erro login portal senha expirar",
+    "enviar boleto contrato segunda via",
+    "agendar reunião revisar cronograma projeto",
+    "relatório mensal gerar erro",
+]
+IMPRODUTIVOS = [
+    "feliz natal próspero ano",
+    "parabéns equipe excelente trabalho",
+    "obrigado ajuda ontem",
+    "feliz aniversário dia incrível",
+    "agradecer café manhã",
+    "boas férias descansar",
+]
+
+
+def _train(threshold: float) -> LocalClassifier:
+    return LocalClassifier.train(
+        PRODUTIVOS + IMPRODUTIVOS,
+        ["Produtivo"] * len(PRODUTIVOS) + ["Improdutivo"] * len(IMPRODUTIVOS),
+        threshold=threshold,
+    )
+
+
+def test_local_classifier_predicts_known_examples():
+    """Testa que o classificador aprende os exemplos de treino."""
+    classifier = _train(threshold=0.5)
+    assert classifier.classify("erro login portal senha expirar") == "Produtivo"
+    assert classifier.classify("feliz natal próspero ano") == "Improdutivo"
+
+
+def test_local_classifier_escalates_below_threshold():
+    """Testa que abaixo do limite de confiança o classificador não responde."""
+    classifier = _train(threshold=1.0)
+    assert classifier.classify("texto sem relação nenhuma") is None
+
+
+def test_local_classifier_save_and_load(tmp_path):
+    """Testa que o modelo salvo em disco produz as mesmas previsões."""
+    path = str(tmp_path / "model.joblib")
+    classifier = _train(threshold=0.5)
+    classifier.save(path)
+
+    loaded = LocalClassifier.load(path, threshold=0.5)
+    text = "status pedido atraso entrega"
+    assert loaded.predict(text) == classifier.predict(text)
+
+
+def test_label_log_round_trip(tmp_path):
+    """Testa o registro dos rótulos do OpenAI, ignorando classificações inválidas."""
+    log = LabelLog(str(tmp_path / "labels.jsonl"))
+    log.append("texto produtivo", "Produtivo")
+    log.append("texto com erro", "Erro na Classificação")
+    log.append("texto improdutivo", "Improdutivo")
+
+    assert log.read() == (
+        ["texto produtivo", "texto improdutivo"],
+        ["Produtivo", "Improdutivo"],
+    )
@@ -0,0 +1,44 @@
+import asyncio
+
+from backend.services.metrics_service import (
+    REGISTRY,
+    server_timing_header,
+    start_request_timings,
+    track_stage,
+)
+
+
+def test_track_stage_records_request_timings_and_histogram():
+    """Testa que a etapa alimenta o histograma e os tempos da requisição."""
+
+    async def run() -> dict[str, float]:
+        timings = start_request_timings()
+
+        async def stage_in_task() -> None:
+            with track_stage("classification"):
+                await asyncio.sleep(0)
+
+        # Tasks criadas a partir da requisição compartilham os tempos
+        await asyncio.create_task(stage_in_task())
+        with track_stage("preprocess"):
+            pass
+        return timings
+
+    before = REGISTRY.get_sample_value(
+        "email_stage_duration_seconds_count", {"stage": "preprocess"}
+    )
+    timings = asyncio.run(run())
+
+    assert set(timings) == {"classification", "preprocess"}
+    assert (
+        REGISTRY.get_sample_value(
+            "email_stage_duration_seconds_count", {"stage": "preprocess"}
+        )
+        == (before or 0) + 1
+    )
+
+
+def test_server_timing_header_format():
+    """Testa o formato do cabeçalho Server-Timing (em milissegundos)."""
+    header = server_timing_header({"preprocess": 0.0123, "classification": 0.5}, 0.6)
+    assert header == "preprocess;dur=12.3, classification;dur=500.0, total;dur=600.0"
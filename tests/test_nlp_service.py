@@ -1,7 +1,12 @@
 import pytest
 import spacy.cli
 import spacy.cli.download
-from backend.services.nlp_service import preprocess_text
+from backend.services.nlp_service import (
+    is_model_loaded,
+    preprocess_text,
+    preprocess_texts,
+    warm_up,
+)
 import spacy
 
 """
@@ -71,3 +76,22 @@ def test_preprocess_text_lemmatization():
     Como estou usando o menor modelo, pode não ter 100% precisão em todas as lematizações.
     """
     assert preprocess_text(text) == expected_output
+
+
+def test_preprocess_texts_matches_preprocess_text():
+    """Testa que o processamento em lote produz o mesmo resultado que o individual"""
+    texts = ["Olá, como você está hoje?", "Isso é um teste, certo?", ""]
+    assert list(preprocess_texts(texts)) == [preprocess_text(text) for text in texts]
+
+
+def test_preprocess_texts_is_lazy():
+    """Testa que preprocess_texts consome o iterável sob demanda"""
+    texts = iter(["Olá, como você está hoje?", "Isso é um teste, certo?"])
+    results = preprocess_texts(texts, batch_size=1)
+    assert next(results) == preprocess_text("Olá, como você está hoje?")
+
+
+def test_warm_up_loads_model():
+    """Testa que o warm_up deixa o modelo carregado"""
+    warm_up()
+    assert is_model_loaded()
@@ -1,8 +1,9 @@
 # tests/test_openai_service.py
 
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch, Mock
-from backend.services.openai_service import OpenAIService
+from unittest.mock import AsyncMock, MagicMock, patch, Mock
+from backend.services.openai_service import AsyncOpenAIService, OpenAIService
 import os
 from openai.types.chat import ChatCompletion, ChatCompletionMessage
 from openai.types.chat.chat_completion import Choice
@@ -154,3 +155,73 @@ def test_classify_email_partial_match(mock_openai_class: Mock):
     email_content = "E-mail de teste."
     result = service.classify_email(email_content)
     assert result == "Produtivo"
+
+
+@patch("backend.services.openai_service.AsyncOpenAI")
+def test_async_classify_email_productive(mock_async_openai_class: Mock):
+    """Testa a classificação assíncrona de um e-mail como Produtivo."""
+    mock_instance = cast(MagicMock, mock_async_openai_class.return_value)
+    mock_message = MagicMock(spec=ChatCompletionMessage, content="Produtivo")
+    mock_choice = MagicMock(spec=Choice, message=mock_message)
+    mock_completion = MagicMock(spec=ChatCompletion, choices=[mock_choice])
+    mock_instance.chat.completions.create = AsyncMock(return_value=mock_completion)
+
+    service = AsyncOpenAIService()
+    result = asyncio.run(service.classify_email("Por favor, atualize meu pedido."))
+    assert result == "Produtivo"
+    mock_instance.chat.completions.create.assert_awaited_once()
+
+
+@patch("backend.services.openai_service.AsyncOpenAI")
+def test_async_generate_response_api_error(mock_async_openai_class: Mock):
+    """Testa o tratamento de erro na geração assíncrona de resposta."""
+    mock_instance = cast(MagicMock, mock_async_openai_class.return_value)
+    mock_instance.chat.completions.create = AsyncMock(
+        side_effect=Exception("Erro de API simulado")
+    )
+
+    service = AsyncOpenAIService()
+    result = asyncio.run(service.generate_response("Qualquer e-mail.", "Produtivo"))
+    assert result == "Erro na Geração de Resposta"
+
+
+@patch("backend.services.openai_service.OpenAI")
+def test_classify_and_respond_valid_json(mock_openai_class: Mock):
+    """Testa o modo combinado com uma resposta JSON válida."""
+    mock_instance = cast(MagicMock, mock_openai_class.return_value)
+    mock_message = MagicMock(
+        spec=ChatCompletionMessage,
+        content='{"classification": "Produtivo", "suggested_response": "Em breve retornaremos."}',
+    )
+    mock_choice = MagicMock(spec=Choice, message=mock_message)
+    mock_completion = MagicMock(spec=ChatCompletion, choices=[mock_choice])
+    mock_instance.chat.completions.create.return_value = mock_completion
+
+    service = OpenAIService()
+    result = service.classify_and_respond("Preciso de ajuda com meu pedido.")
+    assert result == ("Produtivo", "Em breve retornaremos.")
+    args, kwargs = mock_instance.chat.completions.create.call_args  # type: ignore
+    assert kwargs["response_format"] == {"type": "json_object"}
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "Produtivo",  # não é JSON
+        "[]",  # não é um objeto
+        '{"classification": "Talvez", "suggested_response": "Ok."}',
+        '{"classification": "Produtivo", "suggested_response": ""}',
+        '{"classification": "Produtivo"}',
+    ],
+)
+@patch("backend.services.openai_service.OpenAI")
+def test_classify_and_respond_malformed_json(mock_openai_class: Mock, content: str):
+    """Testa que respostas fora do formato retornam None (fallback para duas chamadas)."""
+    mock_instance = cast(MagicMock, mock_openai_class.return_value)
+    mock_message = MagicMock(spec=ChatCompletionMessage, content=content)
+    mock_choice = MagicMock(spec=Choice, message=mock_message)
+    mock_completion = MagicMock(spec=ChatCompletion, choices=[mock_choice])
+    mock_instance.chat.completions.create.return_value = mock_completion
+
+    service = OpenAIService()
+    assert service.classify_and_respond("E-mail.") is None
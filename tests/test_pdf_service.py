@@ -0,0 +1,123 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+from backend.services import pdf_service
+from backend.services.pdf_service import (
+    PdfExtractionError,
+    PdfExtractor,
+    PdfExtractorUnavailableError,
+    extract_pdf_text,
+)
+
+
+def _make_pdf(pages: list[str]) -> bytes:
+    """Gera um PDF mínimo com uma linha de texto por página."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b""]
+    font_id = 3
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (font_id, content_id)
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref_offset = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    return pdf
+
+
+def test_extract_pdf_text_reads_only_first_pages():
+    """Testa que apenas as primeiras max_pages páginas são extraídas."""
+    pdf = _make_pdf(["Pagina um", "Pagina dois", "Pagina tres"])
+
+    text = extract_pdf_text(pdf, max_pages=2, max_chars=1000, timeout=5)
+
+    assert "Pagina um" in text
+    assert "Pagina dois" in text
+    assert "Pagina tres" not in text
+
+
+def test_extract_pdf_text_limits_characters():
+    """Testa que a extração para ao atingir o limite de caracteres."""
+    pdf = _make_pdf(["Pagina um", "Pagina dois"])
+
+    assert extract_pdf_text(pdf, max_pages=10, max_chars=6, timeout=5) == "Pagina"
+
+
+def test_extract_pdf_text_invalid_pdf():
+    """Testa que conteúdo que não é PDF gera PdfExtractionError."""
+    with pytest.raises(PdfExtractionError):
+        extract_pdf_text(b"isto nao e um pdf", timeout=5)
+
+
+def test_pdf_extractor_discards_pool_after_timeout(monkeypatch):
+    """Testa que um processo que não responde é encerrado e o pool é recriado."""
+    monkeypatch.setattr(pdf_service, "PDF_TIMEOUT_MARGIN", 0)
+    extractor = PdfExtractor(timeout=0, max_workers=1)
+    pdf = _make_pdf(["Pagina um"])
+    discarded = []
+    discard = extractor._discard
+
+    def recording_discard(executor):
+        discarded.extend(executor._processes.values())
+        discard(executor)
+
+    monkeypatch.setattr(extractor, "_discard", recording_discard)
+
+    async def run() -> str:
+        with pytest.raises(PdfExtractionError):
+            await extractor.extract(pdf)
+        assert extractor._executor is None
+        for process in discarded:
+            process.join(timeout=5)
+        assert discarded and not any(process.is_alive() for process in discarded)
+        extractor.timeout = 5
+        return await extractor.extract(pdf)
+
+    try:
+        assert "Pagina um" in asyncio.run(run())
+    finally:
+        extractor.close()
+
+
+def test_pdf_extractor_recovers_from_broken_pool():
+    """Testa que um pool quebrado gera erro de indisponibilidade e é recriado."""
+    extractor = PdfExtractor(timeout=5, max_workers=1)
+    pdf = _make_pdf(["Pagina um"])
+
+    async def run() -> str:
+        await extractor.extract(pdf)
+        for process in list(extractor.executor._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+            process.join()
+        with pytest.raises(PdfExtractorUnavailableError):
+            await extractor.extract(pdf)
+        return await extractor.extract(pdf)
+
+    try:
+        assert "Pagina um" in asyncio.run(run())
+    finally:
+        extractor.close()
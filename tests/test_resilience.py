@@ -0,0 +1,198 @@
+import asyncio
+import os
+
+import httpx
+import openai
+import pytest
+
+from backend.services.openai_service import OpenAIService
+from backend.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimiter,
+    Resilience,
+    RetryPolicy,
+    TokenBucket,
+)
+
+
+def _completion(content: str) -> dict:
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-3.5-turbo",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+    }
+
+
+class FakeOpenAIServer:
+    """Servidor OpenAI falso (via transporte do httpx) que responde em sequência."""
+
+    def __init__(self, responses: list[httpx.Response]) -> None:
+        self.responses = responses
+        self.requests: list[httpx.Request] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.responses[min(len(self.requests), len(self.responses)) - 1]
+
+    def service(self, resilience: Resilience) -> OpenAIService:
+        http_client = httpx.Client(transport=httpx.MockTransport(self.handler))
+        return OpenAIService(http_client=http_client, resilience=resilience)
+
+
+@pytest.fixture(autouse=True)
+def mock_openai_api_key():
+    os.environ["OPENAI_API_KEY"] = "sk-test-key"
+    yield
+    del os.environ["OPENAI_API_KEY"]
+
+
+def _fast_resilience(**kwargs) -> Resilience:
+    return Resilience(
+        retry_policy=RetryPolicy(max_retries=2, base_delay=0, max_delay=1), **kwargs
+    )
+
+
+def test_retries_on_429_honouring_retry_after():
+    """Testa que um 429 é tentado de novo e a chamada seguinte tem sucesso."""
+    server = FakeOpenAIServer(
+        [
+            httpx.Response(429, headers={"Retry-After": "0"}, json={"error": {}}),
+            httpx.Response(200, json=_completion("Produtivo")),
+        ]
+    )
+    service = server.service(_fast_resilience())
+
+    assert service.classify_email("Preciso de ajuda.") == "Produtivo"
+    assert len(server.requests) == 2
+
+
+def test_does_not_retry_client_errors():
+    """Testa que erros 4xx (exceto 429) não são repetidos."""
+    server = FakeOpenAIServer([httpx.Response(400, json={"error": {}})])
+    service = server.service(_fast_resilience())
+
+    assert service.classify_email("Preciso de ajuda.") == "Erro na Classificação"
+    assert len(server.requests) == 1
+
+
+def test_circuit_breaker_fails_fast_when_open():
+    """Testa que, com o circuito aberto, a API nem é chamada."""
+    server = FakeOpenAIServer([httpx.Response(503, json={"error": {}})])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    service = server.service(_fast_resilience(circuit_breaker=breaker))
+
+    assert service.classify_email("E-mail.") == "Erro na Classificação"
+    assert breaker.state == "open"
+    requests_before = len(server.requests)
+
+    assert service.classify_email("E-mail.") == "Erro na Classificação"
+    assert len(server.requests) == requests_before
+
+
+def test_open_circuit_does_not_consume_rate_limit():
+    """Testa que uma chamada recusada pelo circuito não gasta o limite de taxa."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    limiter = RateLimiter(requests_per_minute=60)
+    resilience = _fast_resilience(circuit_breaker=breaker, rate_limiter=limiter)
+
+    with pytest.raises(CircuitOpenError):
+        resilience.call(lambda timeout: "nunca chamada")
+
+    assert limiter.requests.tokens == 60  # type: ignore
+
+
+def test_retries_consume_rate_limit():
+    """Testa que cada retentativa reserva de novo o limite de requisições."""
+    server = FakeOpenAIServer(
+        [
+            httpx.Response(429, headers={"Retry-After": "0"}, json={"error": {}}),
+            httpx.Response(429, headers={"Retry-After": "0"}, json={"error": {}}),
+            httpx.Response(200, json=_completion("Produtivo")),
+        ]
+    )
+    limiter = RateLimiter(requests_per_minute=600)
+    service = server.service(_fast_resilience(rate_limiter=limiter))
+
+    assert service.classify_email("Preciso de ajuda.") == "Produtivo"
+    assert len(server.requests) == 3
+    assert limiter.requests.tokens == pytest.approx(597, abs=0.5)  # type: ignore
+
+
+def test_circuit_breaker_half_open_recovers():
+    """Testa que, após o intervalo, uma chamada bem-sucedida fecha o circuito."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # apenas uma chamada de teste por vez
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_cancelled_trial_call_releases_circuit():
+    """Testa que a chamada de teste cancelada não deixa o circuito preso."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    resilience = _fast_resilience(circuit_breaker=breaker)
+
+    async def hang(timeout: float) -> str:
+        await asyncio.sleep(60)
+        return "nunca"
+
+    async def ok(timeout: float) -> str:
+        return "ok"
+
+    async def run():
+        trial = asyncio.create_task(resilience.acall(hang))
+        await asyncio.sleep(0)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        return await resilience.acall(ok)
+
+    assert asyncio.run(run()) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_client_errors_do_not_open_circuit():
+    """Testa que erros 4xx da entrada do cliente não contam para o circuito."""
+    server = FakeOpenAIServer([httpx.Response(400, json={"error": {}})])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    service = server.service(_fast_resilience(circuit_breaker=breaker))
+
+    service.classify_email("E-mail.")
+    service.classify_email("E-mail.")
+
+    assert breaker.state == "closed"
+    assert len(server.requests) == 2
+
+
+def test_retry_policy_uses_retry_after_and_caps_backoff():
+    """Testa o cálculo da espera entre tentativas."""
+    policy = RetryPolicy(max_retries=5, base_delay=1, max_delay=4)
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"Retry-After": "2"}, request=request)
+    error = openai.RateLimitError("limite", response=response, body=None)
+    assert policy.delay(0, error) == 2
+    assert all(0 <= policy.delay(10, Exception()) <= 4 for _ in range(20))
+
+
+def test_token_bucket_reports_wait_when_exhausted():
+    """Testa que o limite por minuto indica a espera quando o saldo acaba."""
+    bucket = TokenBucket(rate_per_minute=60)  # 1 por segundo
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) == pytest.approx(1, abs=0.1)
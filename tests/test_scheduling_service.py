@@ -0,0 +1,162 @@
+import asyncio
+import contextvars
+import math
+from unittest.mock import patch
+
+import pytest
+
+from backend.services.scheduling_service import (
+    ClientContext,
+    FairScheduler,
+    TenantQuotas,
+    parse_rates,
+    parse_tenant_keys,
+    set_current_client,
+    tenant_for_key,
+)
+
+WEIGHTS = {"interactive": 4, "bulk": 1}
+
+
+def _run_calls(
+    scheduler: FairScheduler, calls: list[tuple[ClientContext, str]]
+) -> list[str]:
+    """
+    Ocupa a única vaga, enfileira as chamadas na ordem dada e retorna a ordem
+    em que foram atendidas
+    """
+    order: list[str] = []
+
+    async def call(client: ClientContext, name: str) -> None:
+        set_current_client(client)
+        async with scheduler.slot():
+            order.append(name)
+
+    async def run():
+        async with scheduler.slot():
+            tasks = [
+                asyncio.create_task(call(client, name), context=contextvars.Context())
+                for client, name in calls
+            ]
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    return order
+
+
+def test_interactive_calls_get_larger_share():
+    """Testa que a classe interativa passa à frente de chamadas em lote já na fila."""
+    scheduler = FairScheduler(1, WEIGHTS)
+    bulk = ClientContext("importacao", "bulk")
+    interactive = ClientContext("painel", "interactive")
+
+    order = _run_calls(
+        scheduler,
+        [(bulk, f"b{i}") for i in range(3)]
+        + [(interactive, f"i{i}") for i in range(6)],
+    )
+
+    # Peso 4 contra 1: quatro interativas para cada chamada em lote
+    assert order == ["i0", "i1", "i2", "b0", "i3", "i4", "i5", "b1", "b2"]
+
+
+def test_clients_of_same_class_alternate():
+    """Testa que um cliente com muitas chamadas na fila não bloqueia os demais."""
+    scheduler = FairScheduler(1, WEIGHTS)
+    heavy = ClientContext("a", "bulk")
+    light = ClientContext("b", "bulk")
+
+    order = _run_calls(
+        scheduler, [(heavy, f"a{i}") for i in range(3)] + [(light, "b0")]
+    )
+
+    assert order == ["a0", "b0", "a1", "a2"]
+
+
+def test_cancelled_call_releases_queue():
+    """Testa que uma chamada cancelada na fila não ocupa a vaga das seguintes."""
+    scheduler = FairScheduler(1, WEIGHTS)
+    served: list[str] = []
+
+    async def call(name: str) -> None:
+        async with scheduler.slot():
+            served.append(name)
+
+    async def run():
+        async with scheduler.slot():
+            cancelled = asyncio.create_task(call("cancelada"))
+            waiting = asyncio.create_task(call("seguinte"))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.sleep(0)
+        await asyncio.wait_for(waiting, timeout=1)
+        assert cancelled.cancelled()
+
+    asyncio.run(run())
+
+    assert served == ["seguinte"]
+    assert scheduler._active == 0
+
+
+def test_tenant_quotas():
+    """Testa a cota por cliente: recusa sem consumir e cotas específicas."""
+    quotas = TenantQuotas(default_rate=2, rates={"vip": 100})
+    client = ClientContext("cliente", "interactive")
+
+    assert quotas.try_acquire(client) == 0
+    assert quotas.try_acquire(client) == 0
+    assert quotas.try_acquire(client) > 0
+    assert quotas.try_acquire(ClientContext("outro", "bulk")) == 0
+    assert quotas.try_acquire(ClientContext("vip", "bulk"), cost=50) == 0
+
+
+def test_tenant_quotas_reject_cost_above_capacity():
+    """Testa que um lote maior que a cota por minuto nunca é aceito nem cobrado."""
+    quotas = TenantQuotas(default_rate=10)
+    client = ClientContext("cliente", "bulk")
+
+    assert quotas.try_acquire(client, cost=1000) == math.inf
+    assert quotas.try_acquire(client, cost=10) == 0
+
+
+def test_tenant_quotas_split_refill_between_workers():
+    """
+    Testa que, com vários workers, um lote dentro da cota configurada é aceito
+    e que cada worker só reabastece a sua fração da cota.
+    """
+    quotas = TenantQuotas(default_rate=100, workers=8)
+    client = ClientContext("cliente", "bulk")
+
+    assert quotas.try_acquire(client, cost=50) == 0
+    assert quotas.try_acquire(client, cost=101) == math.inf
+    # Faltam 10 e-mails, reabastecidos a 100 / 8 por minuto
+    assert quotas.try_acquire(client, cost=60) == pytest.approx(48, abs=0.1)
+
+
+def test_tenant_quotas_evict_old_clients():
+    """Testa que só os clientes mais recentes ficam em memória."""
+    quotas = TenantQuotas(default_rate=1, max_clients=2)
+    for name in ("a", "b", "c"):
+        quotas.try_acquire(ClientContext(name, "bulk"))
+
+    assert list(quotas._buckets) == ["b", "c"]
+
+
+def test_parse_rates():
+    """Testa a leitura das configurações no formato nome:valor."""
+    assert parse_rates("interactive:4, bulk:1") == {"interactive": 4, "bulk": 1}
+    assert parse_rates("") == {}
+    with pytest.raises(ValueError):
+        parse_rates("sem-valor")
+
+
+def test_tenant_for_key():
+    """Testa que só as chaves configuradas identificam um cliente."""
+    assert parse_tenant_keys("k1:parceiro, k2:vip") == {"k1": "parceiro", "k2": "vip"}
+    with patch("backend.services.scheduling_service.TENANT_API_KEYS", "k1:parceiro"):
+        assert tenant_for_key("k1") == "parceiro"
+        assert tenant_for_key("parceiro") is None
+        assert tenant_for_key(None) is None
+    with pytest.raises(ValueError):
+        parse_tenant_keys("sem-cliente")
@@ -0,0 +1,50 @@
+import os
+
+from backend.serve import configure_environment, requeue_worker_items
+from backend.services import job_service
+from backend.services.job_service import JobStore
+
+
+def test_configure_environment_for_workers(monkeypatch, tmp_path):
+    """Testa a configuração compartilhada entre os workers, aplicada antes do fork."""
+    metrics_dir = tmp_path / "metrics"
+    metrics_dir.mkdir()
+    (metrics_dir / "counter_123.db").write_bytes(b"antigo")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(metrics_dir))
+    monkeypatch.setenv("LLM_REQUESTS_PER_MINUTE", "600")
+    monkeypatch.delenv("LLM_TOKENS_PER_MINUTE", raising=False)
+    monkeypatch.delenv("RESULT_CACHE_BACKEND", raising=False)
+    monkeypatch.setenv("PREPROCESS_MAX_WORKERS", "2")
+    monkeypatch.setenv("JOB_REQUEUE_ON_START", "true")
+    monkeypatch.setenv("TENANT_QUOTAS", "parceiro:120, vip:40")
+    monkeypatch.setenv("TENANT_REQUESTS_PER_MINUTE", "100")
+    monkeypatch.delenv("TENANT_QUOTA_WORKERS", raising=False)
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "6")
+
+    configure_environment(workers=4)
+
+    assert os.environ["LLM_REQUESTS_PER_MINUTE"] == "150.0"
+    assert "LLM_TOKENS_PER_MINUTE" not in os.environ
+    # As cotas por cliente valem inteiras; cada worker reabastece 1/4 delas
+    assert os.environ["TENANT_QUOTAS"] == "parceiro:120, vip:40"
+    assert os.environ["TENANT_REQUESTS_PER_MINUTE"] == "100"
+    assert os.environ["TENANT_QUOTA_WORKERS"] == "4"
+    assert os.environ["LLM_MAX_CONCURRENCY"] == "2"
+    assert os.environ["RESULT_CACHE_BACKEND"] == "sqlite"
+    assert os.environ["PREPROCESS_MAX_WORKERS"] == "2"  # valor explícito é mantido
+    assert os.environ["JOB_REQUEUE_ON_START"] == "false"
+    assert list(metrics_dir.iterdir()) == []  # métricas de execuções anteriores
+
+
+def test_requeue_worker_items(monkeypatch, tmp_path):
+    """Testa que os itens de um worker que terminou voltam para a fila."""
+    path = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(job_service, "JOB_QUEUE_PATH", path)
+    store = JobStore(path)
+    job_id = store.create_job(["a"])
+    store.claim_next()
+
+    requeue_worker_items(os.getpid())
+
+    assert store.claim_next() == (job_id, 0, "a")
+    store.close()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import FastAPI
+
+from backend.services import service_container
+from backend.services.service_container import (
+    OPENAI_MAX_CONNECTIONS,
+    ServiceContainer,
+    get_service_container,
+)
+
+
+@pytest.fixture(autouse=True)
+def mock_openai_api_key():
+    os.environ["OPENAI_API_KEY"] = "sk-test-key"  # Chave de teste
+    yield
+    del os.environ["OPENAI_API_KEY"]
+
+
+def test_container_shares_pooled_client():
+    """Testa que o serviço de processamento usa o cliente HTTP compartilhado do container."""
+    container = ServiceContainer()
+
+    service = container.email_processing_service
+    assert service.async_openai_service is container.async_openai_service
+    assert container.async_openai_service.client._client is container.http_client
+    assert service.preprocess_executor is container.preprocess_executor
+    pool = container.http_client._transport._pool  # type: ignore
+    assert pool._max_connections == OPENAI_MAX_CONNECTIONS
+
+    asyncio.run(container.aclose())
+    assert container.http_client.is_closed
+
+
+def test_get_service_container_is_singleton():
+    """Testa que o container é criado uma única vez por aplicação."""
+    app = FastAPI()
+
+    first = get_service_container(app)
+    second = get_service_container(app)
+
+    assert first is second
+    assert app.state.services is first
+    asyncio.run(first.aclose())
+
+
+class FlakyLLMService:
+    """Provedor cujo warm-up falha nas primeiras tentativas."""
+
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.attempts = 0
+        self.ready = False
+
+    async def warm_up(self) -> bool:
+        self.attempts += 1
+        self.ready = self.attempts > self.failures
+        return self.ready
+
+    async def close(self) -> None:
+        pass
+
+
+def test_warm_up_retries_until_ready(monkeypatch):
+    """Testa que uma falha transitória no warm-up é tentada de novo até ficar pronto."""
+    monkeypatch.setattr(service_container, "WARMUP_RETRY_BASE_DELAY", 0)
+    monkeypatch.setattr(service_container, "is_model_loaded", lambda: True)
+    container = ServiceContainer()
+    container.async_openai_service = FlakyLLMService(failures=2)
+
+    asyncio.run(container.warm_up())
+
+    assert container.llm_ready
+    assert container.async_openai_service.attempts == 3
+    asyncio.run(container.aclose())
+
+
+def test_llm_ready_after_first_successful_call():
+    """Testa que a primeira chamada real bem-sucedida também marca o LLM como pronto."""
+    container = ServiceContainer()
+    service = container.async_openai_service
+    assert not container.llm_ready
+
+    async def fake_call(fn, estimated_tokens):
+        return object()
+
+    service.resilience.acall = fake_call
+    asyncio.run(service._create("classification", [], max_tokens=1))
+
+    assert container.llm_ready
+    asyncio.run(container.aclose())
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from backend.services.template_service import (
+    ResponseTemplates,
+    detect_locale,
+    extract_slots,
+    load_templates,
+)
+from backend.services.upload_service import parse_eml
+
+
+def test_extract_slots_from_headers():
+    """Testa a extração do primeiro nome do remetente e do assunto."""
+    email = (
+        "De: Maria Silva <maria@exemplo.com>\n"
+        "Assunto: RE: Feliz Natal!\n\n"
+        "Boas festas a todos."
+    )
+
+    assert extract_slots(email) == {"sender_name": "Maria", "subject": "Feliz Natal!"}
+    assert extract_slots("Obrigado pela ajuda!") == {"sender_name": "", "subject": ""}
+    assert extract_slots("From: joao@exemplo.com\nOi")["sender_name"] == ""
+
+
+def test_render_fills_sender_from_eml():
+    """Testa que o nome do cabeçalho From de um .eml chega ao modelo de resposta."""
+    raw = (
+        b"From: =?utf-8?q?J=C3=BAlia_Souza?= <julia@exemplo.com>\r\n"
+        b"Subject: Feliz Natal\r\n"
+        b"Content-Type: text/plain; charset=utf-8\r\n"
+        b"\r\n"
+        b"Boas festas a todos!\r\n"
+    )
+
+    rendered = ResponseTemplates().render(parse_eml(raw), "Improdutivo")
+
+    assert rendered is not None
+    assert rendered.startswith("Olá, Júlia,")
+    assert 'mensagem sobre "Feliz Natal"!' in rendered
+
+
+def test_render_fills_optional_slots():
+    """Testa que os trechos opcionais só aparecem com as variáveis preenchidas."""
+    templates = ResponseTemplates()
+
+    with_slots = templates.render(
+        "De: Maria <maria@exemplo.com>\nAssunto: Parabéns\n\nFeliz aniversário!",
+        "Improdutivo",
+    )
+    without_slots = templates.render("Feliz aniversário!", "Improdutivo")
+
+    assert with_slots is not None and without_slots is not None
+    assert with_slots.startswith("Olá, Maria,")
+    assert 'mensagem sobre "Parabéns"!' in with_slots
+    assert without_slots.startswith("Olá,\n")
+    assert "sobre" not in without_slots
+
+
+def test_render_only_configured_labels():
+    """Testa que categorias fora da configuração ficam para o LLM."""
+    templates = ResponseTemplates(labels=["Improdutivo"])
+
+    assert templates.render("Qual o status do pedido?", "Produtivo") is None
+    assert templates.render("Qual o status do pedido?", "Desconhecido") is None
+
+
+def test_render_detects_locale():
+    """Testa a escolha do idioma do modelo pelo conteúdo do e-mail."""
+    templates = ResponseTemplates()
+
+    english = templates.render(
+        "Thank you so much for the help, dear team!", "Improdutivo"
+    )
+    spanish = templates.render(
+        "Muchas gracias por la ayuda, muy amable.", "Improdutivo"
+    )
+
+    assert english is not None and english.startswith("Hello")
+    assert spanish is not None and spanish.startswith("Hola")
+    assert detect_locale("sem pistas", ["en", "pt-BR"], "pt-BR") == "pt-BR"
+
+
+def test_custom_templates_are_validated(tmp_path):
+    """Testa o carregamento de modelos do arquivo JSON e a validação das variáveis."""
+    path = tmp_path / "modelos.json"
+    path.write_text(
+        json.dumps({"pt-BR": {"Improdutivo": "Valeu[[, $sender_name]]!"}}),
+        encoding="utf-8",
+    )
+
+    templates = ResponseTemplates(load_templates(str(path)))
+
+    assert templates.render("De: Ana <ana@x.com>\nOi", "Improdutivo") == "Valeu, Ana!"
+    with pytest.raises(ValueError):
+        ResponseTemplates({"pt-BR": {"Improdutivo": "Olá $desconhecido"}})
+    with pytest.raises(ValueError):
+        ResponseTemplates(default_locale="fr")
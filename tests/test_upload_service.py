@@ -0,0 +1,68 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from backend.services.upload_service import (
+    IncrementalTextDecoder,
+    UploadTooLargeError,
+    html_to_text,
+    parse_eml,
+    read_text_upload,
+)
+
+
+def test_incremental_decoder_handles_split_utf8_characters():
+    """Testa que caracteres UTF-8 divididos entre blocos são decodificados."""
+    data = "ação".encode("utf-8")
+    decoder = IncrementalTextDecoder()
+
+    text = decoder.decode(data[:2]) + decoder.decode(data[2:], final=True)
+
+    assert text == "ação"
+    assert decoder.encoding == "utf-8"
+
+
+def test_incremental_decoder_switches_when_utf8_becomes_invalid():
+    """Testa a troca de codificação quando um bloco posterior não é UTF-8."""
+    decoder = IncrementalTextDecoder()
+
+    first = decoder.decode(b"Bom dia, ")
+    second = decoder.decode("informação adicional".encode("cp1252"), final=True)
+
+    assert first + second == "Bom dia, informação adicional"
+
+
+def test_read_text_upload_enforces_size_limit():
+    """Testa que a leitura é interrompida ao exceder o limite."""
+    upload = UploadFile(io.BytesIO(b"x" * 100))
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(read_text_upload(upload, max_bytes=10))
+
+
+def test_html_to_text_skips_scripts_and_breaks_blocks():
+    """Testa a conversão de HTML em texto simples."""
+    html = "<style>p {}</style><p>Olá &amp; bem-vindo</p><div>Linha 2</div>"
+    assert html_to_text(html) == "Olá & bem-vindo\n\nLinha 2"
+
+
+def test_parse_eml_prefers_plain_text_part():
+    """Testa que a parte text/plain de uma mensagem multipart é usada."""
+    raw = (
+        b"Subject: Fatura\r\n"
+        b"MIME-Version: 1.0\r\n"
+        b'Content-Type: multipart/alternative; boundary="b"\r\n'
+        b"\r\n"
+        b"--b\r\n"
+        b"Content-Type: text/plain; charset=iso-8859-1\r\n"
+        b"\r\n"
+        b"Segue a fatura de mar\xe7o.\r\n"
+        b"--b\r\n"
+        b"Content-Type: text/html; charset=utf-8\r\n"
+        b"\r\n"
+        b"<p>HTML</p>\r\n"
+        b"--b--\r\n"
+    )
+    assert parse_eml(raw) == "Assunto: Fatura\n\nSegue a fatura de março."